@@ -25,6 +25,10 @@ from . import db
 db.app = app
 db.init_app(app)
 
+# Profile requests
+from . import profiler
+profiler.init_app(app)
+
 if hasattr(settings, "FLASK_DEBUGTOOLBAR") and settings.FLASK_DEBUGTOOLBAR:
   from flask_debugtoolbar import DebugToolbarExtension
   toolbar = DebugToolbarExtension(app)
@@ -8,14 +8,17 @@ import ggrc.builder
 import ggrc.services
 import iso8601
 from datetime import datetime
+from flask import g, has_app_context
 from ggrc import db
 from ggrc.login import get_current_user_id
 from ggrc.models.reflection import AttributeInfo
 from ggrc.models.types import JsonType
 from ggrc.utils import url_for, view_url_for
+from sqlalchemy import event
 from sqlalchemy.ext.associationproxy import AssociationProxy
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.orm.properties import RelationshipProperty
+from sqlalchemy.orm.session import Session
 from werkzeug.exceptions import BadRequest
 
 """JSON resource state representation handler for gGRC models."""
@@ -426,6 +429,7 @@ class LazyStubRepresentation(object):
       conditions = { 'id': conditions }
     self.conditions = conditions
     self.condition_key, self.condition_val = zip(*sorted(conditions.items()))
+    self.cache_key = (self.type, self.condition_key, self.condition_val)
 
   def get_matches(self, results):
     return results\
@@ -465,41 +469,91 @@ def walk_representation(obj):
         yield v, i, obj
 
 
-def gather_queries(resource):
-  queries = []
-  for val, key, obj in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      queries.append((val.type, val.conditions))
-  return queries
+class StubResolver(object):
+  """Replaces `LazyStubRepresentation`s with rendered stubs.
 
-
-def reify_representation(resource, results, type_columns):
-  for val, key, obj in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      obj[key] = val.render(results, type_columns)
-  return resource
-
-
-def publish_representation(resource):
-  queries = gather_queries(resource)
-
-  if len(queries) == 0:
+  Stubs are memoized by type and conditions, so each distinct stub is only
+  queried once, and all stubs missing from a resource are queried with a
+  single UNION query. The memoized stubs are dropped whenever the session is
+  flushed, as they may no longer match the database.
+  """
+  def __init__(self):
+    self.stubs = {}
+
+  def clear(self):
+    self.stubs.clear()
+
+  def resolve(self, resource):
+    lazy_stubs = [
+        (val, key, obj) for val, key, obj in walk_representation(resource)
+          if isinstance(val, LazyStubRepresentation)]
+
+    missing = {}
+    for val, key, obj in lazy_stubs:
+      if val.cache_key not in self.stubs:
+        missing[val.cache_key] = val
+    if missing:
+      self.stubs.update(self._query_stubs(missing))
+
+    for val, key, obj in lazy_stubs:
+      stub = self.stubs[val.cache_key]
+      obj[key] = dict(stub) if stub is not None else None
     return resource
-  else:
+
+  def _query_stubs(self, lazy_stubs):
+    queries = [(val.type, val.conditions) for val in lazy_stubs.values()]
     results, type_columns, query = build_stub_union_query(queries)
-    rows = query.all()
+    rows = query.all() if query is not None else []
     for row in rows:
       type = row[0]
       for columns, matches in results[type].items():
         vals = tuple(row[type_columns[type][c]] for c in columns)
         if vals in matches:
           matches[vals].append(row)
+    return dict(
+        (cache_key, val.render(results, type_columns))
+        for cache_key, val in lazy_stubs.items())
+
+
+def get_stub_resolver():
+  """The `StubResolver` of the current request."""
+  if not has_app_context():
+    return StubResolver()
+  resolver = getattr(g, '_stub_resolver', None)
+  if resolver is None:
+    resolver = StubResolver()
+    g._stub_resolver = resolver
+  return resolver
+
 
-    return reify_representation(resource, results, type_columns)
+def clear_stub_resolver(session, flush_context):
+  if has_app_context():
+    resolver = getattr(g, '_stub_resolver', None)
+    if resolver is not None:
+      resolver.clear()
+
+event.listen(Session, 'after_flush', clear_stub_resolver)
+
+
+def publish_representation(resource):
+  return get_stub_resolver().resolve(resource)
 
 
 class Builder(AttributeInfo):
-  """JSON Dictionary builder for ggrc.models.* objects and their mixins."""
+  """JSON Dictionary builder for ggrc.models.* objects and their mixins.
+
+  What has to be done to publish each attribute only depends on the class
+  attribute, so it is decided once per attribute and kept as a publisher
+  function in ``_attr_publishers``. The attributes published by
+  ``publish_attrs`` and ``publish_stubs`` are likewise compiled into plans,
+  lists of ``(attr_name, publisher)`` pairs.
+  """
+
+  def __init__(self, tgt_class):
+    super(Builder, self).__init__(tgt_class)
+    self._tgt_class = tgt_class
+    self._attr_publishers = {}
+    self._plans = {}
 
   def generate_link_object_for_foreign_key(self, id, type, context_id=None):
     """Generate a link object for this object reference."""
@@ -614,42 +668,126 @@ class Builder(AttributeInfo):
       else:
         return None
 
-  def publish_attr(
-      self, obj, attr_name, inclusions, include, inclusion_filter):
-    class_attr = getattr(obj.__class__, attr_name)
-    if isinstance(class_attr, AssociationProxy):
-      return self.publish_association_proxy(
-          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
-    elif isinstance(class_attr, InstrumentedAttribute) and \
-         isinstance(class_attr.property, RelationshipProperty):
-      return self.publish_relationship(
-          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
-    elif class_attr.__class__.__name__ == 'property':
+  def _compile_association_proxy_publisher(self, attr_name, class_attr):
+    if isinstance(class_attr.remote_attr, property):
+      target_name = class_attr.value_attr + '_id'
+      target_type = class_attr.value_attr + '_type'
+      stub_for = lambda o: LazyStubRepresentation(
+          getattr(o, target_type), getattr(o, target_name))
+    else:
+      target_mapper = class_attr.remote_attr.property.mapper
+      if len(list(target_mapper.self_and_descendants)) > 1:
+        # Handle inheritance -- we must check the object itself for the type
+        stub_for = None
+      else:
+        target_name = list(
+            class_attr.remote_attr.property.local_columns)[0].key
+        target_type = target_mapper.class_.__name__
+        stub_for = lambda o: LazyStubRepresentation(
+            target_type, getattr(o, target_name))
+
+    def publisher(obj, inclusions, include, inclusion_filter):
+      if include or stub_for is None:
+        return self.publish_association_proxy(
+            obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+      return [
+          stub_for(join_object)
+          for join_object in getattr(obj, class_attr.local_attr.key)
+            if (not inclusion_filter) or inclusion_filter(join_object)]
+    return publisher
+
+  def _compile_relationship_publisher(self, attr_name, class_attr):
+    if class_attr.property.uselist:
+      def publisher(obj, inclusions, include, inclusion_filter):
+        return self.publish_link_collection(
+            getattr(obj, attr_name), inclusions, include, inclusion_filter)
+      return publisher
+
+    backref = class_attr.property.backref
+    target_class = class_attr.property.mapper.class_
+    polymorphic = target_class.__mapper__.polymorphic_on is not None
+    target_type = target_class.__name__
+    target_name = list(class_attr.property.local_columns)[0].key
+
+    def publisher(obj, inclusions, include, inclusion_filter):
+      if include or backref:
+        return self.publish_link(
+            obj, attr_name, inclusions, include, inclusion_filter)
+      attr_value = getattr(obj, target_name)
+      if attr_value is None:
+        return None
+      if polymorphic:
+        return LazyStubRepresentation(
+            getattr(obj, attr_name).__class__.__name__, attr_value)
+      return LazyStubRepresentation(target_type, attr_value)
+    return publisher
+
+  def _compile_property_publisher(self, attr_name):
+    id_name = '{0}_id'.format(attr_name)
+    type_name = '{0}_type'.format(attr_name)
+
+    def publisher(obj, inclusions, include, inclusion_filter):
       if not inclusions or include:
-        if (getattr(obj, '{0}_id'.format(attr_name))):
+        if getattr(obj, id_name):
           return LazyStubRepresentation(
-              getattr(obj, '{0}_type'.format(attr_name)),
-              getattr(obj, '{0}_id'.format(attr_name)))
+              getattr(obj, type_name), getattr(obj, id_name))
       else:
         return self.publish_link(
             obj, attr_name, inclusions, include, inclusion_filter)
+    return publisher
+
+  def _compile_attr_publisher(self, attr_name):
+    class_attr = getattr(self._tgt_class, attr_name)
+    if isinstance(class_attr, AssociationProxy):
+      return self._compile_association_proxy_publisher(attr_name, class_attr)
+    elif isinstance(class_attr, InstrumentedAttribute) and \
+         isinstance(class_attr.property, RelationshipProperty):
+      return self._compile_relationship_publisher(attr_name, class_attr)
+    elif class_attr.__class__.__name__ == 'property':
+      return self._compile_property_publisher(attr_name)
     else:
-      return getattr(obj, attr_name)
+      return lambda obj, inclusions, include, inclusion_filter: \
+          getattr(obj, attr_name)
+
+  def get_attr_publisher(self, attr_name):
+    publisher = self._attr_publishers.get(attr_name)
+    if publisher is None:
+      publisher = self._compile_attr_publisher(attr_name)
+      self._attr_publishers[attr_name] = publisher
+    return publisher
+
+  def get_plan(self, attrs):
+    """The list of ``(attr_name, publisher)`` pairs for ``attrs``."""
+    compiled_attrs, plan = self._plans.get(id(attrs), (None, None))
+    if compiled_attrs is not attrs:
+      plan = []
+      for attr in attrs:
+        if hasattr(attr, '__call__'):
+          attr_name = attr.attr_name
+        else:
+          attr_name = attr
+        plan.append((attr_name, self.get_attr_publisher(attr_name)))
+      self._plans[id(attrs)] = (attrs, plan)
+    return plan
+
+  def publish_attr(
+      self, obj, attr_name, inclusions, include, inclusion_filter):
+    if obj.__class__ is self._tgt_class:
+      builder = self
+    else:
+      builder = get_json_builder(obj)
+    return builder.get_attr_publisher(attr_name)(
+        obj, inclusions, include, inclusion_filter)
 
   def _publish_attrs_for(
       self, obj, attrs, json_obj, inclusions=[], inclusion_filter=None):
-    for attr in attrs:
-      if hasattr(attr, '__call__'):
-        attr_name = attr.attr_name
-      else:
-        attr_name = attr
-      local_inclusion = ()
-      for inclusion in inclusions:
-        if inclusion[0] == attr_name:
-          local_inclusion = inclusion
-          break
-      json_obj[attr_name] = self.publish_attr(
-          obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0,
+    local_inclusions = {}
+    for inclusion in inclusions:
+      local_inclusions.setdefault(inclusion[0], inclusion)
+    for attr_name, publisher in self.get_plan(attrs):
+      local_inclusion = local_inclusions.get(attr_name, ())
+      json_obj[attr_name] = publisher(
+          obj, local_inclusion[1:], len(local_inclusion) > 0,
           inclusion_filter)
 
   def publish_attrs(self, obj, json_obj, extra_inclusions, inclusion_filter):
@@ -7,3 +7,5 @@
 from .localcache import LocalCache
 from .memcache import MemCache
 from .cachemanager import CacheManager
+from .lrucache import LRUCache
+from .clients import get_cache_client
@@ -50,7 +50,7 @@ class CacheManager:
     self.deleted = {}
     self.marked_for_add={}
     self.marked_for_update={}
-    self.marked_for_delete=[]
+    self.marked_for_delete=set()
 
   def get_collection(self, category, resource, filter):
     """ get collection from cache 
@@ -196,4 +196,4 @@ class CacheManager:
     self.deleted = {}
     self.marked_for_add={}
     self.marked_for_update={}
-    self.marked_for_delete=[]
+    self.marked_for_delete=set()
@@ -0,0 +1,120 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Cache backends, selected with the `CACHE_BACKEND` setting.
+
+Every backend implements the subset of the AppEngine `memcache.Client`
+interface used by gGRC, so `MemCache`, `CacheManager` and the services work
+unchanged over any of them:
+
+  AppEngineMemcacheClient -- the AppEngine memcache service (the default)
+  LocalCacheClient -- an LRU in the application process, only suitable for
+    deployments running a single process
+  MemcachedClient -- memcached servers listed in `CACHE_BACKEND_SERVERS`,
+    using the `python-memcached` library
+"""
+
+from __future__ import absolute_import
+
+from threading import local
+from ggrc.extensions import get_extension_instance
+from .lrucache import LRUCache
+
+
+def resolve_default_cache_backend():
+  return 'ggrc.cache.clients.AppEngineMemcacheClient'
+
+
+def get_cache_client():
+  return get_extension_instance('CACHE_BACKEND', resolve_default_cache_backend)
+
+
+class AppEngineMemcacheClient(object):
+  """Delegates to a `memcache.Client` per thread, since clients keep the cas
+  ids of the values they got
+  """
+
+  def __init__(self, settings):
+    self._clients = local()
+
+  def _get_client(self):
+    if not hasattr(self._clients, 'client'):
+      from google.appengine.api import memcache
+      self._clients.client = memcache.Client()
+    return self._clients.client
+
+  def __getattr__(self, name):
+    return getattr(self._get_client(), name)
+
+
+class LocalCacheClient(LRUCache):
+
+  def __init__(self, settings):
+    super(LocalCacheClient, self).__init__(
+        getattr(settings, 'CACHE_BACKEND_LOCAL_SIZE', 10000))
+
+
+class MemcachedClient(object):
+  """Adapts the `python-memcached` client to the AppEngine interface"""
+
+  def __init__(self, settings):
+    import memcache
+    servers = getattr(settings, 'CACHE_BACKEND_SERVERS', ['127.0.0.1:11211'])
+    # `memcache.Client` objects are thread local
+    self.client = memcache.Client(servers, cache_cas=True)
+
+  def get(self, key):
+    return self.client.get(key)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    if not for_cas:
+      return self.client.get_multi(keys, key_prefix)
+    result = {}
+    for key in keys:
+      value = self.client.gets(key_prefix + key)
+      if value is not None:
+        result[key] = value
+    return result
+
+  def gets(self, key):
+    return self.client.gets(key)
+
+  def set(self, key, value, time=0):
+    return bool(self.client.set(key, value, time))
+
+  def set_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    return self.client.set_multi(mapping, time, key_prefix)
+
+  def add(self, key, value, time=0):
+    return bool(self.client.add(key, value, time))
+
+  def add_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    return [key for key, value in mapping.items()
+            if not self.client.add(key_prefix + key, value, time)]
+
+  def cas(self, key, value, time=0):
+    return bool(self.client.cas(key, value, time))
+
+  def cas_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    return [key for key, value in mapping.items()
+            if not self.client.cas(key_prefix + key, value, time)]
+
+  def delete(self, key, seconds=0):
+    # memcached has no delete locks, so `seconds` is ignored
+    return 2 if self.client.delete(key) else 0
+
+  def delete_multi(self, keys, seconds=0, key_prefix='', namespace=None):
+    return bool(self.client.delete_multi(keys, key_prefix=key_prefix))
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    value = self.client.incr(key, delta)
+    if value is None and initial_value is not None:
+      self.client.add(key, initial_value)
+      value = self.client.incr(key, delta)
+    return value
+
+  def flush_all(self):
+    self.client.flush_all()
+    return True
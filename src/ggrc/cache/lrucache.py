@@ -0,0 +1,177 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+import cPickle
+import time as _time
+from collections import OrderedDict
+from itertools import count
+from threading import RLock, local
+
+
+class LRUCache(object):
+  """ Bounded, process-local cache evicting the least recently used entries
+
+      It implements the subset of the memcache client interface used by gGRC,
+      so it can be used in place of, or in front of, a memcache client.
+      Values are pickled like memcache does, so callers may modify the values
+      they get without affecting the cached ones.
+
+      Attributes:
+        max_size: Maximum number of entries kept
+        ttl: Maximum number of seconds an entry is kept (0 means no limit)
+        hits, misses: Number of keys found and not found by `get*` calls
+  """
+
+  def __init__(self, max_size=1000, ttl=0):
+    self.max_size = max_size
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = RLock()
+    self._versions = count(1)
+    # Versions of the entries returned by `gets`, per thread like the cas ids
+    #   of memcache clients
+    self._cas_versions = local()
+
+  def _expires_at(self, time):
+    # Like memcache, `time` is either relative or a unix timestamp
+    if time > 30 * 24 * 3600:
+      time = time - _time.time()
+    if self.ttl and (not time or time > self.ttl):
+      time = self.ttl
+    if not time:
+      return None
+    return _time.time() + time
+
+  def _get(self, key, now):
+    entry = self._entries.pop(key, None)
+    if entry is None:
+      return None
+    if entry[0] is not None and entry[0] <= now:
+      return None
+    # Reinsert the entry at the most recently used end
+    self._entries[key] = entry
+    return entry
+
+  def _store(self, key, value, expires_at):
+    self._entries.pop(key, None)
+    self._entries[key] = (
+        expires_at, cPickle.dumps(value, -1), next(self._versions))
+    while len(self._entries) > self.max_size:
+      self._entries.popitem(last=False)
+
+  def _get_cas_versions(self):
+    if not hasattr(self._cas_versions, 'versions'):
+      self._cas_versions.versions = {}
+    return self._cas_versions.versions
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    result = {}
+    now = _time.time()
+    cas_versions = self._get_cas_versions() if for_cas else {}
+    with self._lock:
+      for key in keys:
+        entry = self._get(key_prefix + key, now)
+        if entry is None:
+          self.misses += 1
+        else:
+          self.hits += 1
+          result[key] = entry[1]
+          if for_cas:
+            cas_versions[key_prefix + key] = entry[2]
+    return {key: cPickle.loads(value) for key, value in result.items()}
+
+  def set_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    expires_at = self._expires_at(time)
+    with self._lock:
+      for key, value in mapping.items():
+        self._store(key_prefix + key, value, expires_at)
+    return []
+
+  def add_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    """Store the entries whose keys are not cached yet, returning the keys
+    which were not stored.
+    """
+    failed = []
+    expires_at = self._expires_at(time)
+    now = _time.time()
+    with self._lock:
+      for key, value in mapping.items():
+        if self._get(key_prefix + key, now) is not None:
+          failed.append(key)
+        else:
+          self._store(key_prefix + key, value, expires_at)
+    return failed
+
+  def cas_multi(self, mapping, time=0, key_prefix='', namespace=None):
+    """Store the entries which were not changed since they were read with
+    `gets` or `get_multi(..., for_cas=True)`, returning the keys which were
+    not stored.
+    """
+    failed = []
+    expires_at = self._expires_at(time)
+    now = _time.time()
+    cas_versions = self._get_cas_versions()
+    with self._lock:
+      for key, value in mapping.items():
+        entry = self._get(key_prefix + key, now)
+        version = cas_versions.pop(key_prefix + key, None)
+        if entry is None or entry[2] != version:
+          failed.append(key)
+        else:
+          self._store(key_prefix + key, value, expires_at)
+    return failed
+
+  def delete_multi(self, keys, seconds=0, key_prefix='', namespace=None):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key_prefix + key, None)
+    return True
+
+  def incr(self, key, delta=1, namespace=None, initial_value=None):
+    with self._lock:
+      value = self.get_multi([key]).get(key)
+      if value is None:
+        if initial_value is None:
+          return None
+        value = initial_value
+      value += delta
+      self.set(key, value)
+      return value
+
+  def get(self, key):
+    return self.get_multi([key]).get(key)
+
+  def set(self, key, value, time=0):
+    self.set_multi({key: value}, time)
+    return True
+
+  def add(self, key, value, time=0):
+    return len(self.add_multi({key: value}, time)) == 0
+
+  def gets(self, key):
+    return self.get_multi([key], for_cas=True).get(key)
+
+  def cas(self, key, value, time=0):
+    return len(self.cas_multi({key: value}, time)) == 0
+
+  def delete(self, key, seconds=0):
+    # Return values of the memcache client: 2 if deleted, 1 if missing
+    with self._lock:
+      return 1 if self._entries.pop(key, None) is None else 2
+
+  def flush_all(self):
+    with self._lock:
+      self._entries.clear()
+    return True
+
+  def get_stats(self):
+    with self._lock:
+      return {
+          'items': len(self._entries),
+          'hits': self.hits,
+          'misses': self.misses,
+          }
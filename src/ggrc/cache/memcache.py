@@ -4,14 +4,15 @@
 # Maintained By: dan@reciprocitylabs.com
 
 
-from google.appengine.api import memcache
 from cache import Cache
 from cache import all_cache_entries
 from collections import OrderedDict
 from copy import deepcopy
+from clients import get_cache_client
 
 """
-    Memcache implements the remote AppEngine Memcache mechanism
+    Memcache implements the remote cache mechanism, over the backend selected
+    with the CACHE_BACKEND setting
 
 """
 class MemCache(Cache):
@@ -22,7 +23,7 @@ class MemCache(Cache):
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
+        self.memcache_client = get_cache_client()
 
   def get_name(self):
     return self.name
@@ -0,0 +1,115 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+import time
+from bisect import bisect_left
+from threading import RLock
+
+
+class CacheStats(object):
+  """ Counters and latency histograms of the resource cache in this process
+
+      Attributes:
+        COUNTERS: Names of the counters kept per resource type
+        LATENCY_BUCKETS: Upper bounds, in milliseconds, of the histogram
+          buckets; the last bucket counts the slower calls
+  """
+
+  COUNTERS = (
+      'requested', 'hits', 'local_hits', 'misses', 'adds', 'blocked',
+      'invalidations',
+      )
+  LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+  def __init__(self):
+    self._lock = RLock()
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self.started_at = time.time()
+      self.counters = {}
+      self.latencies = {}
+
+  def count(self, resource_type, **counts):
+    """Add `counts`, e.g. `hits=3`, to the counters of `resource_type`"""
+    with self._lock:
+      counters = self.counters.get(resource_type)
+      if counters is None:
+        counters = self.counters[resource_type] = dict.fromkeys(
+            self.COUNTERS, 0)
+      for name, value in counts.items():
+        counters[name] += value
+
+  def observe(self, operation, seconds):
+    """Record a call of the cache client method `operation`"""
+    milliseconds = seconds * 1000
+    with self._lock:
+      latency = self.latencies.get(operation)
+      if latency is None:
+        latency = self.latencies[operation] = {
+            'count': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'buckets': [0] * (len(self.LATENCY_BUCKETS) + 1),
+            }
+      latency['count'] += 1
+      latency['total_ms'] += milliseconds
+      latency['max_ms'] = max(latency['max_ms'], milliseconds)
+      latency['buckets'][bisect_left(self.LATENCY_BUCKETS, milliseconds)] += 1
+
+  def timed(self, operation):
+    return _Timer(self, operation)
+
+  def get_stats(self):
+    """A JSON serializable snapshot of the counters and histograms"""
+    with self._lock:
+      totals = dict.fromkeys(self.COUNTERS, 0)
+      resources = {}
+      for resource_type, counters in self.counters.items():
+        resources[resource_type] = dict(counters)
+        resources[resource_type]['hit_ratio'] = _ratio(
+            counters['hits'], counters['requested'])
+        for name, value in counters.items():
+          totals[name] += value
+      totals['hit_ratio'] = _ratio(totals['hits'], totals['requested'])
+      latencies = {}
+      for operation, latency in self.latencies.items():
+        buckets = [
+            {'le_ms': bound, 'count': count}
+            for bound, count in zip(
+                list(self.LATENCY_BUCKETS) + [None], latency['buckets'])
+            ]
+        latencies[operation] = {
+            'count': latency['count'],
+            'mean_ms': latency['total_ms'] / latency['count'],
+            'max_ms': latency['max_ms'],
+            'buckets': buckets,
+            }
+      return {
+          'since': self.started_at,
+          'totals': totals,
+          'resources': resources,
+          'latencies': latencies,
+          }
+
+
+class _Timer(object):
+  def __init__(self, stats, operation):
+    self.stats = stats
+    self.operation = operation
+
+  def __enter__(self):
+    self.start = time.time()
+
+  def __exit__(self, exc_type, exc_value, exc_trace):
+    self.stats.observe(self.operation, time.time() - self.start)
+
+
+def _ratio(part, total):
+  return float(part) / total if total else None
+
+
+cache_stats = CacheStats()
@@ -11,7 +11,7 @@ from ggrc.fulltext.recordbuilder import fts_record_for
 from ggrc.services.common import log_event
 from flask import redirect, flash
 from ggrc.services.common import get_modified_objects, update_index
-from ggrc.services.common import update_memcache_before_commit, update_memcache_after_commit
+from ggrc.services.common import update_memcache_before_commit, update_memcache_after_commit, warm_cache_after_commit
 from ggrc.utils import benchmark
 from ggrc.models import CustomAttributeDefinition
 
@@ -220,7 +220,11 @@ class BaseConverter(object):
     db.session.commit()
     with benchmark("Update memcache after commit for import"):
       update_memcache_after_commit(self)
-    update_index(db.session, modified_objects)
+    with benchmark("Update full text index for import"):
+      update_index(db.session, modified_objects)
+    with benchmark("Warm cache for import"):
+      warm_cache_after_commit(
+          modified_objects.new.keys() + modified_objects.dirty.keys())
 
   def set_import_stats(self):
     self.total_imported = len(self.objects)
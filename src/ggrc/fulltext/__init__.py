@@ -18,6 +18,12 @@ class Indexer(object):
   def delete_record(self, key):
     raise NotImplementedError()
 
+  def index_batch(self, creates=(), updates=(), deletes=()):
+    """Apply many index changes at once. `creates` and `updates` are
+    `Record`s, `deletes` are `(key, type)` pairs.
+    """
+    raise NotImplementedError()
+
   def search(self, terms):
     raise NotImplementedError()
 
@@ -0,0 +1,298 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Index of the people assigned to objects, which limits searches and counts
+to the objects on a user's Profile or Dashboard pages ("My Work").
+
+A person is assigned to an object if they are:
+
+  mapped to it via ObjectPerson
+  an owner of it via ObjectOwner
+  given a role in its private context via UserRole (Programs, Audits and
+    Workflows)
+  the assignee of a Request, or the contact of a Response, of an Audit
+  its "contact" or "secondary_contact"
+  its "principal_assessor" or "secondary_assessor" (Controls)
+
+The assignments of the objects affected by a flush are recomputed after it,
+so the index stays up to date within the transaction. `rebuild_assignments`
+recomputes all of them, e.g. when the table is created.
+"""
+
+from sqlalchemy import and_, case, event, inspect, literal, or_, union
+from sqlalchemy.orm.session import Session
+from ggrc import db
+from ggrc.models import all_models
+from ggrc.models.object_owner import ObjectOwner
+from ggrc.models.object_person import ObjectPerson
+from ggrc.models.request import Request
+from ggrc.models.response import Response
+from ggrc.utils import benchmark
+from ggrc_basic_permissions.models import UserRole
+
+
+# Columns of an object which assign a person to the object itself
+PERSON_COLUMNS = (
+    'contact_id', 'secondary_contact_id',
+    'principal_assessor_id', 'secondary_assessor_id',
+    )
+
+
+class PersonObjectAssignment(db.Model):
+  __tablename__ = 'person_object_assignments'
+
+  person_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  object_type = db.Column(db.String(250), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  reason = db.Column(db.String(64), primary_key=True)
+
+  __table_args__ = (
+      db.Index('ix_person_object_assignments_object',
+               'object_type', 'object_id'),
+      )
+
+
+def get_type_column(model):
+  """The type name of the rows of `model`, by polymorphic identity if it has
+  subclasses sharing its table
+  """
+  mapper = model._sa_class_manager.mapper
+  if mapper.polymorphic_on is None:
+    return literal(mapper.class_.__name__)
+  return case(
+      value=mapper.polymorphic_on,
+      whens={
+        val: m.class_.__name__ for val, m in mapper.polymorphic_map.items()
+        })
+
+
+def _get_type_names(model):
+  mapper = model._sa_class_manager.mapper
+  if mapper.polymorphic_on is None:
+    return [mapper.class_.__name__]
+  return [m.class_.__name__ for m in mapper.polymorphic_map.values()]
+
+
+def _get_base_models():
+  models = []
+  for model in all_models.all_models:
+    base_model = model._sa_class_manager.mapper.primary_base_mapper.class_
+    if base_model not in models:
+      models.append(base_model)
+  return models
+
+
+def _get_role_models():
+  # Workflows are only there with the workflows extension enabled
+  return [model for model in (
+      all_models.Program, all_models.Audit,
+      getattr(all_models, 'Workflow', None)) if model is not None]
+
+
+def _filter_targets(query, type_column, id_column, type_names, targets):
+  """Limit `query` to the objects in `targets`, a dict of ids by type name.
+  Returns None if none of them is of `type_names`.
+  """
+  if targets is None:
+    return query
+  conditions = [
+      and_(type_column == name, id_column.in_(targets[name]))
+      for name in type_names if name in targets]
+  if not conditions:
+    return None
+  return query.filter(or_(*conditions))
+
+
+def _get_assignment_queries(targets=None):
+  """Queries of the `(person_id, object_type, object_id, reason)` rows of
+  `targets`, or of all objects if it is None
+  """
+  queries = []
+
+  for model, type_attr, id_attr, reason in (
+      (ObjectPerson, 'personable_type', 'personable_id', 'mapped'),
+      (ObjectOwner, 'ownable_type', 'ownable_id', 'owner')):
+    type_column = getattr(model, type_attr)
+    id_column = getattr(model, id_attr)
+    queries.append(_filter_targets(
+        db.session.query(
+            model.person_id, type_column, id_column, literal(reason)),
+        type_column, id_column,
+        targets.keys() if targets is not None else None, targets))
+
+  for model in _get_role_models():
+    queries.append(_filter_targets(
+        db.session.query(
+            UserRole.person_id, literal(model.__name__), model.id,
+            literal('role'))
+          .select_from(model)
+          .join(UserRole, UserRole.context_id == model.context_id),
+        literal(model.__name__), model.id, [model.__name__], targets))
+
+  audit = literal(all_models.Audit.__name__)
+  queries.append(_filter_targets(
+      db.session.query(
+          Request.assignee_id, audit, Request.audit_id,
+          literal('request_assignee'))
+        .filter(Request.assignee_id != None),
+      audit, Request.audit_id, [all_models.Audit.__name__], targets))
+  queries.append(_filter_targets(
+      db.session.query(
+          Response.contact_id, audit, Request.audit_id,
+          literal('response_contact'))
+        .select_from(Response)
+        .join(Request, Request.id == Response.request_id)
+        .filter(Response.contact_id != None),
+      audit, Request.audit_id, [all_models.Audit.__name__], targets))
+
+  for model in _get_base_models():
+    type_column = get_type_column(model)
+    for column_name in PERSON_COLUMNS:
+      if not hasattr(model, column_name):
+        continue
+      column = getattr(model, column_name)
+      queries.append(_filter_targets(
+          db.session.query(
+              column, type_column, model.id, literal(column_name[:-3]))
+            .filter(column != None),
+          type_column, model.id, _get_type_names(model), targets))
+
+  return [query.distinct() for query in queries if query is not None]
+
+
+def get_source_tables():
+  """The names of the tables the assignments are read from"""
+  models = [ObjectPerson, ObjectOwner, UserRole, Request, Response]
+  models.extend(_get_role_models())
+  models.extend(
+      model for model in _get_base_models()
+      if any(hasattr(model, column_name) for column_name in PERSON_COLUMNS))
+  return set(model.__table__.name for model in models)
+
+
+def _insert_assignments(session, targets=None):
+  queries = _get_assignment_queries(targets)
+  if not queries:
+    return
+  table = PersonObjectAssignment.__table__
+  session.execute(table.insert().from_select(
+      ['person_id', 'object_type', 'object_id', 'reason'],
+      union(*[query.statement for query in queries])))
+
+
+def refresh_assignments(session, targets):
+  """Recompute the assignments of `targets`, a dict of object ids by type
+  name
+  """
+  targets = dict((type, ids) for type, ids in targets.items() if ids)
+  if not targets:
+    return
+  table = PersonObjectAssignment.__table__
+  session.execute(table.delete().where(or_(*[
+      and_(table.c.object_type == type, table.c.object_id.in_(ids))
+      for type, ids in targets.items()])))
+  _insert_assignments(session, targets)
+
+
+def rebuild_assignments(session=None):
+  """Recompute the assignments of all objects in `session`, or a connection,
+  e.g. in a migration
+  """
+  if session is None:
+    session = db.session
+  with benchmark("Rebuild person object assignments"):
+    session.execute(PersonObjectAssignment.__table__.delete())
+    _insert_assignments(session)
+
+
+def _get_current_and_previous(state, attr):
+  history = state.attrs[attr].history
+  current = history.added or history.unchanged or [None]
+  previous = history.deleted or history.unchanged or [None]
+  return current[0], previous[0]
+
+
+def _has_changes(state, attrs):
+  return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+class _AffectedObjects(object):
+  """The objects whose assignments may be changed by a flush"""
+
+  def __init__(self):
+    self.targets = {}
+    self.context_ids = set()
+    self.request_ids = set()
+
+  def add(self, type, id):
+    if type is not None and id is not None:
+      self.targets.setdefault(type, set()).add(id)
+
+  def add_pairs(self, state, type_attr, id_attr):
+    types = _get_current_and_previous(state, type_attr)
+    ids = _get_current_and_previous(state, id_attr)
+    for type, id in zip(types, ids):
+      self.add(type, id)
+
+  def add_object(self, obj, is_changed):
+    state = inspect(obj)
+    model = obj.__class__
+    if isinstance(obj, ObjectPerson):
+      if is_changed(['personable_type', 'personable_id', 'person_id']):
+        self.add_pairs(state, 'personable_type', 'personable_id')
+    elif isinstance(obj, ObjectOwner):
+      if is_changed(['ownable_type', 'ownable_id', 'person_id']):
+        self.add_pairs(state, 'ownable_type', 'ownable_id')
+    elif isinstance(obj, UserRole):
+      if is_changed(['context_id', 'person_id']):
+        self.context_ids.update(_get_current_and_previous(state, 'context_id'))
+    elif isinstance(obj, Request):
+      if is_changed(['audit_id', 'assignee_id']):
+        for audit_id in _get_current_and_previous(state, 'audit_id'):
+          self.add(all_models.Audit.__name__, audit_id)
+    if isinstance(obj, Response):
+      if is_changed(['request_id', 'contact_id']):
+        self.request_ids.update(
+            _get_current_and_previous(state, 'request_id'))
+    columns = [name for name in PERSON_COLUMNS if hasattr(model, name)]
+    if model in _get_role_models():
+      columns.append('context_id')
+    if columns and is_changed(columns):
+      self.add(model.__name__, obj.id)
+
+  def resolve(self, session):
+    """Add the objects in the affected contexts and the audits of the
+    affected requests
+    """
+    self.context_ids.discard(None)
+    if self.context_ids:
+      for model in _get_role_models():
+        for id, in session.query(model.id).filter(
+            model.context_id.in_(self.context_ids)):
+          self.add(model.__name__, id)
+    self.request_ids.discard(None)
+    if self.request_ids:
+      for audit_id, in session.query(Request.audit_id).filter(
+          Request.id.in_(self.request_ids)):
+        self.add(all_models.Audit.__name__, audit_id)
+    return self.targets
+
+
+def update_assignments_after_flush(session, flush_context):
+  affected = _AffectedObjects()
+  changed = lambda state: lambda attrs: _has_changes(state, attrs)
+  for obj in session.new:
+    affected.add_object(obj, lambda attrs: True)
+  for obj in session.dirty:
+    affected.add_object(obj, changed(inspect(obj)))
+  for obj in session.deleted:
+    affected.add_object(obj, lambda attrs: True)
+    # Also drop any other assignments of deleted objects
+    if hasattr(obj, 'id') and obj.__class__ in all_models.all_models:
+      affected.add(obj.__class__.__name__, obj.id)
+  refresh_assignments(session, affected.resolve(session))
+
+
+event.listen(Session, 'after_flush', update_assignments_after_flush)
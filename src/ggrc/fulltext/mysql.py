@@ -3,19 +3,65 @@
 # Created By: david@reciprocitylabs.com
 # Maintained By: david@reciprocitylabs.com
 
-from ggrc import db
+import re
+from ggrc import db, settings
 from ggrc.models import all_models
-from ggrc.models.object_person import ObjectPerson
-from ggrc.models.object_owner import ObjectOwner
-from ggrc.models.request import Request
-from ggrc.models.response import Response
-from ggrc_basic_permissions.models import UserRole
 from ggrc.rbac import permissions, context_query_filter
 from sqlalchemy import \
-    event, and_, or_, text, literal, union, alias, case, func, distinct
+    event, and_, or_, text, literal, case, func, distinct, desc
 from sqlalchemy.schema import DDL
 from sqlalchemy.ext.declarative import declared_attr
+from .assignments import PersonObjectAssignment, rebuild_assignments
 from .sql import SqlIndexer
+from .stopwords import MYISAM_STOPWORDS
+
+
+WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+  """Split `text` into lower case words like MySQL FULLTEXT indexes do,
+  i.e. on characters other than letters, digits and underscores
+  """
+  if text is None:
+    return []
+  if not isinstance(text, basestring):
+    text = unicode(text)
+  return WORD_PATTERN.findall(text.lower())
+
+
+def get_min_word_length():
+  """Words shorter than this are not in FULLTEXT indexes (`ft_min_word_len`
+  for MyISAM tables)
+  """
+  return getattr(settings, 'FULLTEXT_MIN_WORD_LENGTH', 4)
+
+
+def pad_ngram(ngram, length):
+  # Underscores are word characters for MySQL, so padded n-grams are
+  #   indexed as whole words
+  return ngram + '_' * (length - len(ngram))
+
+
+def is_stopword_prefix(word):
+  """Whether a prefix search for `word` could need to find a stopword, which
+  isn't in FULLTEXT indexes
+  """
+  return any(stopword.startswith(word) for stopword in MYISAM_STOPWORDS)
+
+
+def get_ngrams(text):
+  """The prefixes shorter than the minimum word length of the words in
+  `text`, padded to that length so that they are FULLTEXT indexed. Searching
+  them for a short term finds the same words as a prefix search for a long
+  term would.
+  """
+  length = get_min_word_length()
+  ngrams = set()
+  for word in tokenize(text):
+    for end in range(1, min(len(word), length - 1) + 1):
+      ngrams.add(pad_ngram(word[:end], length))
+  return ' '.join(sorted(ngrams)) or None
 
 
 class MysqlRecordProperty(db.Model):
@@ -27,6 +73,8 @@ class MysqlRecordProperty(db.Model):
   tags = db.Column(db.String)
   property = db.Column(db.String(64), primary_key=True)
   content = db.Column(db.Text)
+  # Short word prefixes of `content` (see `get_ngrams`)
+  ngrams = db.Column(db.Text)
 
   @declared_attr
   def __table_args__(cls):
@@ -36,6 +84,7 @@ class MysqlRecordProperty(db.Model):
         # the DDL below or a similar Alembic migration should be used to create
         # the index.
         db.Index('{}_text_idx'.format(cls.__tablename__), 'content'),
+        db.Index('{}_ngrams_idx'.format(cls.__tablename__), 'ngrams'),
         # These are real indexes
         db.Index('ix_{}_key'.format(cls.__tablename__), 'key'),
         db.Index('ix_{}_type'.format(cls.__tablename__), 'type'),
@@ -49,13 +98,19 @@ event.listen(
     MysqlRecordProperty.__table__,
     'after_create',
     DDL('ALTER TABLE {tablename} ADD FULLTEXT INDEX {tablename}_text_idx '
-      '(content)'.format(tablename=MysqlRecordProperty.__tablename__))
+      '(content), ADD FULLTEXT INDEX {tablename}_ngrams_idx '
+      '(ngrams)'.format(tablename=MysqlRecordProperty.__tablename__))
     )
 
 
 class MysqlIndexer(SqlIndexer):
   record_type = MysqlRecordProperty
 
+  def get_row(self, record, property, content):
+    row = super(MysqlIndexer, self).get_row(record, property, content)
+    row['ngrams'] = get_ngrams(content)
+    return row
+
   def _get_type_query(
       self, model_names, permission_type='read', permission_model=None):
 
@@ -98,46 +153,61 @@ class MysqlIndexer(SqlIndexer):
     )
     if not terms:
       return whitelist
-    elif terms:
-      return and_(whitelist, MysqlRecordProperty.content.contains(terms))
-
-    # FIXME: Temporary (slow) fix for words shorter than MySQL default limit
-    # elif len(terms) < 4:
-    #   return MysqlRecordProperty.content.contains(terms)
-    # else:
-    #   return MysqlRecordProperty.content.match(terms)
-
-  def _get_type_select_column(self, model):
-    mapper = model._sa_class_manager.mapper
-    if mapper.polymorphic_on is None:
-      type_column = literal(mapper.class_.__name__)
-    else:
-      # Handle polymorphic types with CASE
-      type_column = case(
-          value=mapper.polymorphic_on,
-          whens={
-            val: m.class_.__name__
-              for val, m in mapper.polymorphic_map.items()
-            })
-    return type_column
-
-  def _types_to_type_models(self, types):
-    if types is None:
-      return all_models.all_models
-    return [m for m in all_models.all_models if m.__name__ in types]
+    match_query = self._get_match_query(terms)
+    if match_query is not None:
+      return and_(whitelist, match_query)
+    return and_(whitelist, MysqlRecordProperty.content.contains(terms))
+
+  def _use_match_query(self):
+    return getattr(settings, 'FULLTEXT_MATCH_SEARCH', False) \
+        and db.engine.dialect.name == 'mysql'
+
+  def _get_match_query(self, terms):
+    """Match the records with, for every word in `terms`, a word starting with
+    it, using the FULLTEXT index of `content` for words of at least the
+    minimum word length and the one of `ngrams` for shorter words. Words
+    which may be the start of a stopword are searched with LIKE instead.
+    Returns None if FULLTEXT search is off or `terms` has no words.
+    """
+    if not self._use_match_query():
+      return None
+    length = get_min_word_length()
+    words = sorted(set(tokenize(terms)))
+    long_words = [word for word in words if len(word) >= length]
+    short_words = [word for word in words if len(word) < length]
+    clauses = [
+        MysqlRecordProperty.content.contains(word)
+        for word in long_words if is_stopword_prefix(word)]
+    long_words = [word for word in long_words if not is_stopword_prefix(word)]
+    if long_words:
+      clauses.append(MysqlRecordProperty.content.match(
+          ' '.join('+{0}*'.format(word) for word in long_words)))
+    if short_words:
+      clauses.append(MysqlRecordProperty.ngrams.match(
+          ' '.join('+' + pad_ngram(word, length) for word in short_words)))
+    if not clauses:
+      return None
+    return and_(*clauses)
+
+  def normalize_terms(self, terms):
+    """`terms` reduced to what the filter depends on, i.e. to its distinct
+    words when searching with MATCH
+    """
+    if terms and self._use_match_query():
+      words = sorted(set(tokenize(terms)))
+      if words:
+        return ' '.join(words)
+    return terms
+
+  def rebuild_assignments(self):
+    rebuild_assignments()
+    db.session.commit()
 
   # filters by "myview" for a given person
   def _add_owner_query(self, query, types=None, contact_id=None):
     '''
     Finds all objects which might appear on a user's Profile or Dashboard
-    pages, including:
-
-      Objects mapped via ObjectPerson
-      Objects owned via ObjectOwner
-      Objects in private contexts via UserRole (e.g. for Private Programs)
-      Objects for which the user is the "contact"
-      Objects for which the user is the "primary_assessor" or "secondary_assessor"
-      Audits for which the user is assigned a Request or Response
+    pages, i.e. the objects the user is assigned to (see `assignments`).
 
     This method only *limits* the result set -- Contexts and Roles will still
     filter out forbidden objects.
@@ -145,141 +215,45 @@ class MysqlIndexer(SqlIndexer):
     if not contact_id:
       return query
 
-    type_models = self._types_to_type_models(types)
-
-    model_names = [model.__name__ for model in type_models]
-
-    models = []
-    for model in type_models:
-      base_model = model._sa_class_manager.mapper.primary_base_mapper.class_
-      if base_model not in models:
-        models.append(base_model)
-
-    models = [(model, self._get_type_select_column(model)) for model in models]
-
-    type_union_queries = []
-
-    # Objects to which the user is "mapped"
-    object_people_query = db.session.query(
-        ObjectPerson.personable_id.label('id'),
-        ObjectPerson.personable_type.label('type'),
-        literal(None).label('context_id')
-      ).filter(
-          and_(
-            ObjectPerson.person_id == contact_id,
-            ObjectPerson.personable_type.in_(model_names)
-          )
-      )
-    type_union_queries.append(object_people_query)
-
-    # Objects for which the user is an "owner"
-    object_owners_query = db.session.query(
-        ObjectOwner.ownable_id.label('id'),
-        ObjectOwner.ownable_type.label('type'),
-        literal(None).label('context_id')
-      ).filter(
-          and_(
-            ObjectOwner.person_id == contact_id,
-            ObjectOwner.ownable_type.in_(model_names),
-          )
-      )
-    type_union_queries.append(object_owners_query)
-
-    # FIXME The following line crashes if the Workflow extension is not enabled
-    for model in [all_models.Program, all_models.Audit, all_models.Workflow]:
-      context_query = db.session.query(
-          model.id.label('id'),
-          literal(model.__name__).label('type'),
-          literal(None).label('context_id'),
-        ).join(
-            UserRole,
-            and_(
-              UserRole.context_id == model.context_id,
-              UserRole.person_id == contact_id,
-            )
-        )
-      type_union_queries.append(context_query)
-
-    for model, type_column in models:
-      # Audits where the user is assigned a Request or a Response
-      if model is all_models.Audit:
-        model_type_query = db.session.query(
-            Request.audit_id.label('id'),
-            type_column.label('type'),
-            literal(None).label('context_id')
-          ).join(Response).filter(
-              or_(
-                Request.assignee_id == contact_id,
-                Response.contact_id == contact_id
-              )
-          ).distinct()
-        type_union_queries.append(model_type_query)
-
-      # Objects for which the user is the "contact" or "secondary contact"
-      if hasattr(model, 'contact_id'):
-        model_type_query = db.session.query(
-            model.id.label('id'),
-            type_column.label('type'),
-            literal(None).label('context_id')
-          ).filter(
-              model.contact_id == contact_id
-          ).distinct()
-        type_union_queries.append(model_type_query)
-      # Objects for which the user is the "contact"
-      if hasattr(model, 'secondary_contact_id'):
-        model_type_query = db.session.query(
-            model.id.label('id'),
-            type_column.label('type'),
-            literal(None).label('context_id')
-          ).filter(
-              model.secondary_contact_id == contact_id
-          ).distinct()
-        type_union_queries.append(model_type_query)
-
-
-      if model is all_models.Control:
-        # Control also has `principal_assessor` and `secondary_assessor`
-        assessor_queries = []
-        if hasattr(model, 'principal_assessor_id'):
-          assessor_queries.append(or_(model.principal_assessor_id == contact_id))
-        if hasattr(model, 'secondary_assessor_id'):
-          assessor_queries.append(or_(model.secondary_assessor_id == contact_id))
-
-        model_type_query = db.session.query(
-            model.id.label('id'),
-            type_column.label('type'),
-            literal(None).label('context_id')
-          ).filter(
-              or_(*assessor_queries)
-          ).distinct()
-        type_union_queries.append(model_type_query)
-
-    # Construct and JOIN to the UNIONed result set
-    type_union_query = alias(union(*type_union_queries))
+    assignments = db.session.query(
+        PersonObjectAssignment.object_type.label('type'),
+        PersonObjectAssignment.object_id.label('id'),
+      ).filter(PersonObjectAssignment.person_id == contact_id)
+    if types is not None:
+      assignments = assignments.filter(
+          PersonObjectAssignment.object_type.in_(types))
+    # A person can be assigned to an object for several reasons
+    assignments = assignments.distinct().subquery()
     query = query.join(
-        type_union_query,
+        assignments,
         and_(
-          type_union_query.c.id == MysqlRecordProperty.key,
-          type_union_query.c.type == MysqlRecordProperty.type),
+          assignments.c.id == MysqlRecordProperty.key,
+          assignments.c.type == MysqlRecordProperty.type),
       )
 
     return query
 
-  def _add_extra_params_query(self, query, type, extra_param):
+  def _get_extra_params_filter(self, type, extra_param):
     if not extra_param:
-      return query
+      return None
 
     models = [m for m in all_models.all_models if m.__name__ == type]
 
     if len(models) == 0:
-      return query
+      return None
     model = models[0]
 
-    return query.filter(self.record_type.key.in_(
+    return self.record_type.key.in_(
         db.session.query(
             model.id.label('id')
         ).filter_by(**extra_param)
-    ))
+    )
+
+  def _add_extra_params_query(self, query, type, extra_param):
+    extra_filter = self._get_extra_params_filter(type, extra_param)
+    if extra_filter is None:
+      return query
+    return query.filter(extra_filter)
 
   def _get_grouped_types(self, types, extra_params=None):
     model_names = [model.__name__ for model in all_models.all_models]
@@ -290,8 +264,9 @@ class MysqlIndexer(SqlIndexer):
       model_names = [m for m in model_names if m not in extra_params]
     return model_names
 
-  def search(
-      self, terms, types=None, permission_type='read', permission_model=None, contact_id=None, extra_params={}):
+  def _get_search_query(
+      self, terms, types=None, permission_type='read', permission_model=None,
+      contact_id=None, extra_params={}):
     model_names = self._get_grouped_types(types, extra_params)
     query = db.session.query(
         self.record_type.key, self.record_type.type,
@@ -319,38 +294,101 @@ class MysqlIndexer(SqlIndexer):
       q = self._add_owner_query(q, [k], contact_id)
       q = self._add_extra_params_query(q, k, v)
       unions.append(q)
+    return query.union(*unions)
+
+  def search(
+      self, terms, types=None, permission_type='read', permission_model=None, contact_id=None, extra_params={}):
+    query = self._get_search_query(
+        terms, types, permission_type, permission_model, contact_id,
+        extra_params)
     # Sort by title:
     # FIXME: This only orders by `title` if title was the matching property
-    query = query.union(*unions)
     query = query.order_by(case(
       [(self.record_type.property == "title", self.record_type.content)],
       else_=literal("ZZZZZ")))
     return query
 
+  def _get_weight_column(self, property_column):
+    """The weight of a match in each property, from
+    `FULLTEXT_PROPERTY_WEIGHTS`. A weight given for `name` also applies to
+    properties named `name_<suffix>`, e.g. `attribute_value_<id>`.
+    """
+    weights = getattr(settings, 'FULLTEXT_PROPERTY_WEIGHTS', {})
+    # Compare prefixes directly, as `_` is a wildcard in LIKE patterns
+    whens = [
+        (or_(property_column == name,
+             func.substr(property_column, 1, len(name) + 1) == name + '_'),
+         literal(weight))
+        for name, weight in sorted(weights.items())]
+    default = literal(getattr(settings, 'FULLTEXT_DEFAULT_PROPERTY_WEIGHT', 1))
+    if not whens:
+      return default
+    return case(whens, else_=default)
+
+  def ranked_search(
+      self, terms, limit=None, offset=0, types=None, permission_type='read',
+      permission_model=None, contact_id=None, extra_params={}):
+    """Rank the matching objects by the summed weights of their matching
+    properties. Returns one `(key, type, score)` row per object, best first
+    and then by title, from `offset` on and at most `limit` of them.
+    """
+    matches = self._get_search_query(
+        terms, types, permission_type, permission_model, contact_id,
+        extra_params).subquery()
+    key, type, property, content = matches.c
+    title = func.max(case([(property.in_(['title', 'name']), content)]))
+    score = func.sum(self._get_weight_column(property))
+    query = db.session.query(
+        key.label('key'), type.label('type'), score.label('score'))
+    query = query.group_by(key, type)
+    # Objects without a matching title go last, as MySQL sorts NULLs first
+    query = query.order_by(desc(score), title == None, title, type, key)
+    if offset:
+      query = query.offset(offset)
+    if limit is not None:
+      query = query.limit(limit)
+    return query
+
   def counts(self, terms, group_by_type=True, types=None, contact_id=None, extra_params={}, extra_columns={}):
+    """Count the matching objects by type, and for every extra column, an
+    alias of a type, the ones matching its filters in `extra_params`.
+
+    The permission, terms and owner filters are applied once: every count is
+    an aggregate of the same grouped scan of the matching records. Returns
+    `(type, count, extra column)` rows, with an empty extra column for the
+    counts by type, and no rows for zero counts.
+    """
     model_names = self._get_grouped_types(types, extra_params)
-    query = db.session.query(
-        self.record_type.type, func.count(distinct(self.record_type.key)), literal(""))
-    query = query.filter(self._get_type_query(model_names))
-    query = query.filter(self._get_filter_query(terms))
-    query = self._add_owner_query(query, types, contact_id)
-    query = query.group_by(self.record_type.type)
     all_extra_columns = dict(extra_columns.items() +
         [(p, p) for p in extra_params if p not in extra_columns]
     )
-    if not all_extra_columns:
-      return query.all()
+    extra_names = sorted(all_extra_columns)
+    counted_types = list(
+        set(model_names) | set(all_extra_columns.values()))
+
+    key = self.record_type.key
+    columns = [self.record_type.type, func.count(distinct(key))]
+    for name in extra_names:
+      extra_filter = self._get_extra_params_filter(
+          all_extra_columns[name], extra_params.get(name, None))
+      if extra_filter is None:
+        columns.append(func.count(distinct(key)))
+      else:
+        columns.append(func.count(distinct(case([(extra_filter, key)]))))
+    query = db.session.query(*columns)
+    query = query.filter(self._get_type_query(counted_types))
+    query = query.filter(self._get_filter_query(terms))
+    query = self._add_owner_query(query, counted_types, contact_id)
+    query = query.group_by(self.record_type.type)
 
-    # Add extra_params and extra_colums:
-    for k, v in all_extra_columns.iteritems():
-      q = db.session.query(
-          self.record_type.type, func.count(distinct(self.record_type.key)), literal(k))
-      q = q.filter(self._get_type_query([v]))
-      q = q.filter(self._get_filter_query(terms))
-      q = self._add_owner_query(q, [v], contact_id)
-      q = self._add_extra_params_query(q, v, extra_params.get(k, None))
-      q = q.group_by(self.record_type.type)
-      query = query.union(q)
-    return query.all()
+    results = []
+    for row in query:
+      type, count = row[0], row[1]
+      if type in model_names:
+        results.append((type, count, ""))
+      for name, extra_count in zip(extra_names, row[2:]):
+        if all_extra_columns[name] == type and extra_count:
+          results.append((type, extra_count, name))
+    return results
 
 Indexer = MysqlIndexer
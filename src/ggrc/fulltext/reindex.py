@@ -0,0 +1,209 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Rebuild the full text index from scratch.
+
+Each indexed model is split into chunks of `FULLTEXT_REINDEX_CHUNK_SIZE`
+consecutive ids. Chunks are indexed into the indexer's shadow table, either
+in this process or, if `FULLTEXT_REINDEX_PROCESSES` is greater than 1, by a
+pool of worker processes. When all chunks are done the shadow table replaces
+the index table, so searches keep working on the old index meanwhile.
+
+Finished chunks are checkpointed in the parameters of the `BackgroundTask`, so
+if the task is run again after being interrupted it continues where it
+stopped. Objects modified while the index was rebuilt are indexed again after
+the swap, and the rows of objects deleted meanwhile are removed.
+
+Indexers which keep an index of the people assigned to objects (see
+`ggrc.fulltext.assignments`) rebuild it at the end.
+"""
+
+from flask import current_app
+from multiprocessing import Pool
+from sqlalchemy import and_, exists, func
+from ggrc import db, settings
+from ggrc.fulltext import get_indexer, search_cache
+from ggrc.fulltext.recordbuilder import fts_record_for, model_is_indexed
+from ggrc.models import all_models, get_model
+from ggrc.utils import benchmark
+
+
+def get_indexed_models():
+  # Find all models then remove base classes
+  #   (If we don't remove base classes, we get duplicates in the index.)
+  inheritance_base_models = [
+      all_models.Directive, all_models.SectionBase, all_models.SystemOrProcess,
+      all_models.Response
+      ]
+  models = set(all_models.all_models) - set(inheritance_base_models)
+  return sorted(
+      [model for model in models if model_is_indexed(model)],
+      key=lambda model: model.__name__)
+
+
+def get_chunks(models, chunk_size):
+  """Split the rows of `models` into `(model_name, first_id, end_id)` ranges.
+  Ranges are aligned to multiples of `chunk_size`, so they don't change when
+  rows are added or removed.
+  """
+  chunks = []
+  for model in models:
+    min_id, max_id = db.session.query(
+        func.min(model.id), func.max(model.id)).one()
+    if min_id is None:
+      continue
+    for first_id in range(min_id - min_id % chunk_size, max_id + 1, chunk_size):
+      chunks.append((model.__name__, first_id, first_id + chunk_size))
+  return chunks
+
+
+def _get_model_query(model):
+  mapper_class = model._sa_class_manager.mapper.base_mapper.class_
+  return model.query.options(
+      db.undefer_group(mapper_class.__name__ + '_complete'),
+      )
+
+
+def index_chunk(indexer, table, model_name, first_id, end_id):
+  """Index the objects in one chunk into `table`. Rows already written for
+  the chunk, e.g. by an interrupted run, are replaced.
+  """
+  model = get_model(model_name)
+  query = _get_model_query(model)\
+      .filter(model.id >= first_id, model.id < end_id)
+  records = [fts_record_for(instance) for instance in query]
+
+  properties_by_type = {}
+  for record in records:
+    keys, properties = properties_by_type.setdefault(
+        record.type, (set(), set()))
+    keys.add(record.key)
+    properties.update(record.properties.keys())
+  for type, (keys, properties) in properties_by_type.items():
+    db.session.execute(table.delete().where(and_(
+        table.c.type == type,
+        table.c.key.in_(keys),
+        table.c.property.in_(properties))))
+
+  indexer.index_batch(creates=records, commit=False, table=table)
+  return len(records)
+
+
+def _init_worker():
+  # Connections inherited from the parent process must not be shared
+  db.engine.dispose()
+
+
+def _index_chunk_in_worker(chunk):
+  from ggrc.app import app
+  with app.app_context():
+    indexer = get_indexer()
+    count = index_chunk(indexer, indexer.get_shadow_table(), *chunk)
+    db.session.commit()
+    db.session.remove()
+  return chunk, count
+
+
+def _index_chunks(indexer, chunks, processes):
+  if processes > 1:
+    # Workers use connections of their own, so they can't see uncommitted
+    #   changes
+    db.session.commit()
+    pool = Pool(processes, _init_worker)
+    try:
+      for chunk, count in pool.imap_unordered(_index_chunk_in_worker, chunks):
+        yield chunk, count
+      pool.close()
+    finally:
+      pool.terminate()
+      pool.join()
+  else:
+    table = indexer.get_shadow_table()
+    for chunk in chunks:
+      yield chunk, index_chunk(indexer, table, *chunk)
+
+
+def _get_checkpoint(task):
+  if task is None:
+    return None
+  return (task.parameters or {}).get('reindex_checkpoint')
+
+
+def _set_checkpoint(task, checkpoint):
+  if task is not None:
+    parameters = dict(task.parameters or {})
+    parameters['reindex_checkpoint'] = checkpoint
+    task.parameters = parameters
+    db.session.add(task)
+  db.session.commit()
+
+
+def _index_modified_since(indexer, models, since):
+  for model in models:
+    query = _get_model_query(model).filter(model.updated_at >= since)
+    indexer.index_batch(
+        updates=[fts_record_for(instance) for instance in query],
+        commit=False)
+  db.session.commit()
+
+
+def _delete_stale_records(indexer, models):
+  """Delete the index rows of objects which no longer exist, i.e. which were
+  deleted after their chunk was indexed
+  """
+  table = indexer.record_type.__table__
+  for model in models:
+    id_column = model._sa_class_manager.mapper.primary_key[0]
+    db.session.execute(table.delete().where(and_(
+        table.c.type == model.__name__,
+        ~exists().where(id_column == table.c.key))))
+  db.session.commit()
+
+
+def reindex(task=None, chunk_size=None, processes=None):
+  """Rebuild the full text index, resuming from the checkpoint in `task` if
+  there is one. Returns the number of indexed objects.
+  """
+  if chunk_size is None:
+    chunk_size = getattr(settings, 'FULLTEXT_REINDEX_CHUNK_SIZE', 1000)
+  if processes is None:
+    processes = getattr(settings, 'FULLTEXT_REINDEX_PROCESSES', 0)
+  indexer = get_indexer()
+  models = get_indexed_models()
+
+  checkpoint = _get_checkpoint(task)
+  if checkpoint is None or checkpoint['chunk_size'] != chunk_size \
+      or not indexer.has_shadow_table():
+    checkpoint = {
+        'chunk_size': chunk_size,
+        # Compared with `updated_at`, so use the database's clock
+        'started_at': db.session.query(func.now()).scalar(),
+        'done': [],
+        'count': 0,
+        }
+    indexer.create_shadow_table()
+    _set_checkpoint(task, checkpoint)
+
+  done = set(tuple(chunk) for chunk in checkpoint['done'])
+  chunks = [chunk for chunk in get_chunks(models, chunk_size)
+            if chunk not in done]
+  # Spans are aggregated by name, so keep counts out of it
+  current_app.logger.info("Reindexing {0} chunks".format(len(chunks)))
+  with benchmark("Reindex chunks"):
+    for chunk, count in _index_chunks(indexer, chunks, processes):
+      checkpoint['done'].append(chunk)
+      checkpoint['count'] += count
+      _set_checkpoint(task, checkpoint)
+
+  with benchmark("Swap in rebuilt index"):
+    indexer.swap_shadow_table()
+  _index_modified_since(indexer, models, checkpoint['started_at'])
+  with benchmark("Delete index rows of deleted objects"):
+    _delete_stale_records(indexer, models)
+  if hasattr(indexer, 'rebuild_assignments'):
+    indexer.rebuild_assignments()
+  search_cache.bump_generation()
+  _set_checkpoint(task, None)
+  return checkpoint['count']
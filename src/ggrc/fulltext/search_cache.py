@@ -0,0 +1,151 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Short-lived cache of search results and counts.
+
+Entries are keyed by a fingerprint of the contexts the user may search in for
+the requested types, so users with the same permissions share them, and by
+the normalized search parameters. They are kept for `SEARCH_CACHE_TTL`
+seconds in a process-local LRU and, if `MEMCACHE_MECHANISM` is enabled, in
+memcache as well.
+
+Keys also contain the index generation, which `update_index` and reindexing
+bump, so every change of the index invalidates all entries at once. Without
+memcache the generation only lives in this process, so other processes keep
+serving their entries until they expire.
+"""
+
+import hashlib
+import json
+from threading import RLock
+from ggrc import settings
+from ggrc.cache import LRUCache
+from ggrc.models import all_models
+from ggrc.rbac import permissions
+
+
+GENERATION_KEY = 'search:generation'
+ENTRY_KEY = 'search:{0}:{1}'
+
+_lock = RLock()
+_local_generation = 0
+_entries = None
+
+
+def _get_ttl():
+  return getattr(settings, 'SEARCH_CACHE_TTL', 30)
+
+
+def _get_entries():
+  global _entries
+  size = getattr(settings, 'SEARCH_CACHE_SIZE', 0)
+  if not size:
+    return None
+  with _lock:
+    if _entries is None:
+      _entries = LRUCache(size, _get_ttl())
+  return _entries
+
+
+def _get_memcache_client():
+  if getattr(settings, 'MEMCACHE_MECHANISM', False) is False:
+    return None
+  from ggrc.cache import get_cache_client
+  return get_cache_client()
+
+
+def get_generation(client=None):
+  """The current index generation."""
+  if client is not None:
+    generation = client.get(GENERATION_KEY)
+    if generation is None:
+      client.add(GENERATION_KEY, 0)
+      generation = client.get(GENERATION_KEY) or 0
+    return generation
+  return _local_generation
+
+
+def bump_generation():
+  """Invalidate all cached results, e.g. after the index changed."""
+  global _local_generation
+  with _lock:
+    _local_generation += 1
+    if _entries is not None:
+      _entries.flush_all()
+  client = _get_memcache_client()
+  if client is not None:
+    client.incr(GENERATION_KEY, initial_value=0)
+
+
+def clear():
+  """Drop the process-local entries, e.g. between tests."""
+  with _lock:
+    if _entries is not None:
+      _entries.flush_all()
+
+
+def get_stats():
+  entries = _get_entries()
+  if entries is None:
+    return None
+  return entries.get_stats()
+
+
+def _sorted(contexts):
+  return None if contexts is None else sorted(contexts)
+
+
+def get_permissions_fingerprint(
+    types=None, permission_type='read', permission_model=None):
+  """A hash of the contexts the current user may search in for `types`, or
+  for all types if it is None, like `MysqlIndexer._get_type_query` checks.
+  """
+  if types is None:
+    types = [model.__name__ for model in all_models.all_models]
+  contexts_for = getattr(
+      permissions, '{0}_contexts_for'.format(permission_type))
+  fingerprint = []
+  for model_name in sorted(set(types)):
+    read_contexts = None
+    if permission_model:
+      read_contexts = _sorted(permissions.read_contexts_for(model_name))
+    fingerprint.append((
+        model_name,
+        _sorted(contexts_for(permission_model or model_name)),
+        read_contexts))
+  return hashlib.sha1(json.dumps(fingerprint)).hexdigest()
+
+
+def cached(kind, compute, types=None, permission_type='read',
+           permission_model=None, **parameters):
+  """Return the result of `compute()`, a search of `types` which is fully
+  determined by the user's permissions and the JSON serializable
+  `parameters`, from the cache if it is there.
+  """
+  entries = _get_entries()
+  if entries is None:
+    return compute()
+
+  client = _get_memcache_client()
+  digest = hashlib.sha1(json.dumps([
+      kind,
+      get_permissions_fingerprint(types, permission_type, permission_model),
+      permission_type,
+      permission_model,
+      parameters,
+      ], sort_keys=True)).hexdigest()
+  key = ENTRY_KEY.format(get_generation(client), digest)
+
+  result = entries.get(key)
+  if result is None and client is not None:
+    result = client.get(key)
+    if result is not None:
+      entries.set(key, result)
+  if result is None:
+    result = compute()
+    entries.set(key, result)
+    if client is not None:
+      client.set(key, result, time=_get_ttl())
+  return result
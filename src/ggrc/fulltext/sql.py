@@ -3,20 +3,30 @@
 # Created By: david@reciprocitylabs.com
 # Maintained By: david@reciprocitylabs.com
 
+from collections import OrderedDict
+from itertools import chain
+from sqlalchemy import and_
 from ggrc import db
 from . import Indexer
 
 class SqlIndexer(Indexer):
+  # Maximum number of rows inserted, or keys deleted, per statement
+  batch_size = 1000
+
+  def get_row(self, record, property, content):
+    """The column values of the index row of one property of a record"""
+    return {
+        'key': record.key,
+        'type': record.type,
+        'context_id': record.context_id,
+        'tags': record.tags,
+        'property': property,
+        'content': content,
+        }
+
   def create_record(self, record, commit=True):
     for k,v in record.properties.items():
-      db.session.add(self.record_type(
-        key=record.key,
-        type=record.type,
-        context_id=record.context_id,
-        tags=record.tags,
-        property=k,
-        content=v,
-        ))
+      db.session.add(self.record_type(**self.get_row(record, k, v)))
     if commit:
       db.session.commit()
 
@@ -35,3 +45,78 @@ class SqlIndexer(Indexer):
     db.session.query(self.record_type).delete()
     if commit:
       db.session.commit()
+
+  def index_batch(
+      self, creates=(), updates=(), deletes=(), commit=True, table=None):
+    """Apply many index changes with multi-row statements instead of one
+    ORM object per property: first a single `DELETE` per type for the keys of
+    all updated and deleted records, then multi-row `INSERT`s for all created
+    and updated records. `table` defaults to the index table itself.
+    """
+    if table is None:
+      table = self.record_type.__table__
+
+    keys_by_type = OrderedDict()
+    for key, type in deletes:
+      keys_by_type.setdefault(type, set()).add(key)
+    for record in updates:
+      keys_by_type.setdefault(record.type, set()).add(record.key)
+    for type, keys in keys_by_type.items():
+      keys = list(keys)
+      for i in range(0, len(keys), self.batch_size):
+        db.session.execute(table.delete().where(and_(
+            table.c.type == type,
+            table.c.key.in_(keys[i:i + self.batch_size]))))
+
+    # Later records for the same property replace earlier ones, as they would
+    #   when indexing the records one by one.
+    rows = OrderedDict()
+    for record in chain(creates, updates):
+      for k, v in record.properties.items():
+        rows[(record.key, record.type, k)] = self.get_row(record, k, v)
+    rows = rows.values()
+    for i in range(0, len(rows), self.batch_size):
+      db.session.execute(table.insert().values(rows[i:i + self.batch_size]))
+
+    if commit:
+      db.session.commit()
+
+  def get_shadow_table(self):
+    """A table with the same columns as the index table, used to rebuild the
+    index while the current one is still being searched.
+    """
+    table = self.record_type.__table__
+    return db.Table(
+        table.name + '_shadow', db.MetaData(),
+        *[column.copy() for column in table.columns])
+
+  def create_shadow_table(self):
+    shadow = self.get_shadow_table()
+    shadow.drop(db.engine, checkfirst=True)
+    if db.engine.dialect.name == 'mysql':
+      # Also copies the indexes, including the FULLTEXT one
+      db.engine.execute('CREATE TABLE {0} LIKE {1}'.format(
+          shadow.name, self.record_type.__tablename__))
+    else:
+      shadow.create(db.engine)
+    return shadow
+
+  def has_shadow_table(self):
+    return db.engine.has_table(self.get_shadow_table().name)
+
+  def swap_shadow_table(self):
+    """Replace the index table with the shadow table."""
+    live = self.record_type.__tablename__
+    shadow = self.get_shadow_table().name
+    old = live + '_old'
+    db.session.commit()
+    if db.engine.dialect.name == 'mysql':
+      # `RENAME TABLE` renames both tables atomically
+      db.engine.execute('RENAME TABLE {0} TO {1}, {2} TO {0}'.format(
+          live, old, shadow))
+    else:
+      with db.engine.begin() as connection:
+        connection.execute('ALTER TABLE {0} RENAME TO {1}'.format(live, old))
+        connection.execute(
+            'ALTER TABLE {0} RENAME TO {1}'.format(shadow, live))
+    db.engine.execute('DROP TABLE {0}'.format(old))
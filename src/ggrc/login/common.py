@@ -9,7 +9,7 @@
 from ggrc import db
 from ggrc.models.context import Context
 from ggrc.models.person import Person
-from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexer, search_cache
 from ggrc.fulltext.recordbuilder import fts_record_for
 from ggrc.services.common import log_event
 
@@ -42,6 +42,7 @@ def create_user(email, **kwargs):
   db.session.add(user_context)
   db.session.commit()
   get_indexer().create_record(fts_record_for(user))
+  search_cache.bump_generation()
   return user
 
 def find_or_create_user_by_email(email, **kwargs):
@@ -0,0 +1,41 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Store revision content as possibly compressed JSON in a MEDIUMBLOB
+
+Existing rows stay valid, uncompressed JSON. Run
+`bin/db_recompress_revisions` to compress them.
+
+Revision ID: 1c3f6b8f2a4d
+Revises: 3261848aaa2b
+Create Date: 2015-06-01 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '1c3f6b8f2a4d'
+down_revision = '3261848aaa2b'
+
+
+def upgrade():
+  op.alter_column(
+      'revisions', 'content',
+      type_=sa.LargeBinary(length=16777215),
+      existing_type=sa.Text(),
+      existing_nullable=False)
+
+
+def downgrade():
+  from ggrc.models.revision import recompress_revisions
+  # Content longer than TEXT can hold is lost, as in any shrinking downgrade
+  recompress_revisions(op.get_bind(), threshold=False)
+  op.alter_column(
+      'revisions', 'content',
+      type_=sa.Text(),
+      existing_type=sa.LargeBinary(length=16777215),
+      existing_nullable=False)
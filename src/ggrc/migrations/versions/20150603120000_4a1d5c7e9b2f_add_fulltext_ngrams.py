@@ -0,0 +1,36 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Add FULLTEXT indexed n-grams of short word prefixes to the full text index
+
+The n-grams are filled in by reindexing, e.g. with `/admin/reindex`.
+
+Revision ID: 4a1d5c7e9b2f
+Revises: 1c3f6b8f2a4d
+Create Date: 2015-06-03 12:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4a1d5c7e9b2f'
+down_revision = '1c3f6b8f2a4d'
+
+
+def upgrade():
+  op.execute("""
+      ALTER TABLE fulltext_record_properties
+        ADD COLUMN ngrams TEXT,
+        ADD FULLTEXT INDEX fulltext_record_properties_ngrams_idx (ngrams)
+      """)
+
+
+def downgrade():
+  op.execute("""
+      ALTER TABLE fulltext_record_properties
+        DROP INDEX fulltext_record_properties_ngrams_idx,
+        DROP COLUMN ngrams
+      """)
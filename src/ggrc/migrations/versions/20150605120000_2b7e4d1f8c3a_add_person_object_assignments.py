@@ -0,0 +1,41 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Add the index of people assigned to objects used by "My Work" searches
+
+The table is filled by a migration of `ggrc_basic_permissions`, which runs
+once the tables the assignments are read from exist, and by reindexing, e.g.
+with `/admin/reindex`.
+
+Revision ID: 2b7e4d1f8c3a
+Revises: 4a1d5c7e9b2f
+Create Date: 2015-06-05 12:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2b7e4d1f8c3a'
+down_revision = '4a1d5c7e9b2f'
+
+
+def upgrade():
+  op.create_table(
+      'person_object_assignments',
+      sa.Column('person_id', sa.Integer(), nullable=False),
+      sa.Column('object_type', sa.String(length=250), nullable=False),
+      sa.Column('object_id', sa.Integer(), nullable=False),
+      sa.Column('reason', sa.String(length=64), nullable=False),
+      sa.PrimaryKeyConstraint('person_id', 'object_type', 'object_id', 'reason')
+  )
+  op.create_index(
+      'ix_person_object_assignments_object', 'person_object_assignments',
+      ['object_type', 'object_id'], unique=False)
+
+
+def downgrade():
+  op.drop_table('person_object_assignments')
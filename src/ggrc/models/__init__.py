@@ -113,6 +113,11 @@ def init_session_monitor_cache():
   event.listen(Session, 'after_commit', clear_cache)
   event.listen(Session, 'after_rollback', clear_cache)
 
+  from ggrc.services.common import (
+      start_deferred_revision_tasks, discard_deferred_revision_tasks)
+  event.listen(Session, 'after_commit', start_deferred_revision_tasks)
+  event.listen(Session, 'after_rollback', discard_deferred_revision_tasks)
+
 
 def init_sanitization_hooks():
   # Register event listener on all String and Text attributes to sanitize them.
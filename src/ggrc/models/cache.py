@@ -3,14 +3,75 @@
 # Created By: vraj@reciprocitylabs.com
 # Maintained By: dan@reciprocitylabs.com
 
+class LogJsonMap(object):
+  """
+  Read-only mapping of tracked objects to their `log_json` snapshots.
+  """
+  def __init__(self, log_jsons):
+    self._log_jsons = log_jsons
+
+  def __iter__(self):
+    return iter(self._log_jsons)
+
+  def __len__(self):
+    return len(self._log_jsons)
+
+  def __contains__(self, obj):
+    return obj in self._log_jsons
+
+  def __getitem__(self, obj):
+    return self._log_jsons[obj]
+
+  def keys(self):
+    return list(self._log_jsons)
+
+  def items(self):
+    return list(self._log_jsons.items())
+
+
+class CacheView(object):
+  """
+  Read-only view of the objects modified up to the moment it was taken.
+  """
+  def __init__(self, new, dirty, deleted):
+    self.new = LogJsonMap(new)
+    self.dirty = LogJsonMap(dirty)
+    self.deleted = LogJsonMap(deleted)
+
+
 class Cache:
   """
   Tracks modified objects in the session distinguished by
   type of modification: new, dirty and deleted.
+
+  The `log_json` of each object is recorded before the flush, as afterwards
+  its server-side defaults are expired (reloading them costs a query per
+  object) and it may have been deleted. It is only recorded again when a
+  later flush finds the object modified again.
   """
   def __init__(self):
     self.clear()
 
+  @property
+  def new(self):
+    return LogJsonMap(self._new)
+
+  @property
+  def dirty(self):
+    return LogJsonMap(self._dirty)
+
+  @property
+  def deleted(self):
+    return LogJsonMap(self._deleted)
+
+  def _writable(self):
+    # Views share the dicts until the next change (copy on write)
+    if self._shared:
+      self._new = dict(self._new)
+      self._dirty = dict(self._dirty)
+      self._deleted = dict(self._deleted)
+      self._shared = False
+
   def update_before_flush(self, session, flush_context):
     """
     Before the flush happens, we can still access to-be-deleted objects, so
@@ -18,14 +79,19 @@ class Cache:
     """
     for o in session.new:
       if hasattr(o, 'log_json'):
-        self.new[o] = o.log_json()
+        self._writable()
+        self._new[o] = o.log_json()
     for o in session.deleted:
-      if hasattr(o, 'log_json'):
-        self.deleted[o] = o.log_json()
-    dirty = set(o for o in session.dirty if session.is_modified(o))
-    for o in dirty - set(self.new) - set(self.deleted):
-      if hasattr(o, 'log_json'):
-        self.dirty[o] = o.log_json()
+      if o not in self._deleted and hasattr(o, 'log_json'):
+        self._writable()
+        self._deleted[o] = o.log_json()
+        self._dirty.pop(o, None)
+    for o in session.dirty:
+      if o in self._new or o in self._deleted:
+        continue
+      if hasattr(o, 'log_json') and session.is_modified(o):
+        self._writable()
+        self._dirty[o] = o.log_json()
 
   def update_after_flush(self, session, flush_context):
     """
@@ -33,22 +99,29 @@ class Cache:
     modified (deletes due to cascades are not known pre-flush), so fix up
     cache.
     """
-    for o in self.dirty.keys():
-      # SQLAlchemy magic to determine whether object was actually deleted due
-      #   to `cascade="all,delete-orphan"`
-      # If an object was actually deleted, move it into `deleted`
-      if flush_context.is_deleted(o._sa_instance_state):
-        self.deleted[o] = self.dirty[o]
-        del self.dirty[o]
+    # SQLAlchemy magic to determine whether object was actually deleted due
+    #   to `cascade="all,delete-orphan"`: only the states of this flush need
+    #   to be checked
+    for state, (is_delete, _) in flush_context.states.items():
+      if not is_delete:
+        continue
+      o = state.obj()
+      # If an object was actually deleted, move its snapshot from before the
+      #   flush into `deleted`, as it can't be loaded anymore
+      if o is not None and o in self._dirty:
+        self._writable()
+        self._deleted.setdefault(o, self._dirty.pop(o))
 
   def clear(self):
-    self.new = {}
-    self.dirty = {}
-    self.deleted = {}
-
-  def copy(self):
-    copied_cache = Cache()
-    copied_cache.new = dict(self.new)
-    copied_cache.dirty = dict(self.dirty)
-    copied_cache.deleted = dict(self.deleted)
-    return copied_cache
+    self._new = {}
+    self._dirty = {}
+    self._deleted = {}
+    self._shared = False
+
+  def view(self):
+    """
+    A read-only view of the objects modified so far, which is not affected by
+    later flushes or by clearing the cache at commit.
+    """
+    self._shared = True
+    return CacheView(self._new, self._dirty, self._deleted)
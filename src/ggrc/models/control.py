@@ -87,7 +87,7 @@ class AssertionCategorized(Categorizable):
 
 class Control(HasObjectState, Relatable, CustomAttributable, Documentable,
               Personable, ControlCategorized, AssertionCategorized,
-              Hierarchical, Timeboxed, Ownable, BusinessObject, Auditable,
+              Hierarchical, Timeboxed, Ownable, Auditable, BusinessObject,
               TestPlanned, db.Model):
   __tablename__ = 'controls'
 
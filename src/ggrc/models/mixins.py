@@ -582,6 +582,13 @@ class CustomAttributable(object):
   _include_links = []
   _aliases = {"custom_attributes": "Custom Attributes"}
 
+  @classmethod
+  def eager_query(cls):
+    from sqlalchemy import orm
+
+    query = super(CustomAttributable, cls).eager_query()
+    return query.options(orm.subqueryload('custom_attribute_values'))
+
   @declared_attr
   def custom_attribute_definitions(cls):
     # FIXME definitions should be class scoped, not instance scoped.
@@ -3,12 +3,21 @@
 # Created By: vraj@reciprocitylabs.com
 # Maintained By: vraj@reciprocitylabs.com
 
-from ggrc import db
+import sqlalchemy as sa
+from sqlalchemy.sql import column, table
+from ggrc import db, settings
 from .all_models import Directive
 from .mixins import Base
-from .types import JsonType
+from .types import CompressedJsonType
 from .computed_property import computed_property
 
+
+def _content_type(threshold=None):
+  if threshold is None:
+    threshold = getattr(settings, 'REVISION_COMPRESSION_THRESHOLD', 1024)
+  return CompressedJsonType(threshold)
+
+
 class Revision(Base, db.Model):
   __tablename__ = 'revisions'
 
@@ -16,7 +25,7 @@ class Revision(Base, db.Model):
   resource_type = db.Column(db.String, nullable = False)
   event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable = False)
   action = db.Column(db.Enum(u'created', u'modified', u'deleted'), nullable = False)
-  content = db.Column(JsonType, nullable=False)
+  content = db.Column(_content_type(), nullable=False)
 
   @staticmethod
   def _extra_table_args(cls):
@@ -96,3 +105,42 @@ class Revision(Base, db.Model):
     if self.event.action == "IMPORT":
       result += ", via spreadsheet import"
     return result
+
+
+def recompress_revisions(connection, chunk_size=1000, threshold=None,
+                         start_id=0):
+  """Rewrite the content of the revisions with an id of at least `start_id`
+  as compact JSON compressed above `threshold` bytes (never if `threshold` is
+  False), in transactions of `chunk_size` revisions. Returns the number of
+  revisions rewritten.
+
+  Contents are decoded whether they were compressed or not, so the revisions
+  can be rewritten again, e.g. with another threshold or after an
+  interruption.
+  """
+  if threshold is False:
+    content_type = CompressedJsonType(None)
+  else:
+    content_type = _content_type(threshold)
+  revisions = table(
+      'revisions', column('id', sa.Integer), column('content', content_type))
+  update = revisions.update()\
+      .where(revisions.c.id == sa.bindparam('revision_id'))\
+      .values(content=sa.bindparam('revision_content'))
+  count = 0
+  while True:
+    transaction = connection.begin()
+    rows = connection.execute(
+        sa.select([revisions.c.id, revisions.c.content])
+        .where(revisions.c.id >= start_id)
+        .order_by(revisions.c.id)
+        .limit(chunk_size)).fetchall()
+    if rows:
+      connection.execute(update, [
+          {'revision_id': id, 'revision_content': content}
+          for id, content in rows])
+    transaction.commit()
+    if not rows:
+      return count
+    count += len(rows)
+    start_id = rows[-1][0] + 1
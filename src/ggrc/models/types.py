@@ -27,11 +27,51 @@ class JsonType(types.TypeDecorator):
     else:
       value = as_json(value)
       # Detect if the byte-length of the encoded JSON is larger than the
-      # database "TEXT" column type can handle
-      if len(value.encode('utf-8')) > 65534:
+      # database "TEXT" column type can handle. `as_json` escapes non ASCII
+      # characters, so there is no need to encode it to count the bytes.
+      if len(value) > 65534:
         raise ValidationError("Log record content too long")
     return value
 
+class CompressedJsonType(types.TypeDecorator):
+  '''
+  Marshals Python structures to and from compact JSON as LargeBinary in the
+  db. JSON longer than `threshold` bytes is stored zlib compressed, behind a
+  marker byte which can not start JSON, so uncompressed rows, e.g. ones
+  written to a former TEXT column, are read as they are.
+  '''
+  impl = types.LargeBinary(length=16777215)
+  COMPRESSED_MARKER = 'z'
+
+  def __init__(self, threshold=1024, *args, **kwargs):
+    super(CompressedJsonType, self).__init__(*args, **kwargs)
+    self.threshold = threshold
+
+  def process_result_value(self, value, dialect):
+    import zlib
+    if value is not None:
+      value = str(value)
+      if value.startswith(self.COMPRESSED_MARKER):
+        value = zlib.decompress(value[len(self.COMPRESSED_MARKER):])
+      value = json.loads(value)
+    return value
+
+  def process_bind_param(self, value, dialect):
+    import zlib
+    if value is None:
+      return value
+    if not isinstance(value, basestring):
+      value = as_json(value, separators=(',', ':'))
+    if isinstance(value, unicode):
+      value = value.encode('utf-8')
+    if self.threshold is not None and len(value) > self.threshold:
+      value = self.COMPRESSED_MARKER + zlib.compress(value)
+    # Detect if the byte-length of the stored content is larger than the
+    # database "LargeBinary" column type can handle
+    if len(value) > 16777215:
+      raise ValidationError("Log record content too long")
+    return value
+
 class CompressedType(types.TypeDecorator):
   '''
   Marshals Python structures to and from a compressed pickle format
@@ -0,0 +1,308 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Per-request profiles built from `ggrc.utils.benchmark` blocks.
+
+While a request is handled, every `benchmark` block becomes a span in a tree
+rooted at the request. SQL statements are counted, and timed, in the
+innermost open span. When the request ends, the durations of the request and
+of its spans are recorded for percentiles, and requests slower than
+`PROFILER_SLOW_REQUEST_MS` are kept, with their span tree, in a ring buffer
+of the last `PROFILER_SLOW_REQUEST_BUFFER` slow requests.
+
+Query budgets, `PROFILER_QUERY_BUDGETS`, map a request name ("METHOD rule")
+or a span name to the most SQL statements it may execute. Requests and spans
+over their budget are logged with the statements they executed, or fail the
+request if `PROFILER_QUERY_BUDGETS_RAISE` is set, as it should be in tests.
+Only `PROFILER_SAMPLE_RATE` of the requests are profiled.
+
+All data is kept in the process serving the requests.
+"""
+
+import json
+import random
+import time
+from collections import deque
+from threading import RLock
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ggrc import settings
+
+
+class Span(object):
+  def __init__(self, name):
+    self.name = name
+    self.start = time.time()
+    self.end = None
+    self.query_count = 0
+    self.query_time = 0.0
+    self.statements = []
+    self.children = []
+
+  @property
+  def duration(self):
+    return (self.end or time.time()) - self.start
+
+  def iter_spans(self):
+    yield self
+    for child in self.children:
+      for span in child.iter_spans():
+        yield span
+
+  @property
+  def total_query_count(self):
+    return sum(span.query_count for span in self.iter_spans())
+
+  def iter_statements(self):
+    for span in self.iter_spans():
+      for statement in span.statements:
+        yield statement
+
+  def to_dict(self):
+    return {
+        'name': self.name,
+        'duration_ms': self.duration * 1000,
+        'query_count': self.query_count,
+        'query_ms': self.query_time * 1000,
+        'children': [child.to_dict() for child in self.children],
+        }
+
+
+class QueryBudgetExceeded(AssertionError):
+  def __init__(self, violations):
+    self.violations = violations
+    super(QueryBudgetExceeded, self).__init__('\n'.join(
+        '{name}: {query_count} queries, budget {budget}:\n  {0}'.format(
+            '\n  '.join(violation['statements']), **violation)
+        for violation in violations))
+
+
+class RequestProfile(object):
+  MAX_STATEMENTS = 200
+
+  def __init__(self, name):
+    self.root = Span(name)
+    self.stack = [self.root]
+    self.statement_count = 0
+
+  @property
+  def current(self):
+    return self.stack[-1]
+
+  def push(self, name):
+    span = Span(name)
+    self.current.children.append(span)
+    self.stack.append(span)
+    return span
+
+  def pop(self, span):
+    span.end = time.time()
+    # Ignore spans that were not closed, e.g. because of exceptions
+    while len(self.stack) > 1 and self.stack.pop() is not span:
+      pass
+
+  def finish(self):
+    self.root.end = time.time()
+    self.stack = [self.root]
+
+  def add_statement(self, statement, duration):
+    span = self.current
+    span.query_count += 1
+    span.query_time += duration
+    # Keep the first statements only, so that a runaway loop of queries does
+    #   not keep all of them in memory
+    if self.statement_count < self.MAX_STATEMENTS:
+      span.statements.append(statement)
+      self.statement_count += 1
+
+  def check_budgets(self, budgets):
+    """The spans executing more statements than their budget in `budgets`,
+    a dict of span names to query counts.
+    """
+    violations = []
+    for span in self.root.iter_spans():
+      budget = budgets.get(span.name)
+      if budget is not None and span.total_query_count > budget:
+        violations.append({
+            'name': span.name,
+            'budget': budget,
+            'query_count': span.total_query_count,
+            'statements': list(span.iter_statements()),
+            })
+    return violations
+
+  def to_dict(self):
+    result = self.root.to_dict()
+    spans = list(self.root.iter_spans())
+    result['total_query_count'] = sum(span.query_count for span in spans)
+    result['total_query_ms'] = sum(span.query_time for span in spans) * 1000
+    return result
+
+
+class Reservoir(object):
+  """The last `size` durations recorded for a name"""
+
+  def __init__(self, size):
+    self.size = size
+    self.durations = {}
+
+  def add(self, name, duration):
+    durations = self.durations.get(name)
+    if durations is None:
+      durations = self.durations[name] = deque(maxlen=self.size)
+    durations.append(duration)
+
+  def percentiles(self, points=(50, 90, 99)):
+    result = {}
+    for name, durations in self.durations.items():
+      ordered = sorted(durations)
+      result[name] = {'count': len(ordered)}
+      for point in points:
+        index = min(len(ordered) - 1, int(len(ordered) * point / 100.0))
+        result[name]['p{0}_ms'.format(point)] = ordered[index] * 1000
+    return result
+
+
+class Profiler(object):
+  def __init__(self, reservoir_size=1000, buffer_size=50):
+    self._lock = RLock()
+    self.reservoir_size = reservoir_size
+    self.buffer_size = buffer_size
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self.endpoints = Reservoir(self.reservoir_size)
+      self.spans = Reservoir(self.reservoir_size)
+      self.slow_requests = deque(maxlen=self.buffer_size)
+
+  def record(self, profile, slow_threshold):
+    """Record the durations of a finished profile, returning its dict if the
+    request was slower than `slow_threshold` seconds.
+    """
+    with self._lock:
+      self.endpoints.add(profile.root.name, profile.root.duration)
+      for span in profile.root.iter_spans():
+        if span is not profile.root:
+          self.spans.add(span.name, span.duration)
+      if profile.root.duration < slow_threshold:
+        return None
+      result = profile.to_dict()
+      result['finished_at'] = profile.root.end
+      self.slow_requests.append(result)
+      return result
+
+  def get_stats(self):
+    with self._lock:
+      return {
+          'endpoints': self.endpoints.percentiles(),
+          'spans': self.spans.percentiles(),
+          'slow_requests': list(reversed(self.slow_requests)),
+          }
+
+
+profiler = Profiler(
+    getattr(settings, 'PROFILER_RESERVOIR_SIZE', 1000),
+    getattr(settings, 'PROFILER_SLOW_REQUEST_BUFFER', 50))
+
+
+def get_request_profile():
+  """The profile of the request being handled, or None"""
+  if not has_app_context():
+    return None
+  return getattr(g, '_request_profile', None)
+
+
+def _start_profile():
+  if random.random() >= getattr(settings, 'PROFILER_SAMPLE_RATE', 1.0):
+    return
+  # Use the route rather than the path, so that requests for different
+  #   objects are aggregated
+  rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+  g._request_profile = RequestProfile('{0} {1}'.format(request.method, rule))
+
+
+def _finish_profile(response):
+  profile = get_request_profile()
+  if profile is None:
+    return response
+  g._request_profile = None
+  profile.finish()
+  slow_threshold = getattr(settings, 'PROFILER_SLOW_REQUEST_MS', 1000) / 1000.0
+  slow_request = profiler.record(profile, slow_threshold)
+  from flask import current_app
+  if slow_request is not None:
+    current_app.logger.info("PROFILE: slow request " + json.dumps(
+        slow_request, sort_keys=True))
+  violations = profile.check_budgets(
+      getattr(settings, 'PROFILER_QUERY_BUDGETS', {}))
+  if violations:
+    if getattr(settings, 'PROFILER_QUERY_BUDGETS_RAISE', False):
+      raise QueryBudgetExceeded(violations)
+    current_app.logger.warning("PROFILE: query budget exceeded " + json.dumps(
+        violations, sort_keys=True))
+  return response
+
+
+def _discard_profile(exc=None):
+  # `after_request` is not called if the request failed
+  if has_app_context():
+    g._request_profile = None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+  profile = get_request_profile()
+  if profile is not None and context is not None:
+    context._profiler_start = (profile, time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+  start = getattr(context, '_profiler_start', None)
+  if start is not None:
+    profile, start_time = start
+    profile.add_statement(statement, time.time() - start_time)
+
+
+class query_budget(object):
+  """Fail, with the executed statements, if the block executes more than
+  `budget` SQL statements. Meant for tests:
+
+    with query_budget(12):
+      self.client.get('/api/controls?__page=1')
+  """
+
+  def __init__(self, budget, name='block'):
+    self.budget = budget
+    self.profile = RequestProfile(name)
+
+  def __enter__(self):
+    event.listen(Engine, 'after_cursor_execute', self._count)
+    return self.profile
+
+  def _count(self, conn, cursor, statement, parameters, context,
+             executemany):
+    self.profile.add_statement(statement, 0)
+
+  def __exit__(self, exc_type, exc_value, exc_trace):
+    event.remove(Engine, 'after_cursor_execute', self._count)
+    self.profile.finish()
+    if exc_type is None:
+      violations = self.profile.check_budgets(
+          {self.profile.root.name: self.budget})
+      if violations:
+        raise QueryBudgetExceeded(violations)
+
+
+def init_app(app):
+  if not getattr(settings, 'PROFILER_ENABLED', False):
+    return
+  app.before_request(_start_profile)
+  app.after_request(_finish_profile)
+  app.teardown_request(_discard_profile)
+  event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+  event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
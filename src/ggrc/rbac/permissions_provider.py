@@ -11,24 +11,6 @@ from ggrc.models import get_model
 
 Permission = namedtuple('Permission', 'action resource_type context_id')
 
-_contributing_resource_types = {}
-
-# Return a list of resource types using the same context space.
-# This is needed because permissions may be given for, e.g., "Contract", but
-#   the restriction on join is done knowing only "Directive".
-def get_contributing_resource_types(resource_type):
-  resource_types = _contributing_resource_types.get(resource_type, None)
-  if resource_types is None:
-    resource_types = [resource_type]
-    resource_model = get_model(resource_type)
-    if resource_model:
-      resource_manager = resource_model._sa_class_manager
-      resource_types.extend(
-          manager.class_.__name__ for manager in
-            resource_manager.subclass_managers(True))
-    _contributing_resource_types[resource_type] = resource_types
-  return resource_types
-
 class DefaultUserPermissionsProvider(object):
   def __init__(self, settings):
     pass
@@ -90,42 +72,36 @@ class DefaultUserPermissions(UserPermissions):
         self.ADMIN_PERMISSION.resource_type,
         context_id)
 
-  def _permission_match(self, permission, permissions):
-    return \
-        permission.context_id in \
-          permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', [])\
-        or permission.context_id in \
-          permissions\
-            .get(permission.action, {})\
-            .get(self.ADMIN_PERMISSION.resource_type, {})\
-            .get('contexts', [])
-
   def _permissions(self):
     return getattr(g, '_request_permissions', {})
 
-  def _is_allowed(self, permission):
+  def _permissions_index(self):
+    """The `PermissionsIndex` compiled from `_permissions()`. It is kept in the
+    request globals and only recompiled when the permissions dict changes.
+    """
     permissions = self._permissions()
-    if self._permission_match(permission, permissions):
-      return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      return True
-    return self._permission_match(
-        self._admin_permission_for_context(permission.context_id),
-        permissions)
+    index = getattr(g, '_request_permissions_index', None)
+    if index is None or index.permissions is not permissions:
+      index = PermissionsIndex(permissions)
+      setattr(g, '_request_permissions_index', index)
+    return index
+
+  def _is_allowed(self, permission):
+    return self._permissions_index().is_allowed(
+        permission.action, permission.resource_type, permission.context_id)
 
   def _is_allowed_for(self, instance, action):
     # Check for admin permission
-    if self._permission_match(self.ADMIN_PERMISSION, self._permissions()):
+    if self._permissions_index().is_admin:
       return True
 
+    # The permissions dict may be shared with the permissions cache, so it
+    #   must not be modified here.
     conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(instance.context_id, [])
+        .get(action, {})\
+        .get(instance._inflector.model_singular, {})\
+        .get('conditions', {})\
+        .get(instance.context_id, [])
     #FIXME Check for basic resource permission
 
     #Check any conditions applied per resource
@@ -133,7 +109,7 @@ class DefaultUserPermissions(UserPermissions):
       return True
     for condition in conditions:
       func = _CONDITIONS_MAP[str(condition['condition'])]
-      terms = condition.setdefault('terms', {})
+      terms = condition.get('terms', {})
       if func(instance, **terms):
         return True
     return False
@@ -170,28 +146,7 @@ class DefaultUserPermissions(UserPermissions):
   def _get_contexts_for(self, action, resource_type):
     # FIXME: (Security) When applicable, we should explicitly assert that no
     #   permissions are expected (e.g. that every user has ADMIN_PERMISSION).
-    permissions = self._permissions()
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      return None
-
-    # Get the list of contexts for a given resource type and any
-    #   superclasses
-    resource_types = get_contributing_resource_types(resource_type)
-
-    ret = []
-    for resource_type in resource_types:
-      ret.extend(permissions\
-          .get(action, {})\
-          .get(resource_type, {})\
-          .get('contexts', []))
-
-    # Extend with the list of all contexts for which the user is an ADMIN
-    admin_list = list(
-        permissions.get(self.ADMIN_PERMISSION.action, {})\
-            .get(self.ADMIN_PERMISSION.resource_type, {})\
-            .get('contexts', ()))
-    ret.extend(admin_list)
-    return ret
+    return self._permissions_index().contexts_for(action, resource_type)
 
   def create_contexts_for(self, resource_type):
     """All contexts in which the user has create permission."""
@@ -221,3 +176,88 @@ class DefaultUserPermissions(UserPermissions):
   def is_admin(self):
     """Whether the user has ADMIN permissions."""
     return self._is_allowed(self.ADMIN_PERMISSION)
+
+_parent_resource_types = {}
+
+# Return a list of the resource type and all its mapped superclasses, i.e. all
+#   resource types `resource_type` contributes to.
+def get_parent_resource_types(resource_type):
+  resource_types = _parent_resource_types.get(resource_type, None)
+  if resource_types is None:
+    resource_types = [resource_type]
+    resource_model = get_model(resource_type)
+    if resource_model:
+      resource_mapper = resource_model._sa_class_manager.mapper
+      resource_types.extend(
+          mapper.class_.__name__ for mapper in resource_mapper.iterate_to_root()
+            if mapper.class_ is not resource_model)
+    _parent_resource_types[resource_type] = resource_types
+  return resource_types
+
+class PermissionsIndex(object):
+  """Lookup structure compiled from a permissions dictionary (see
+  `ggrc_basic_permissions.load_permissions_for` for its structure), which is
+  kept as `permissions` so it can still be exported to the client.
+
+  Contexts are stored as `frozenset`s per action and resource type, with the
+  contexts in which the user is an ADMIN already folded in, so permission
+  checks are plain set membership tests. The contexts returned by
+  `contexts_for` have the contexts of contributing subclass types expanded in
+  as well.
+  """
+  def __init__(self, permissions):
+    self.permissions = permissions
+    permissions = permissions or {}
+    admin = DefaultUserPermissions.ADMIN_PERMISSION
+
+    admin_contexts = frozenset(permissions\
+        .get(admin.action, {})\
+        .get(admin.resource_type, {})\
+        .get('contexts', ()))
+    self.is_admin = admin.context_id in admin_contexts
+
+    self._allowed = {}
+    self._allowed_default = {}
+    self._contexts = {}
+    for action, resource_permissions in permissions.items():
+      if not isinstance(resource_permissions, dict):
+        # e.g. the '__user' entry
+        continue
+      all_contexts = admin_contexts.union(resource_permissions\
+          .get(admin.resource_type, {})\
+          .get('contexts', ()))
+      allowed = {}
+      contexts = {}
+      for resource_type, resource_permission in resource_permissions.items():
+        type_contexts = resource_permission.get('contexts', ())
+        allowed[resource_type] = all_contexts.union(type_contexts)
+        for parent_type in get_parent_resource_types(resource_type):
+          contexts.setdefault(parent_type, set(admin_contexts))\
+              .update(type_contexts)
+      self._allowed[action] = allowed
+      self._allowed_default[action] = all_contexts
+      self._contexts[action] = dict(
+          (resource_type, frozenset(type_contexts))
+          for resource_type, type_contexts in contexts.items())
+    self._admin_contexts = admin_contexts
+
+  def is_allowed(self, action, resource_type, context_id):
+    """Whether `action` on `resource_type` is allowed in `context_id`."""
+    if self.is_admin:
+      return True
+    allowed = self._allowed.get(action)
+    if allowed is None:
+      return context_id in self._admin_contexts
+    contexts = allowed.get(resource_type)
+    if contexts is None:
+      contexts = self._allowed_default[action]
+    return context_id in contexts
+
+  def contexts_for(self, action, resource_type):
+    """All contexts in which `action` on `resource_type` is allowed, or `None`
+    if it is allowed in all contexts.
+    """
+    if self.is_admin:
+      return None
+    return list(self._contexts.get(action, {}).get(
+        resource_type, self._admin_contexts))
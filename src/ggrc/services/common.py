@@ -8,28 +8,35 @@
 resources.
 """
 
+import base64
 import datetime
 import hashlib
+import json
 import logging
 import time
 from exceptions import TypeError
+from itertools import chain
+from math import ceil
 from wsgiref.handlers import format_date_time
 from urllib import urlencode
 
+import iso8601
 from blinker import Namespace
-from flask import url_for, request, current_app, g, has_request_context
+from flask import url_for, request, current_app, g, has_request_context, \
+    stream_with_context
 from flask.views import View
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import IntegrityError
 import sqlalchemy.orm.exc
 from werkzeug.exceptions import BadRequest, Forbidden
 from sqlalchemy.orm.properties import RelationshipProperty
 
 import ggrc.builder.json
+from ggrc.cache.stats import cache_stats
 from flask.ext.sqlalchemy import Pagination
 from ggrc import db, utils
 from ggrc.utils import as_json, UnicodeSafeJsonWrapper, benchmark
-from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexer, search_cache
 from ggrc.fulltext.recordbuilder import fts_record_for
 from ggrc.login import get_current_user_id, get_current_user
 from ggrc.models.cache import Cache
@@ -44,6 +51,9 @@ from ggrc import settings
 
 
 CACHE_EXPIRY_COLLECTION=60
+# Maximum number of keys sent to the cache, or ids queried, at once when
+#   expiring cache entries
+INVALIDATION_BATCH_SIZE = 500
 
 def get_oauth_credentials():
   from flask import session
@@ -59,6 +69,24 @@ def _get_cache_manager():
   return cache_manager
 
 
+_local_resource_cache = None
+
+
+def get_local_resource_cache():
+  """The process-local LRU tier in front of memcache for published resources,
+  or None if `LOCAL_RESOURCE_CACHE_SIZE` is 0.
+  """
+  global _local_resource_cache
+  size = getattr(settings, 'LOCAL_RESOURCE_CACHE_SIZE', 0)
+  if not size:
+    return None
+  if _local_resource_cache is None:
+    from ggrc.cache import LRUCache
+    _local_resource_cache = LRUCache(
+        size, getattr(settings, 'LOCAL_RESOURCE_CACHE_TTL', 0))
+  return _local_resource_cache
+
+
 def get_cache_key(obj, type=None, id=None):
   """Returns a string identifier for the specified object or stub.
 
@@ -88,31 +116,86 @@ def get_cache_class(obj):
   return obj.__class__.__name__
 
 
-def get_related_keys_for_expiration(context, o):
-  cls = get_cache_class(o)
+def _get_loaded_related_keys(o, attr):
   keys = []
-  mappings = context.cache_manager.supported_mappings.get(cls, [])
-  if len(mappings) > 0:
-    for (cls, attr, polymorph) in mappings:
+  obj = getattr(o, attr, None)
+  if obj:
+    if isinstance(obj, list):
+      for inner_o in obj:
+        keys.append(get_cache_key(inner_o))
+    else:
+      keys.append(get_cache_key(obj))
+  return keys
+
+
+def _get_related_keys_by_query(model, attr, objects):
+  """Keys of the objects related to `objects` through the `attr` relationship
+  of `model`, with one query per batch instead of a lazy load per object
+  """
+  prop = model.__mapper__.get_property(attr)
+  target = prop.mapper
+  columns = [target.primary_key[0]]
+  if target.polymorphic_on is not None:
+    columns.append(target.polymorphic_on)
+  keys = set()
+  ids = [o.id for o in objects]
+  for first in range(0, len(ids), INVALIDATION_BATCH_SIZE):
+    query = db.session.query(*columns)\
+        .select_from(model).join(getattr(model, attr))\
+        .filter(model.id.in_(ids[first:first + INVALIDATION_BATCH_SIZE]))
+    for row in query:
+      if target.polymorphic_on is not None:
+        type = target.polymorphic_map.get(row[1], target).class_
+      else:
+        type = target.class_
+      keys.add(get_cache_key(
+          None, type=type._inflector.table_plural, id=row[0]))
+  return keys
+
+
+def get_keys_for_expiration(context, objects, deleted_objects=()):
+  """Returns the set of cache keys to expire for modified `objects` and
+  `deleted_objects`, including the keys of related objects.
+
+  Related keys are resolved from the `<attr>_type` and `<attr>_id` columns for
+  polymorphic mappings, and from relationships already loaded in the session.
+  The other relationships are resolved with one query per mapping rather than
+  lazy loaded for every object. The rows of deleted objects are gone, so
+  their relationships are still loaded one by one.
+  """
+  supported_classes = context.cache_manager.supported_classes
+  supported_mappings = context.cache_manager.supported_mappings
+  deleted_objects = set(deleted_objects)
+  keys = set()
+  pending = {}
+  for o in chain(objects, deleted_objects):
+    cls = get_cache_class(o)
+    if not supported_classes.has_key(cls):
+      continue
+    keys.add(get_cache_key(o))
+    for (cls, attr, polymorph) in supported_mappings.get(cls, []):
       if polymorph:
-        key = get_cache_key(
-            None,
-            type=getattr(o, '{0}_type'.format(attr)),
-            id=getattr(o, '{0}_id'.format(attr)))
-        keys.append(key)
+        type = getattr(o, '{0}_type'.format(attr))
+        id = getattr(o, '{0}_id'.format(attr))
+        if type is not None and id is not None:
+          keys.add(get_cache_key(None, type=type, id=id))
+      elif attr in o.__dict__ or o in deleted_objects \
+          or attr not in o.__class__.__mapper__.relationships:
+        keys.update(_get_loaded_related_keys(o, attr))
       else:
-        obj = getattr(o, attr, None)
-        if obj:
-          if isinstance(obj, list):
-            for inner_o in obj:
-              key = get_cache_key(inner_o)
-              keys.append(key)
-          else:
-            key = get_cache_key(obj)
-            keys.append(key)
+        pending.setdefault((o.__class__, attr), []).append(o)
+  for (model, attr), pending_objects in pending.items():
+    keys.update(_get_related_keys_by_query(model, attr, pending_objects))
   return keys
 
 
+def get_invalidation_batches(keys):
+  """Split `keys` into sorted lists of at most `INVALIDATION_BATCH_SIZE`"""
+  keys = sorted(keys)
+  return [keys[first:first + INVALIDATION_BATCH_SIZE]
+          for first in range(0, len(keys), INVALIDATION_BATCH_SIZE)]
+
+
 def set_ids_for_new_custom_attribute_values(objects, obj):
   """
   When we are creating custom attribute values for
@@ -158,49 +241,31 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     return
 
   context.cache_manager = _get_cache_manager()
-
-  if len(modified_objects.new) > 0:
-    items_to_add = modified_objects.new.items()
-    for o, json_obj in items_to_add:
-      cls = get_cache_class(o)
-      if context.cache_manager.supported_classes.has_key(cls):
-        key = get_cache_key(o)
-        context.cache_manager.marked_for_delete.append(key)
-        context.cache_manager.marked_for_delete.extend(
-            get_related_keys_for_expiration(context, o))
-
-  if len(modified_objects.dirty) > 0:
-    items_to_update = modified_objects.dirty.items()
-    for o, json_obj in items_to_update:
-      cls = get_cache_class(o)
-      if context.cache_manager.supported_classes.has_key(cls):
-        key = get_cache_key(o)
-        context.cache_manager.marked_for_delete.append(key)
-        context.cache_manager.marked_for_delete.extend(
-            get_related_keys_for_expiration(context, o))
-
-  if len(modified_objects.deleted) > 0:
-    items_to_delete=modified_objects.deleted.items()
-    for o, json_obj in items_to_delete:
-      cls = get_cache_class(o)
-      if context.cache_manager.supported_classes.has_key(cls):
-        # FIXME: is explicit `id=...` *required* here to avoid querying the
-        #   database for a possibly-deleted object?
-        key = get_cache_key(o)#, id=json_obj['id'])
-        context.cache_manager.marked_for_delete.append(key)
-        context.cache_manager.marked_for_delete.extend(
-            get_related_keys_for_expiration(context, o))
-
-  status_entries ={}
-  for key in context.cache_manager.marked_for_delete:
-    build_cache_status(status_entries, 'DeleteOp:' + key, expiry_time, 'InProgress')
-  if len(status_entries) > 0:
-    current_app.logger.info("CACHE: status entries: " + str(status_entries))
+  context.cache_manager.marked_for_delete.update(get_keys_for_expiration(
+      context,
+      modified_objects.new.keys() + modified_objects.dirty.keys(),
+      modified_objects.deleted.keys()))
+
+  local_cache = get_local_resource_cache()
+  if local_cache is not None:
+    local_cache.delete_multi(context.cache_manager.marked_for_delete)
+
+  failed = []
+  for keys in get_invalidation_batches(context.cache_manager.marked_for_delete):
+    status_entries = {}
+    for key in keys:
+      build_cache_status(
+          status_entries, 'DeleteOp:' + key, expiry_time, 'InProgress')
     ret = context.cache_manager.bulk_add(status_entries, expiry_time)
-    if ret is not None and len(ret) == 0:
-      pass
+    if ret is None:
+      failed.extend(status_entries.keys())
     else:
-      current_app.logger.error('CACHE: Unable to add status for newly created entries in memcache ' + str(ret))
+      failed.extend(ret)
+  if len(context.cache_manager.marked_for_delete) > 0:
+    current_app.logger.info("CACHE: {0} status entries".format(
+        len(context.cache_manager.marked_for_delete)))
+  if len(failed) > 0:
+    current_app.logger.error('CACHE: Unable to add status for newly created entries in memcache ' + str(failed))
 
 
 def update_memcache_after_commit(context):
@@ -224,25 +289,169 @@ def update_memcache_after_commit(context):
 
   cache_manager = context.cache_manager
 
-  # TODO(dan): check for duplicates in marked_for_delete
-  if len(cache_manager.marked_for_delete) > 0:
-    #current_app.logger.info("CACHE: Bulk Delete: " + str(cache_manager.marked_for_delete))
-    delete_result = cache_manager.bulk_delete(cache_manager.marked_for_delete, 0)
+  # Each batch deletes the entries before their status entries, so that the
+  #   entries can't be added back from the old state of the database
+  for type, count in count_cache_key_types(
+      cache_manager.marked_for_delete).items():
+    cache_stats.count(type, invalidations=count)
+  for keys in get_invalidation_batches(cache_manager.marked_for_delete):
+    with cache_stats.timed('delete_multi'):
+      delete_result = cache_manager.bulk_delete(
+          keys + ['DeleteOp:' + key for key in keys], 0)
     # TODO(dan): handling failure including network errors, currently we log errors
     if delete_result is not True:
-      current_app.logger.error("CACHE: Failed to remoe collection from cache")
+      current_app.logger.error("CACHE: Failed to remove entries from cache")
 
-  status_entries =[]
-  for key in cache_manager.marked_for_delete:
-    status_entries.append('DeleteOp:' + str(key))
-  if len(status_entries) > 0:
-    delete_result = cache_manager.bulk_delete(status_entries, 0)
-    # TODO(dan): handling failure including network errors, currently we log errors
-    if delete_result is not True:
-      current_app.logger.error("CACHE: Failed to remove status entries from cache")
+  # Entries may have been added from the old state of the database in the
+  #   meantime by other threads
+  local_cache = get_local_resource_cache()
+  if local_cache is not None:
+    local_cache.delete_multi(cache_manager.marked_for_delete)
 
   cache_manager.clear_cache()
 
+
+def count_cache_key_types(keys):
+  """Number of `collection:<table_plural>:<id>` keys per table plural"""
+  counts = {}
+  for key in keys:
+    type = key.split(':')[1]
+    counts[type] = counts.get(type, 0) + 1
+  return counts
+
+
+def count_cache_keys(requested_keys, hit_keys, local_hit_keys):
+  """Update `cache_stats` with the result of a cache lookup and log it"""
+  requested = count_cache_key_types(requested_keys)
+  hits = count_cache_key_types(hit_keys)
+  local_hits = count_cache_key_types(local_hit_keys)
+  for type, count in requested.items():
+    cache_stats.count(
+        type,
+        requested=count,
+        hits=hits.get(type, 0),
+        local_hits=local_hits.get(type, 0),
+        misses=count - hits.get(type, 0))
+  current_app.logger.info("CACHE: lookup " + json.dumps({
+      'requested': requested,
+      'hits': hits,
+      'local_hits': local_hits,
+      }, sort_keys=True))
+
+
+def get_unblocked_cache_keys(memcache_client, keys):
+  """Reduce `keys` to those not blocked by DeleteOp entries"""
+  unblocked_keys = []
+  while len(keys) > 0:
+    slice_keys = keys[:32]
+    keys = keys[32:]
+    with cache_stats.timed('get_multi'):
+      result = memcache_client.get_multi(
+          ["DeleteOp:{}".format(key) for key in slice_keys])
+    unblocked_keys.extend(
+        key for key in slice_keys if "DeleteOp:{}".format(key) not in result)
+  return unblocked_keys
+
+
+def add_published_resources_to_cache(memcache_client, key_objs):
+  """Add published resources, by cache key, to memcache and the local tier if
+  they are not blocked by DeleteOp entries
+  """
+  unblocked_keys = get_unblocked_cache_keys(memcache_client, key_objs.keys())
+  for type, count in count_cache_key_types(unblocked_keys).items():
+    cache_stats.count(type, adds=count)
+  for type, count in count_cache_key_types(
+      set(key_objs.keys()) - set(unblocked_keys)).items():
+    cache_stats.count(type, blocked=count)
+  key_objs = {key: key_objs[key] for key in unblocked_keys}
+  keys = key_objs.keys()
+  while len(keys) > 0:
+    slice_keys = keys[:32]
+    keys = keys[32:]
+    with cache_stats.timed('add_multi'):
+      memcache_client.add_multi(
+          {key: key_objs[key] for key in slice_keys})
+  local_cache = get_local_resource_cache()
+  if local_cache is not None:
+    local_cache.set_multi(key_objs)
+
+
+def warm_cache(stubs):
+  """Publish the objects identified by `stubs`, `(type, id)` pairs, and add
+  them to the cache, so that the first requests for them don't have to
+  publish them. Returns the number of published objects.
+  """
+  cache_manager = _get_cache_manager()
+  memcache_client = cache_manager.cache_object.memcache_client
+  ids_by_type = {}
+  for type, id in stubs:
+    if cache_manager.supported_classes.has_key(type):
+      ids_by_type.setdefault(type, set()).add(id)
+  count = 0
+  for type, ids in ids_by_type.items():
+    model = ggrc.models.get_model(type)
+    ids = sorted(ids)
+    for first in range(0, len(ids), INVALIDATION_BATCH_SIZE):
+      query = model.eager_query().filter(
+          model.id.in_(ids[first:first + INVALIDATION_BATCH_SIZE]))
+      resources = {}
+      for obj in query:
+        resources[get_cache_key(obj)] = ggrc.builder.json.publish(obj)
+      ggrc.builder.json.publish_representation(resources)
+      add_published_resources_to_cache(memcache_client, resources)
+      count += len(resources)
+    # Don't keep the published objects of all types in the session
+    db.session.expunge_all()
+  return count
+
+
+_cache_warming_pool = None
+
+
+def _warm_cache_in_thread(stubs):
+  from ggrc.app import app
+  # Links are published with `url_for`, which needs a request context
+  with app.test_request_context():
+    try:
+      app.logger.info("CACHE: Warming cache with {0} objects".format(
+          len(stubs)))
+      with benchmark("Warm cache"):
+        warm_cache(stubs)
+    except:
+      app.logger.error("CACHE: Failed to warm cache", exc_info=True)
+    finally:
+      db.session.remove()
+
+
+def warm_cache_after_commit(objects):
+  """Warm the cache with the committed `objects`, in a background task on
+  AppEngine and in a worker thread otherwise. At most
+  `CACHE_WARMING_MAX_OBJECTS` objects are published.
+  """
+  global _cache_warming_pool
+  max_objects = getattr(settings, 'CACHE_WARMING_MAX_OBJECTS', 0)
+  if getattr(settings, 'MEMCACHE_MECHANISM', False) is False \
+      or not max_objects:
+    return
+  stubs = []
+  for o in objects:
+    # Committed objects are expired, so read ids without refreshing them
+    identity = sqlalchemy.inspect(o).identity
+    if identity is not None:
+      stubs.append((o.__class__.__name__, identity[0]))
+  stubs = stubs[:max_objects]
+  if len(stubs) == 0:
+    return
+  if getattr(settings, 'APP_ENGINE', False):
+    create_task(
+        "warm_cache", url_for('warm_cache'), parameters={'stubs': stubs})
+  else:
+    if _cache_warming_pool is None:
+      from multiprocessing.pool import ThreadPool
+      _cache_warming_pool = ThreadPool(1)
+    _cache_warming_pool.apply_async(_warm_cache_in_thread, (stubs,))
+
+
 def build_cache_status(data, key, expiry_timeout, status):
   """
   Build the dictionary for storing operational status of cache
@@ -279,36 +488,128 @@ def get_modified_objects(session):
   session.flush()
   cache = get_cache()
   if cache:
-    return cache.copy()
+    return cache.view()
   else:
     return None
 
 def update_index(session, cache):
   if cache:
     indexer = get_indexer()
-    for obj in cache.new:
-      indexer.create_record(fts_record_for(obj), commit=False)
-    for obj in cache.dirty:
-      indexer.update_record(fts_record_for(obj), commit=False)
-    for obj in cache.deleted:
-      indexer.delete_record(obj.id, obj.__class__.__name__, commit=False)
+    indexer.index_batch(
+        creates=[fts_record_for(obj) for obj in cache.new],
+        updates=[fts_record_for(obj) for obj in cache.dirty],
+        deletes=[(obj.id, obj.__class__.__name__) for obj in cache.deleted],
+        commit=False)
     session.commit()
+    search_cache.bump_generation()
+
+def _revision_content(log_json):
+  """Serialize the content of a revision once, as compact JSON, which the
+  content column compresses if needed
+  """
+  return as_json(log_json, separators=(',', ':'))
+
+
+def build_revision_rows(cache, current_user_id):
+  rows = []
+  for action, objects in (
+      ('modified', cache.dirty),
+      ('deleted', cache.deleted),
+      ('created', cache.new)):
+    for o, log_json in objects.items():
+      rows.append({
+          'resource_id': o.id,
+          'resource_type': str(o.__class__.__name__),
+          'action': action,
+          'content': _revision_content(log_json),
+          'modified_by_id': current_user_id,
+          })
+  return rows
+
+
+def write_event(session, event, revisions):
+  """Insert an event and its revisions with core INSERTs, the revisions in
+  multi-row batches of `REVISION_INSERT_BATCH_SIZE`
+  """
+  event_id = session.execute(
+      Event.__table__.insert().values(**event)).inserted_primary_key[0]
+  batch_size = getattr(settings, 'REVISION_INSERT_BATCH_SIZE', 100)
+  for first in range(0, len(revisions), batch_size):
+    session.execute(Revision.__table__.insert(), [
+        dict(row, event_id=event_id)
+        for row in revisions[first:first + batch_size]])
+  return event_id
+
+
+def defer_event(session, event, revisions):
+  """Store the event in a background task, in the same transaction as the
+  changes it records, to be written once the transaction is committed
+  """
+  task = BackgroundTask(name="write_revisions" + str(int(time.time())))
+  task.parameters = {'event': event, 'revisions': revisions}
+  task.modified_by_id = event['modified_by_id']
+  session.add(task)
+  if not hasattr(g, 'deferred_revision_tasks'):
+    g.deferred_revision_tasks = []
+  g.deferred_revision_tasks.append(task)
+
+
+_revision_writing_pool = None
+
+
+def _write_revisions_in_thread(task_id):
+  from ggrc.app import app
+  from ggrc.views import write_revisions
+  with app.test_request_context():
+    try:
+      write_revisions(BackgroundTask.query.get(task_id))
+    finally:
+      db.session.remove()
+
+
+def start_deferred_revision_tasks(session):
+  """Start the revision tasks of a committed transaction, in the task queue
+  on AppEngine and in a worker thread otherwise
+  """
+  global _revision_writing_pool
+  if not has_request_context():
+    return
+  tasks = getattr(g, 'deferred_revision_tasks', None)
+  g.deferred_revision_tasks = []
+  for task in tasks or ():
+    # Committed objects are expired and no SQL can be emitted here, so read
+    #   the id without refreshing the task
+    task_id = sqlalchemy.inspect(task).identity[0]
+    if getattr(settings, 'APP_ENGINE', False):
+      from google.appengine.api import taskqueue
+      taskqueue.add(
+          queue_name="ggrc",
+          url=url_for('write_revisions'),
+          name="{}_{}".format(task.name, task_id),
+          params={'task_id': task_id},
+          method="POST")
+    else:
+      if _revision_writing_pool is None:
+        from multiprocessing.pool import ThreadPool
+        _revision_writing_pool = ThreadPool(1)
+      _revision_writing_pool.apply_async(
+          _write_revisions_in_thread, (task_id,))
+
+
+def discard_deferred_revision_tasks(session):
+  if has_request_context():
+    g.deferred_revision_tasks = []
+
 
 def log_event(session, obj=None, current_user_id=None):
-  revisions = []
   session.flush()
   if current_user_id is None:
     current_user_id = get_current_user_id()
   cache = get_cache()
-  for o, log_json in cache.dirty.items():
-    revision = Revision(o, current_user_id, 'modified', log_json)
-    revisions.append(revision)
-  for o, log_json in cache.deleted.items():
-    revision = Revision(o, current_user_id, 'deleted', log_json)
-    revisions.append(revision)
-  for o, log_json in cache.new.items():
-    revision = Revision(o, current_user_id, 'created', log_json)
-    revisions.append(revision)
+  with benchmark("Serialize revisions"):
+    revisions = build_revision_rows(cache, current_user_id)
+  if not revisions:
+    return
   if obj is None:
     resource_id = 0
     resource_type = None
@@ -319,15 +620,19 @@ def log_event(session, obj=None, current_user_id=None):
     resource_type = str(obj.__class__.__name__)
     action = request.method
     context_id = obj.context_id
-  if revisions:
-    event = Event(
-      modified_by_id=current_user_id,
-      action=action,
-      resource_id=resource_id,
-      resource_type=resource_type,
-      context_id=context_id)
-    event.revisions = revisions
-    session.add(event)
+  event = {
+      'modified_by_id': current_user_id,
+      'action': action,
+      'resource_id': resource_id,
+      'resource_type': resource_type,
+      'context_id': context_id,
+      }
+  if getattr(settings, 'REVISION_WRITER_DEFERRED', False):
+    defer_event(session, event, revisions)
+  else:
+    current_app.logger.info("Writing {0} revisions".format(len(revisions)))
+    with benchmark("Write revisions"):
+      write_event(session, event, revisions)
 
 class ModelView(View):
   DEFAULT_PAGE_SIZE = 20
@@ -860,6 +1165,108 @@ class Resource(ModelView):
         }
     return matches, collection_extras
 
+  def encode_cursor(self, direction, match):
+    """Build the opaque `__cursor` token pointing `direction` ('next' or
+    'prev') from the given match row.
+    """
+    # Match rows only have `updated_at` if the model has it
+    updated_at = getattr(match, 'updated_at', None)
+    if updated_at is not None:
+      updated_at = updated_at.isoformat()
+    return base64.urlsafe_b64encode(
+        json.dumps([direction, updated_at, match.id]))
+
+  def decode_cursor(self, cursor):
+    """Inverse of `encode_cursor`, returns (direction, updated_at, id)."""
+    try:
+      direction, updated_at, id = json.loads(
+          base64.urlsafe_b64decode(str(cursor)))
+      if direction not in ('next', 'prev'):
+        raise ValueError(direction)
+      if updated_at is not None:
+        updated_at = iso8601.parse_date(updated_at).replace(tzinfo=None)
+      return direction, updated_at, int(id)
+    except (TypeError, ValueError, iso8601.ParseError):
+      raise BadRequest('Malformed __cursor parameter.')
+
+  def _get_cursor_seek_filter(self, direction, updated_at, id):
+    """Condition selecting the rows after (`direction == 'next'`) or before
+    (`direction == 'prev'`) the (updated_at, id) position in the default
+    `updated_at DESC, id DESC` ordering. NULL `updated_at` values sort last.
+    """
+    modified_attr, id_attr = self.modified_attr, self.model.id
+    if direction == 'next':
+      if updated_at is None:
+        return and_(modified_attr == None, id_attr < id)
+      return or_(
+          modified_attr < updated_at,
+          and_(modified_attr == updated_at, id_attr < id),
+          modified_attr == None)
+    else:
+      if updated_at is None:
+        return or_(
+            modified_attr != None,
+            and_(modified_attr == None, id_attr > id))
+      return or_(
+          modified_attr > updated_at,
+          and_(modified_attr == updated_at, id_attr > id))
+
+  def apply_cursor_paging(self, matches_query):
+    """Keyset alternative to `apply_paging`. Instead of `LIMIT/OFFSET` it
+    seeks from the position encoded in `__cursor` on the default
+    `updated_at DESC, id DESC` ordering, so the cost of a page does not depend
+    on how deep into the collection it is. An empty `__cursor` requests the
+    first page. The total is counted unless `__count=false` is given.
+    """
+    if '__sort' in request.args or '__limit' in request.args:
+      raise BadRequest(
+          'The __cursor query parameter cannot be combined with __sort or '
+          '__limit.')
+    page_size = min(
+        int(request.args.get('__page_size', self.DEFAULT_PAGE_SIZE)),
+        self.MAX_PAGE_SIZE)
+    cursor = request.args.get('__cursor')
+    if cursor:
+      direction, updated_at, id = self.decode_cursor(cursor)
+      query = matches_query.filter(
+          self._get_cursor_seek_filter(direction, updated_at, id))
+    else:
+      direction = 'next'
+      query = matches_query
+    if direction == 'prev':
+      query = query.order_by(None).order_by(
+          self.modified_attr.asc(), self.model.id.asc())
+    # Fetch a single extra row to find out if there is a following page
+    matches = query.limit(page_size + 1).all()
+    has_more = len(matches) > page_size
+    matches = matches[:page_size]
+    if direction == 'prev':
+      matches.reverse()
+      has_next, has_prev = True, has_more
+    else:
+      has_next, has_prev = has_more, bool(cursor)
+
+    def page_url(cursor):
+      params = dict([(k, unicode(v)) for k, v in request.args.items()])
+      params['__cursor'] = cursor
+      return self.url_for() + '?' + urlencode(utils.encoded_dict(params))
+
+    paging_obj = {'first': page_url('')}
+    if has_next and matches:
+      paging_obj['next_cursor'] = self.encode_cursor('next', matches[-1])
+      paging_obj['next'] = page_url(paging_obj['next_cursor'])
+    if has_prev and matches:
+      paging_obj['prev_cursor'] = self.encode_cursor('prev', matches[0])
+      paging_obj['prev'] = page_url(paging_obj['prev_cursor'])
+    if request.args.get('__count', '').lower() != 'false':
+      if not cursor and not has_more:
+        total = len(matches)
+      else:
+        total = matches_query.count()
+      paging_obj['total'] = total
+      paging_obj['count'] = int(ceil(total / float(page_size)))
+    return matches, {'paging': paging_obj}
+
   def get_matched_resources(self, matches):
     cache_objs = {}
     if self.has_cache():
@@ -873,7 +1280,7 @@ class Resource(ModelView):
     database_objs = {}
     if len(database_matches) > 0:
       with benchmark("Query database for resources"):
-        database_objs = self.get_resources_from_database(matches)
+        database_objs = self.get_resources_from_database(database_matches)
       if self.has_cache():
         with benchmark("Add resources to cache"):
           self.add_resources_to_cache(database_objs)
@@ -888,101 +1295,221 @@ class Resource(ModelView):
     with benchmark("dispatch_request > collection_get > Get collection matches"):
       matches_query = self.get_collection_matches(self.model)
     with benchmark("dispatch_request > collection_get > Query Data"):
-      if '__page' in request.args or '__page_only' in request.args:
+      if '__cursor' in request.args:
+        with benchmark("Query matches with cursor paging"):
+          matches, extras = self.apply_cursor_paging(matches_query)
+      elif '__page' in request.args or '__page_only' in request.args:
         with benchmark("Query matches with paging"):
           matches, extras = self.apply_paging(matches_query)
       else:
         with benchmark("Query matches"):
           matches = matches_query.all()
           extras = {}
-    with benchmark("dispatch_request > collection_get > Get matched resources"):
-      cache_op = None
-      if '__stubs_only' in request.args:
-        objs = [{
-            'id': m[0],
-            'type': m[1],
-            'href': utils.url_for(m[1], id=m[0]),
-            'context_id': m[2]
-            } for m in matches]
-
+    with benchmark("dispatch_request > collection_get > Check validators"):
+      last_modified = self.matches_last_modified(matches)
+      # Only stubs are fully determined by the match rows, full
+      # representations also change with the objects linked from them
+      if '__stubs_only' in request.args and '__include' not in request.args:
+        etag = self.collection_etag(matches, last_modified, extras)
+        if self.request.headers.get('If-None-Match') == etag:
+          return current_app.make_response(('', 304, [('Etag', etag)]))
       else:
-        cache_objs, database_objs = self.get_matched_resources(matches)
-
-        objs = {}
-        objs.update(cache_objs)
-        objs.update(database_objs)
-
-        objs = [objs[m] for m in matches if m in objs]
-
-        with benchmark("Filter resources based on permissions"):
-          objs = filter_resource(objs)
-
-        cache_op = 'Hit' if len(cache_objs) > 0 else 'Miss'
+        etag = None
+    if '__stream' in request.args:
+      return self.stream_collection_response(
+          matches, extras, last_modified, etag)
+    with benchmark("dispatch_request > collection_get > Get matched resources"):
+      objs, cache_op = self.get_collection_objs(matches)
     with benchmark("dispatch_request > collection_get > Create Response"):
-      # Return custom fields specified via `__fields=id,title,description` etc.
-      # TODO this can be optimized by filter_resource() not retrieving the other fields to being with
-      if '__fields' in request.args:
-          custom_fields = request.args['__fields'].split(',')
-          objs = [
-              {f: o[f] for f in custom_fields if f in o}
-              for o in objs]
-
       with benchmark("Serialize collection"):
         collection = self.build_collection_representation(
             objs, extras=extras)
 
-      if 'If-None-Match' in self.request.headers and \
-          self.request.headers['If-None-Match'] == self.etag(collection):
-        return current_app.make_response((
-          '', 304, [('Etag', self.etag(collection))]))
+      if etag is None:
+        etag = self.etag(collection)
+        if self.request.headers.get('If-None-Match') == etag:
+          return current_app.make_response(('', 304, [('Etag', etag)]))
 
       with benchmark("Make response"):
         return self.json_success_response(
-          collection, self.collection_last_modified(), cache_op=cache_op)
+          collection, last_modified, cache_op=cache_op, etag=etag)
+
+  def get_collection_objs(self, matches):
+    """The representations of the collection members in `matches`, in the
+    same order, filtered by permissions and by `__fields`.
+    """
+    cache_op = None
+    if '__stubs_only' in request.args:
+      objs = [{
+          'id': m[0],
+          'type': m[1],
+          'href': utils.url_for(m[1], id=m[0]),
+          'context_id': m[2]
+          } for m in matches]
+
+    else:
+      cache_objs, database_objs = self.get_matched_resources(matches)
+
+      objs = {}
+      objs.update(cache_objs)
+      objs.update(database_objs)
+
+      objs = [objs[m] for m in matches if m in objs]
+
+      with benchmark("Filter resources based on permissions"):
+        objs = filter_resource(objs)
+
+      if len(cache_objs) == 0:
+        cache_op = 'Miss'
+      elif len(database_objs) == 0:
+        cache_op = 'Hit'
+      else:
+        cache_op = 'Partial'
+
+    # Return custom fields specified via `__fields=id,title,description` etc.
+    # TODO this can be optimized by filter_resource() not retrieving the other fields to being with
+    if '__fields' in request.args:
+        custom_fields = request.args['__fields'].split(',')
+        objs = [
+            {f: o[f] for f in custom_fields if f in o}
+            for o in objs]
+    return objs, cache_op
+
+  def matches_last_modified(self, matches):
+    """The last time a member of the collection in `matches` was modified,
+    taken from the match rows. Falls back to `collection_last_modified` if
+    there are no members or the rows have no modification times.
+    """
+    modified = [
+        match.updated_at for match in matches
+          if getattr(match, 'updated_at', None) is not None]
+    if modified:
+      return max(modified)
+    return self.collection_last_modified()
+
+  def collection_etag(self, matches, last_modified, extras=None):
+    """Generate the etag of a `__stubs_only` collection response from its
+    match rows and `extras` (e.g. the paging links), which fully determine
+    it, so the representation is not needed to calculate it. The current user
+    is included, as the representation is filtered by their permissions.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(last_modified))
+    digest.update(str(get_current_user_id()))
+    if extras:
+      digest.update(self.as_json(extras, sort_keys=True))
+    for match in matches:
+      digest.update(str(tuple(match)))
+    return '"{0}"'.format(digest.hexdigest())
+
+  # Number of members loaded and serialized at a time by streamed responses
+  STREAM_CHUNK_SIZE = 100
+
+  def stream_collection_response(
+      self, matches, extras, last_modified, etag=None):
+    """Respond with the collection representation serialized in chunks of
+    `STREAM_CHUNK_SIZE` members as it is sent, so that the whole
+    representation is never held in memory. Used when `__stream` is given.
+    Without an `etag`, i.e. unless only stubs are requested, no Etag is sent,
+    as calculating it would need the whole representation.
+    """
+    table_plural = self.model._inflector.table_plural
+    envelope = {'selfLink': self.url_for_preserving_querystring()}
+    envelope.update(extras)
+
+    def generate():
+      yield '{{{0}: {{'.format(
+          self.as_json('{0}_collection'.format(table_plural)))
+      for key, value in envelope.items():
+        yield '{0}: {1}, '.format(self.as_json(key), self.as_json(value))
+      yield '{0}: ['.format(self.as_json(table_plural))
+      separator = ''
+      for i in range(0, len(matches), self.STREAM_CHUNK_SIZE):
+        objs, _ = self.get_collection_objs(
+            matches[i:i + self.STREAM_CHUNK_SIZE])
+        for obj in objs:
+          yield separator + self.as_json(obj)
+          separator = ', '
+      yield ']}}'
+
+    headers = [
+        ('Last-Modified', self.http_timestamp(last_modified)),
+        ('Content-Type', 'application/json'),
+        ]
+    if etag is not None:
+      headers.append(('Etag', etag))
+    return current_app.response_class(
+        stream_with_context(generate()), 200, headers)
 
   def get_resources_from_cache(self, matches):
-    """Get resources from cache for specified matches"""
+    """Get resources from cache for specified matches, trying the local tier
+    before memcache. The DeleteOp entries of local hits are fetched along with
+    the local misses, and blocked local hits are dropped.
+    """
     resources = {}
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_matches = {}
     keys = []
     for match in matches:
       key = get_cache_key(None, id=match[0], type=match[1])
       key_matches[key] = match
       keys.append(key)
+    requested_keys = keys
+    local_resources = {}
+    local_cache = get_local_resource_cache()
+    if local_cache is not None:
+      local_resources = local_cache.get_multi(keys)
+      keys = [key for key in keys if key not in local_resources]
+      keys.extend('DeleteOp:' + key for key in local_resources)
+    # Skip right to memcache
+    memcache_client = self.request.cache_manager.cache_object.memcache_client
+    memcache_resources = {}
+    blocked_keys = []
     while len(keys) > 0:
       slice_keys = keys[:32]
       keys = keys[32:]
-      result = memcache_client.get_multi(slice_keys)
+      with cache_stats.timed('get_multi'):
+        result = memcache_client.get_multi(slice_keys)
       for key in result:
-        if 'selfLink' in result[key]:
-          resources[key_matches[key]] = result[key]
+        if key.startswith('DeleteOp:'):
+          blocked_keys.append(key[len('DeleteOp:'):])
+        elif 'selfLink' in result[key]:
+          memcache_resources[key] = result[key]
+    if len(blocked_keys) > 0:
+      local_cache.delete_multi(blocked_keys)
+      for key in blocked_keys:
+        del local_resources[key]
+    local_keys = local_resources.keys()
+    for key, resource in local_resources.items():
+      resources[key_matches[key]] = resource
+    if local_cache is not None and len(memcache_resources) > 0:
+      self.add_resources_to_local_cache(memcache_resources)
+    for key, resource in memcache_resources.items():
+      resources[key_matches[key]] = resource
+    count_cache_keys(
+        requested_keys,
+        hit_keys=local_keys + memcache_resources.keys(),
+        local_hit_keys=local_keys)
     return resources
 
+  def add_resources_to_local_cache(self, key_objs):
+    """Add resources found in memcache to the local tier if they are not
+    blocked by DeleteOp entries
+    """
+    memcache_client = self.request.cache_manager.cache_object.memcache_client
+    local_cache = get_local_resource_cache()
+    local_cache.set_multi({
+        key: key_objs[key]
+        for key in get_unblocked_cache_keys(memcache_client, key_objs.keys())})
+
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
     # Skip right to memcache
     memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_objs = {}
-    key_blockers = {}
-    keys = []
     for match, obj in match_obj_pairs.items():
       key = get_cache_key(None, id=match[0], type=match[1])
-      delete_op_key = "DeleteOp:{}".format(key)
-      keys.append(key)
       key_objs[key] = obj
-      key_blockers[key] = delete_op_key
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      blocker_keys = [key_blockers[key] for key in slice_keys]
-      result = memcache_client.get_multi(blocker_keys)
-      # Reduce `slice_keys` to only unblocked keys
-      slice_keys = [
-          key for key in slice_keys if key_blockers[key] not in result]
-      memcache_client.add_multi(
-          {key: key_objs[key] for key in slice_keys})
+    add_published_resources_to_cache(memcache_client, key_objs)
 
   def json_create(self, obj, src):
     ggrc.builder.json.create(obj, src)
@@ -1171,10 +1698,13 @@ class Resource(ModelView):
     return format_date_time(time.mktime(timestamp.utctimetuple()))
 
   def json_success_response(
-      self, response_object, last_modified, status=200, id=None, cache_op=None):
+      self, response_object, last_modified, status=200, id=None, cache_op=None,
+      etag=None):
+    if etag is None:
+      etag = self.etag(response_object)
     headers = [
         ('Last-Modified', self.http_timestamp(last_modified)),
-        ('Etag', self.etag(response_object)),
+        ('Etag', etag),
         ('Content-Type', 'application/json'),
         ]
     if id is not None:
@@ -5,7 +5,7 @@
 
 import json
 from flask import request, current_app
-from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexer, search_cache
 from ggrc.utils import DateTimeEncoder, url_for, benchmark
 
 def search():
@@ -47,11 +47,25 @@ def search():
   else:
     extra_columns = {}
 
+  # Page through the ranked results with `__limit` and `__offset`
+  limit = get_int_arg('__limit')
+  offset = get_int_arg('__offset') or 0
+
   if should_just_count:
     return do_counts(terms, types, contact_id, extra_params, extra_columns)
   if should_group_by_type:
-    return group_by_type_search(terms, types, contact_id, extra_params)
-  return basic_search(terms, types, permission_type, permission_model, contact_id, extra_params)
+    return group_by_type_search(
+        terms, types, contact_id, extra_params, limit, offset)
+  return basic_search(terms, types, permission_type, permission_model,
+                      contact_id, extra_params, limit, offset)
+
+def get_int_arg(name):
+  if name in request.args:
+    try:
+      return int(request.args[name])
+    except (TypeError, ValueError):
+      pass
+  return None
 
 def do_counts(terms, types=None, contact_id=None, extra_params={}, extra_columns={}):
   from ggrc.rbac import permissions
@@ -63,8 +77,14 @@ def do_counts(terms, types=None, contact_id=None, extra_params={}, extra_columns
 
   indexer = get_indexer()
   with benchmark("Counts"):
-    results = indexer.counts(terms, types=types, contact_id=contact_id,
-                             extra_params=extra_params, extra_columns=extra_columns)
+    results = search_cache.cached(
+        'counts',
+        lambda: indexer.counts(terms, types=types, contact_id=contact_id,
+                               extra_params=extra_params,
+                               extra_columns=extra_columns),
+        types=None if types is None else types + extra_columns.values(),
+        terms=indexer.normalize_terms(terms), contact_id=contact_id,
+        extra_params=extra_params, extra_columns=extra_columns)
 
   results = [(r[2] if r[2] != "" else r[0], r[1]) for r in results]
   return current_app.make_response((
@@ -79,26 +99,31 @@ def do_counts(terms, types=None, contact_id=None, extra_params={}, extra_columns
 
 def do_search(
     terms, list_for_type, types=None, permission_type='read',
-    permission_model=None, contact_id=None, extra_params=None):
+    permission_model=None, contact_id=None, extra_params=None, limit=None,
+    offset=0):
   indexer = get_indexer()
+  extra_params = extra_params or {}
   with benchmark("Search"):
-    results = indexer.search(
-        terms, types=types, permission_type=permission_type,
-        permission_model=permission_model, contact_id=contact_id, extra_params=extra_params)
-  seen_results = {}
-
-  for result in results:
-    id = result.key
-    model_type = result.type
-    result_pair = (model_type, id)
-    if result_pair not in seen_results:
-      seen_results[result_pair] = True
-      entries_list = list_for_type(model_type)
-      entries_list.append({
-        'id': id,
-        'type': model_type,
-        'href': url_for(model_type, id=id),
-        })
+    # One row per object, best matches first
+    results = search_cache.cached(
+        'search',
+        lambda: [(result.key, result.type) for result in indexer.ranked_search(
+            terms, limit=limit, offset=offset, types=types,
+            permission_type=permission_type,
+            permission_model=permission_model, contact_id=contact_id,
+            extra_params=extra_params)],
+        types=types, permission_type=permission_type,
+        permission_model=permission_model,
+        terms=indexer.normalize_terms(terms), contact_id=contact_id,
+        extra_params=extra_params, limit=limit, offset=offset)
+
+  for id, model_type in results:
+    entries_list = list_for_type(model_type)
+    entries_list.append({
+      'id': id,
+      'type': model_type,
+      'href': url_for(model_type, id=id),
+      })
 
 def make_search_result(entries):
   return current_app.make_response((
@@ -113,17 +138,18 @@ def make_search_result(entries):
 
 def basic_search(
     terms, types=None, permission_type='read', permission_model=None,
-    contact_id=None, extra_params=None):
+    contact_id=None, extra_params=None, limit=None, offset=0):
   entries = []
   list_for_type = lambda t: entries
   do_search(terms, list_for_type, types, permission_type, permission_model,
-            contact_id, extra_params)
+            contact_id, extra_params, limit, offset)
   return make_search_result(entries)
 
-def group_by_type_search(terms, types=None, contact_id=None, extra_params={}):
+def group_by_type_search(terms, types=None, contact_id=None, extra_params={},
+                         limit=None, offset=0):
   entries = {}
   list_for_type = \
       lambda t: entries[t] if t in entries else entries.setdefault(t, [])
   do_search(terms, list_for_type, types, contact_id=contact_id,
-            extra_params=extra_params)
+            extra_params=extra_params, limit=limit, offset=offset)
   return make_search_result(entries)
@@ -18,7 +18,53 @@ AUTOBUILD_ASSETS = False
 ENABLE_JASMINE = False
 DEBUG_ASSETS = False
 FULLTEXT_INDEXER = None
+# Number of ids per chunk, and of worker processes (0 to index in the request's
+#   own process), used when rebuilding the full text index
+FULLTEXT_REINDEX_CHUNK_SIZE = 1000
+FULLTEXT_REINDEX_PROCESSES = 0
+# Search the MySQL full text index with MATCH ... AGAINST instead of LIKE,
+#   matching words by prefix. Words shorter than FULLTEXT_MIN_WORD_LENGTH,
+#   which must be the server's `ft_min_word_len`, are searched in the n-grams
+#   of the index, which are filled in by a reindex. Words which may start a
+#   MyISAM stopword (see `ggrc.fulltext.stopwords`) are searched with LIKE.
+FULLTEXT_MATCH_SEARCH = False
+FULLTEXT_MIN_WORD_LENGTH = 4
+# Search results are ranked by the summed weights of the properties matching
+#   the terms, custom attribute values by the weight of `attribute_value`
+FULLTEXT_PROPERTY_WEIGHTS = {
+    'title': 8,
+    'name': 8,
+    'email': 4,
+    'slug': 4,
+    'description': 2,
+    'notes': 2,
+    'attribute_value': 1,
+    }
+FULLTEXT_DEFAULT_PROPERTY_WEIGHT = 1
 USER_PERMISSIONS_PROVIDER = None
+
+# Record `benchmark` spans and SQL statements per request (see ggrc.profiler).
+#   Requests slower than PROFILER_SLOW_REQUEST_MS are logged and kept in a
+#   buffer of PROFILER_SLOW_REQUEST_BUFFER requests, and percentiles are
+#   computed over the last PROFILER_RESERVOIR_SIZE durations per name.
+#   Only PROFILER_SAMPLE_RATE of the requests are profiled.
+PROFILER_ENABLED = True
+PROFILER_SAMPLE_RATE = 1.0
+PROFILER_SLOW_REQUEST_MS = 1000
+PROFILER_SLOW_REQUEST_BUFFER = 50
+PROFILER_RESERVOIR_SIZE = 1000
+# Most SQL statements allowed per request ("METHOD rule") or benchmark span.
+#   Violations are logged, or raise QueryBudgetExceeded if
+#   PROFILER_QUERY_BUDGETS_RAISE is set.
+PROFILER_QUERY_BUDGETS = {}
+PROFILER_QUERY_BUDGETS_RAISE = False
+# Revisions are inserted in batches of REVISION_INSERT_BATCH_SIZE rows, or
+#   written by a background task after commit if REVISION_WRITER_DEFERRED
+REVISION_INSERT_BATCH_SIZE = 100
+REVISION_WRITER_DEFERRED = False
+# Revision content longer than REVISION_COMPRESSION_THRESHOLD bytes is stored
+#   compressed
+REVISION_COMPRESSION_THRESHOLD = 1024
 EXTENSIONS = []
 exports = []
 
@@ -46,6 +92,40 @@ SQLALCHEMY_DATABASE_URI = os.environ.get('GGRC_DATABASE_URI', '')
 SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
+# Backend used when MEMCACHE_MECHANISM is enabled, one of the clients in
+#   `ggrc.cache.clients` (default: AppEngine memcache)
+CACHE_BACKEND = None
+# Servers used by `ggrc.cache.clients.MemcachedClient`
+CACHE_BACKEND_SERVERS = os.environ.get(
+    'GGRC_CACHE_SERVERS', '127.0.0.1:11211').split(',')
+# Number of entries kept by `ggrc.cache.clients.LocalCacheClient`
+CACHE_BACKEND_LOCAL_SIZE = 10000
+
+# Number of published resources kept in each process in front of memcache
+#   (0 disables the tier, which is opt-in). Local hits are dropped while
+#   another process holds DeleteOp entries for them, but changes committed by
+#   other processes are only seen once entries expire, so the TTL bounds how
+#   stale served resources can be.
+LOCAL_RESOURCE_CACHE_SIZE = 0
+LOCAL_RESOURCE_CACHE_TTL = 5
+
+# Maximum number of objects published into the cache after imports and cycle
+#   generation, so that they are not first published by page views
+#   (0 disables cache warming)
+CACHE_WARMING_MAX_OBJECTS = 10000
+
+# Maximum number of users whose permissions are cached across requests in each
+#   process (0 disables the cache). Unless MEMCACHE_MECHANISM is enabled, the
+#   cache is only invalidated within the process that changed the roles, so it
+#   may only be enabled for deployments using memcache or running a single
+#   process, e.g. with `PERMISSIONS_CACHE_SIZE = 1000`.
+PERMISSIONS_CACHE_SIZE = 0
+
+# Number of search results and counts kept in each process (0 disables the
+#   cache), and for how many seconds. Unless MEMCACHE_MECHANISM is enabled,
+#   changes made by other processes are only seen once entries expire.
+SEARCH_CACHE_SIZE = 1000
+SEARCH_CACHE_TTL = 30
 
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
@@ -12,3 +12,4 @@ FULLTEXT_INDEXER = 'ggrc.fulltext.mysql.MysqlIndexer'
 LOGIN_MANAGER = 'ggrc.login.noop'
 #SQLALCHEMY_ECHO = True
 MEMCACHE_MECHANISM = False
+PROFILER_QUERY_BUDGETS_RAISE = True
@@ -4,3 +4,4 @@
 # Maintained By: swizec@reciprocitylabs.com
 
 SQLALCHEMY_DATABASE_URI = 'mysql+mysqldb://root@127.0.0.1/ggrcdevtest?charset=utf8'
+PROFILER_QUERY_BUDGETS_RAISE = True
@@ -128,13 +128,24 @@ def get_url_root():
 
 
 class BenchmarkContextManager(object):
+  """Time a block. Within a profiled request the block becomes a span of the
+  request's profile (see `ggrc.profiler`), otherwise its duration is logged.
+  """
   def __init__(self, message):
     self.message = message
 
   def __enter__(self):
-    self.start = time.time()
+    from ggrc.profiler import get_request_profile
+    self.profile = get_request_profile()
+    if self.profile is not None:
+      self.span = self.profile.push(self.message)
+    else:
+      self.start = time.time()
 
   def __exit__(self, exc_type, exc_value, exc_trace):
+    if self.profile is not None:
+      self.profile.pop(self.span)
+      return
     end = time.time()
     current_app.logger.info("{:.4f} {}".format(end - self.start, self.message))
 
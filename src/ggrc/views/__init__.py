@@ -8,6 +8,7 @@ from collections import namedtuple
 from flask import request, session, url_for, redirect, g
 from flask.views import View
 from ggrc.extensions import get_extension_modules
+from ggrc import db
 from ggrc.app import app
 from ggrc.rbac import permissions
 from ggrc.login import get_current_user
@@ -33,34 +34,37 @@ def reindex(task):
   """
   Web hook to update the full text search index
   """
+  from ggrc.fulltext.reindex import reindex as rebuild_index
 
-  from ggrc.fulltext import get_indexer
-  from ggrc.fulltext.recordbuilder import fts_record_for, model_is_indexed
+  rebuild_index(task)
 
-  indexer = get_indexer()
-  indexer.delete_all_records(False)
+  return app.make_response((
+    'success', 200, [('Content-Type', 'text/html')]))
 
-  from ggrc.models import all_models
-  from ggrc.app import db
+@app.route("/_background_tasks/warm_cache", methods=["GET", "POST"])
+@queued_task
+def warm_cache(task):
+  """
+  Web hook to publish recently committed objects into the cache
+  """
+  from ggrc.services.common import warm_cache as publish_to_cache
 
-  # Find all models then remove base classes
-  #   (If we don't remove base classes, we get duplicates in the index.)
-  inheritance_base_models = [
-      all_models.Directive, all_models.SectionBase, all_models.SystemOrProcess,
-      all_models.Response
-      ]
-  models = set(all_models.all_models) - set(inheritance_base_models)
-  models = [model for model in models if model_is_indexed(model)]
+  publish_to_cache(task.parameters['stubs'])
 
-  for model in models:
-    mapper_class = model._sa_class_manager.mapper.base_mapper.class_
-    query = model.query.options(
-        db.undefer_group(mapper_class.__name__ + '_complete'),
-        )
-    for query_chunk in generate_query_chunks(query):
-      for instance in query_chunk:
-        indexer.create_record(fts_record_for(instance), False)
-      db.session.commit()
+  return app.make_response((
+    'success', 200, [('Content-Type', 'text/html')]))
+
+@app.route("/_background_tasks/write_revisions", methods=["POST"])
+@queued_task
+def write_revisions(task):
+  """
+  Web hook to write the revisions of a committed change
+  """
+  from ggrc.services.common import write_event
+
+  parameters = task.parameters
+  write_event(db.session, parameters['event'], parameters['revisions'])
+  db.session.commit()
 
   return app.make_response((
     'success', 200, [('Content-Type', 'text/html')]))
@@ -120,12 +124,6 @@ def dashboard():
   """
   return render_template("dashboard/index.haml")
 
-def generate_query_chunks(query):
-  CHUNK_SIZE = 100
-  count = query.count()
-  for offset in range(0, count, CHUNK_SIZE):
-    yield query.order_by('id').limit(CHUNK_SIZE).offset(offset).all()
-
 @app.route("/admin/reindex", methods=["POST"])
 @login_required
 def admin_reindex():
@@ -139,6 +137,38 @@ def admin_reindex():
                                             200,
                                             [('Content-Type', 'text/html')])))
 
+@app.route("/admin/cache_stats", methods=["GET"])
+@login_required
+def admin_cache_stats():
+  """Cache counters and latencies of the process serving the request
+  """
+  from ggrc.cache.stats import cache_stats
+  from ggrc.services.common import get_local_resource_cache
+  from ggrc.fulltext import search_cache
+  if not permissions.is_allowed_read("/admin", 1):
+    raise Forbidden()
+  stats = cache_stats.get_stats()
+  local_cache = get_local_resource_cache()
+  if local_cache is not None:
+    stats['local_cache'] = local_cache.get_stats()
+  search_stats = search_cache.get_stats()
+  if search_stats is not None:
+    stats['search_cache'] = search_stats
+  return app.make_response((
+      as_json(stats), 200, [('Content-Type', 'application/json')]))
+
+@app.route("/admin/profiler", methods=["GET"])
+@login_required
+def admin_profiler():
+  """Request percentiles and slow requests of the process serving the request
+  """
+  from ggrc.profiler import profiler
+  if not permissions.is_allowed_read("/admin", 1):
+    raise Forbidden()
+  return app.make_response((
+      as_json(profiler.get_stats()), 200,
+      [('Content-Type', 'application/json')]))
+
 @app.route("/admin")
 @login_required
 def admin():
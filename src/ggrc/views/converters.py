@@ -80,11 +80,11 @@ def ensure_create_permissions_for(resource_type, context_id):
 
 
 def filter_objects_by_permissions(user, objs):
-  permissions = permissions.permissions_for(user)
+  user_permissions = permissions.permissions_for(user)
 
   permitted_objects = []
   for obj in objs:
-    if permissions.is_allowed_read(obj.__class__.__name__, obj.context_id):
+    if user_permissions.is_allowed_read(obj.__class__.__name__, obj.context_id):
       permitted_objects.append(obj)
   return permitted_objects
 
@@ -17,10 +17,12 @@ from ggrc.models.relationship import Relationship
 from ggrc.models.context import Context
 from ggrc.models.program import Program
 from ggrc.rbac import permissions
-from ggrc.rbac.permissions_provider import DefaultUserPermissions
+from ggrc.rbac.permissions_provider import DefaultUserPermissions, \
+    PermissionsIndex
 from ggrc.services.registry import service
 from ggrc.services.common import Resource
 from . import basic_roles
+from . import permissions_cache
 from .contributed_roles import lookup_role_implications
 from .models import Role, UserRole, ContextImplication
 
@@ -63,11 +65,16 @@ class BasicUserPermissions(DefaultUserPermissions):
   """User permissions that aren't kept in session."""
   def __init__(self, user):
     self.user = user
-    self.permissions = load_permissions_for(user)
+    self.permissions = permissions_cache.get_permissions_for(
+        user, load_permissions_for)
+    self.permissions_index = PermissionsIndex(self.permissions)
 
   def _permissions(self):
     return self.permissions
 
+  def _permissions_index(self):
+    return self.permissions_index
+
 class UserPermissions(DefaultUserPermissions):
   @property
   def _request_permissions(self):
@@ -76,6 +83,7 @@ class UserPermissions(DefaultUserPermissions):
   @_request_permissions.setter
   def _request_permissions(self, value):
     setattr(g, '_request_permissions', value)
+    setattr(g, '_request_permissions_index', PermissionsIndex(value))
 
   def _permissions(self):
     self.check_permissions()
@@ -96,7 +104,8 @@ class UserPermissions(DefaultUserPermissions):
     if user is None or user.is_anonymous():
       self._request_permissions = {}
     else:
-      self._request_permissions = load_permissions_for(user)
+      self._request_permissions = permissions_cache.get_permissions_for(
+          user, load_permissions_for)
 
 def collect_permissions(src_permissions, context_id, permissions):
   for action, resource_permissions in src_permissions.items():
@@ -338,6 +347,8 @@ def handle_program_post(sender, obj=None, src=None, service=None):
     # Add role implication - all users can read a public program
     add_public_program_context_implication(context)
 
+  permissions_cache.mark_changed(db.session)
+
 
 def add_public_program_context_implication(context, check_exists=False):
   if check_exists and db.session.query(ContextImplication)\
@@ -421,6 +432,7 @@ def handle_relationship_delete(sender, obj=None, src=None, service=None):
                 ContextImplication.context_id == obj.destination.context_id,
                 ContextImplication.source_context_id == obj.source.context_id)\
                     .delete()
+      permissions_cache.mark_changed(db.session)
 
 
 @Resource.model_put.connect_via(Program)
@@ -435,6 +447,7 @@ def handle_program_put(sender, obj=None, src=None, service=None):
               ContextImplication.source_context_id == None)\
                   .delete()
       db.session.flush()
+      permissions_cache.mark_changed(db.session)
     else:
       #ensure that implications from null are present
       add_public_program_context_implication(obj.context, check_exists=True)
@@ -488,6 +501,8 @@ def handle_audit_post(sender, obj=None, src=None, service=None):
   #Place the audit in the audit context
   obj.context = context
 
+  permissions_cache.mark_changed(db.session)
+
 
 @Resource.model_deleted.connect
 def handle_resource_deleted(sender, obj=None, service=None):
@@ -505,6 +520,7 @@ def handle_resource_deleted(sender, obj=None, service=None):
               ContextImplication.source_context_id == obj.context_id
               ))\
         .delete()
+    permissions_cache.mark_changed(db.session)
     # Deleting the context itself is problematic, because unattached objects
     #   may still exist and cause a database error.  Instead of implicitly
     #   cascading to delete those, just leave the `Context` object in place.
@@ -559,4 +575,7 @@ def receive_set(target, value, oldvalue, initiator):
   if value is False:
     # Delete UserRoles related to the Person
     db.session.query(UserRole).filter(UserRole.person_id==target.id).delete()
+    permissions_cache.mark_changed(db.session)
     db.session.commit()
+
+permissions_cache.init_hooks()
@@ -0,0 +1,41 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Fill the index of people assigned to objects used by "My Work" searches
+
+The assignments are read from `user_roles` and the tables of other
+extensions, e.g. `workflows`, so they are computed here rather than where
+the table is created. If some of those tables don't exist yet, as when
+installing from scratch, there is nothing to fill, and the table is left to
+be maintained on flush and by reindexing.
+
+Revision ID: 5e3a9c1d7b2f
+Revises: 27432edbe6d4
+Create Date: 2015-06-06 12:00:00.000000
+
+"""
+
+from alembic import op
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = '5e3a9c1d7b2f'
+down_revision = '27432edbe6d4'
+
+
+def upgrade():
+  from ggrc.fulltext.assignments import get_source_tables, rebuild_assignments
+  connection = op.get_bind()
+  existing_tables = set(Inspector.from_engine(connection).get_table_names())
+  missing_tables = get_source_tables() - existing_tables
+  if missing_tables:
+    print("Not filling person_object_assignments, missing tables: {0}".format(
+        ', '.join(sorted(missing_tables))))
+    return
+  rebuild_assignments(connection)
+
+
+def downgrade():
+  pass
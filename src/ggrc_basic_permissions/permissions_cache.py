@@ -0,0 +1,147 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Cross-request cache of the permissions computed by `load_permissions_for`.
+
+Entries are kept per person in a process-local LRU and, if
+`MEMCACHE_MECHANISM` is enabled, in memcache as well. Every entry is stamped
+with the permissions version it was computed under. The version is bumped
+whenever `UserRole`, `Role` or `ContextImplication` rows change, which
+invalidates all entries at once.
+
+Without memcache the version only lives in this process, so in that case the
+cache is only correct for deployments running a single application process.
+"""
+
+from collections import OrderedDict
+from itertools import chain
+from threading import RLock
+from sqlalchemy import event
+from sqlalchemy.orm.session import Session
+from ggrc import settings
+from .models import Role, UserRole, ContextImplication
+
+
+VERSION_KEY = 'permissions:version'
+ENTRY_KEY = 'permissions:{0}:{1}'
+
+_lock = RLock()
+_local_version = 0
+_entries = OrderedDict()
+
+
+def _cache_size():
+  return getattr(settings, 'PERMISSIONS_CACHE_SIZE', 0)
+
+
+def _get_memcache_client():
+  if getattr(settings, 'MEMCACHE_MECHANISM', False) is False:
+    return None
+  from ggrc.cache import get_cache_client
+  return get_cache_client()
+
+
+def get_version(client=None):
+  """The current permissions version."""
+  if client is not None:
+    version = client.get(VERSION_KEY)
+    if version is None:
+      client.add(VERSION_KEY, 0)
+      version = client.get(VERSION_KEY) or 0
+    return version
+  return _local_version
+
+
+def bump_version():
+  """Invalidate all cached permissions."""
+  global _local_version
+  with _lock:
+    _local_version += 1
+    _entries.clear()
+  client = _get_memcache_client()
+  if client is not None:
+    client.incr(VERSION_KEY, initial_value=0)
+
+
+def clear():
+  """Drop the process-local entries, e.g. between tests."""
+  with _lock:
+    _entries.clear()
+
+
+def get_permissions_for(user, load):
+  """Return the permissions of `user`, computing them with `load(user)` only
+  if no entry for the current permissions version is cached.
+  """
+  size = _cache_size()
+  if not size:
+    return load(user)
+
+  client = _get_memcache_client()
+  version = get_version(client)
+  key = (user.id, user.email)
+
+  with _lock:
+    entry = _entries.get(key)
+    if entry is not None and entry[0] == version:
+      # Move the entry to the most recently used end
+      del _entries[key]
+      _entries[key] = entry
+      return entry[1]
+
+  entry_key = ENTRY_KEY.format(version, user.id)
+  if client is not None:
+    entry = client.get(entry_key)
+    if entry is not None and entry[0] == user.email:
+      permissions = entry[1]
+      _store(key, version, permissions, size)
+      return permissions
+
+  # The personal context is created on the first load, and would not exist if
+  #   the request creating it is rolled back, so only cache afterwards.
+  cacheable = len(user.contexts) > 0
+  permissions = load(user)
+  if cacheable:
+    _store(key, version, permissions, size)
+    if client is not None:
+      client.set(entry_key, (user.email, permissions))
+  return permissions
+
+
+def _store(key, version, permissions, size):
+  with _lock:
+    _entries.pop(key, None)
+    _entries[key] = (version, permissions)
+    while len(_entries) > size:
+      _entries.popitem(last=False)
+
+
+def mark_changed(session):
+  """Record that the permissions are affected by changes in `session`. The
+  version is bumped immediately, and again when the transaction ends, so that
+  permissions loaded from uncommitted state are not kept.
+  """
+  session.info['permissions_changed'] = True
+  bump_version()
+
+
+def _is_permissions_object(obj):
+  return isinstance(obj, (Role, UserRole, ContextImplication))
+
+
+def init_hooks():
+  def check_flush(session, flush_context, objects):
+    for obj in chain(session.new, session.dirty, session.deleted):
+      if _is_permissions_object(obj):
+        mark_changed(session)
+        break
+
+  def end_transaction(session):
+    if session.info.pop('permissions_changed', False):
+      bump_version()
+
+  event.listen(Session, 'before_flush', check_flush)
+  event.listen(Session, 'after_commit', end_transaction)
+  event.listen(Session, 'after_rollback', end_transaction)
@@ -4,6 +4,7 @@
 # Maintained By: miha@reciprocitylabs.com
 
 from datetime import datetime, date
+from itertools import chain
 from flask import Blueprint
 from sqlalchemy import inspect, and_
 
@@ -11,7 +12,7 @@ from ggrc import db
 from ggrc.login import get_current_user
 from ggrc.models import all_models
 from ggrc.rbac.permissions import is_allowed_update
-from ggrc.services.common import Resource
+from ggrc.services.common import Resource, warm_cache_after_commit
 from ggrc.services.registry import service
 from ggrc.views.registry import object_view
 
@@ -825,6 +826,7 @@ def start_recurring_cycles():
   ).all()
 
   # For each workflow, start and save a new cycle.
+  cycles = []
   for workflow in workflows:
 
     cycle = models.Cycle()
@@ -850,10 +852,16 @@ def start_recurring_cycles():
 
     notification.handle_workflow_modify(None, workflow)
     notification.handle_cycle_created(None, obj=cycle)
+    cycles.append(cycle)
 
   db.session.commit()
   db.session.flush()
 
+  warm_cache_after_commit(chain.from_iterable(
+      [cycle] + cycle.cycle_task_groups + cycle.cycle_task_group_objects +
+      cycle.cycle_task_group_object_tasks
+      for cycle in cycles))
+
 
 class WorkflowRoleContributions(RoleContributions):
   contributions = {
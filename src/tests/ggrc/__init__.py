@@ -6,8 +6,9 @@
 import os
 import logging
 from flask.ext.testing import TestCase as BaseTestCase
-from ggrc import db
+from ggrc import db, settings
 from ggrc.app import app
+from ggrc.fulltext import search_cache
 from ggrc.models import create_db
 
 if os.environ.get('TRAVIS', False):
@@ -43,6 +44,15 @@ class TestCase(BaseTestCase):
 
     db.session.commit()
 
+    # The rows were deleted without going through the session, so cached
+    #   permissions would outlive them.
+    if 'ggrc_basic_permissions' in settings.EXTENSIONS:
+      from ggrc_basic_permissions import permissions_cache
+      permissions_cache.clear()
+
+    # Likewise for search results of the deleted index rows
+    search_cache.clear()
+
     # if getattr(settings, 'MEMCACHE_MECHANISM', False) is True:
     #   from google.appengine.api import memcache
     #   from google.appengine.ext import testbed
@@ -0,0 +1,243 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""
+ Benchmark the hot REST API endpoints with the Flask test client
+
+ Seeds the database configured by GGRC_SETTINGS_MODULE with a synthetic
+ object graph (see `seed.py`), runs every scenario `--iterations` times and
+ prints, or writes to `--output`, a JSON report with the throughput, p50/p99
+ latencies, SQL query counts and response statuses of each scenario.
+
+ The run fails if a scenario responds with anything but 2xx or raises, and,
+ given `--thresholds` (e.g. `thresholds.json`, recorded for the sizes used by
+ `bin/run_travis_tests`), if a scenario needs more queries than allowed.
+
+ The seeded objects are not removed, so run it against a scratch database.
+ Later runs with the same `--prefix` and sizes reuse them, other sizes need
+ another prefix or `--reset`, which drops and recreates all tables first:
+
+   python -m tests.ggrc.benchmarks.run --reset --iterations 20 \\
+       --output benchmarks.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from StringIO import StringIO
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from ggrc import settings
+
+ADMIN_EMAIL = 'benchmark-admin@example.com'
+
+
+class QueryCounter(object):
+  def __init__(self):
+    self.count = 0
+    event.listen(Engine, 'after_cursor_execute', self.increment)
+
+  def increment(self, *args, **kwargs):
+    self.count += 1
+
+
+def percentile(ordered, point):
+  return ordered[min(len(ordered) - 1, int(len(ordered) * point / 100.0))]
+
+
+class Benchmark(object):
+
+  def __init__(self, app, ids):
+    self.app = app
+    self.ids = ids
+    self.client = app.test_client()
+    self.client.get('/login', headers={
+        'X-ggrc-user': json.dumps({'email': ADMIN_EMAIL})})
+    self.headers = [
+        ('Accept', 'application/json'),
+        ('X-Requested-By', 'gGRC'),
+        ]
+    self.queries = QueryCounter()
+
+  def get(self, url):
+    return self.client.get(url, headers=self.headers)
+
+  def put_control(self):
+    url = '/api/controls/{0}'.format(self.ids['Control'][0])
+    response = self.get(url)
+    control = json.loads(response.data)
+    control['control']['title'] += '.'
+    headers = self.headers + [
+        ('Content-Type', 'application/json'),
+        ('If-Match', response.headers.get('Etag')),
+        ('If-Unmodified-Since', response.headers.get('Last-Modified')),
+        ]
+    return self.client.put(url, data=json.dumps(control), headers=headers)
+
+  def export_controls(self):
+    return self.client.get('/policies/{0}/export_controls'.format(
+        self.ids['Policy'][0]))
+
+  def import_controls(self):
+    # A dry run of importing the exported controls back
+    csv = self.export_controls().data
+    return self.client.post(
+        '/policies/{0}/import_controls'.format(self.ids['Policy'][0]),
+        data={'file': (StringIO(csv), 'controls.csv')})
+
+  def scenarios(self):
+    control_id = self.ids['Control'][0]
+    return [
+        ('collection_get', lambda: self.get('/api/controls')),
+        ('collection_get_stubs_only',
+         lambda: self.get('/api/controls?__stubs_only=true')),
+        ('collection_get_include',
+         lambda: self.get('/api/controls?__include=owners')),
+        ('single_get',
+         lambda: self.get('/api/controls/{0}'.format(control_id))),
+        ('put', self.put_control),
+        ('search', lambda: self.get('/search?q=security')),
+        ('search_counts',
+         lambda: self.get('/search?q=security&counts_only=true')),
+        ('export', self.export_controls),
+        ('import', self.import_controls),
+        ]
+
+  def request(self, run):
+    """Run a scenario once, returning the response status or, since the test
+    client propagates exceptions while testing, the exception raised
+    """
+    try:
+      return run().status_code
+    except Exception as e:
+      from ggrc import db
+      db.session.rollback()
+      return '{0}: {1}'.format(e.__class__.__name__, e)
+
+  def run_scenario(self, run, iterations, warmup):
+    for _ in range(warmup):
+      self.request(run)
+    durations = []
+    queries = []
+    statuses = {}
+    start = time.time()
+    for _ in range(iterations):
+      query_count = self.queries.count
+      request_start = time.time()
+      status = self.request(run)
+      durations.append(time.time() - request_start)
+      queries.append(self.queries.count - query_count)
+      statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.time() - start
+    ordered = sorted(durations)
+    return {
+        'iterations': iterations,
+        'throughput_rps': iterations / elapsed if elapsed else None,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p99_ms': percentile(ordered, 99) * 1000,
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'queries_mean': float(sum(queries)) / len(queries),
+        'queries_max': max(queries),
+        'statuses': statuses,
+        }
+
+  def run(self, iterations, warmup=1, only=None):
+    results = {}
+    for name, run in self.scenarios():
+      if only and name not in only:
+        continue
+      results[name] = self.run_scenario(run, iterations, warmup)
+    return results
+
+
+def check_report(report, thresholds=None):
+  """The problems found in `report`: responses other than 2xx, exceptions
+  and, if `thresholds` are given, query counts above their `queries_max`.
+  Thresholds are only comparable for the sizes they were recorded with.
+  """
+  problems = []
+  for name, result in sorted(report['scenarios'].items()):
+    for status, count in sorted(result['statuses'].items()):
+      if not isinstance(status, int) or not 200 <= status < 300:
+        problems.append('{0}: {1} responses with {2}'.format(
+            name, count, status))
+  if thresholds is None:
+    return problems
+  if thresholds['sizes'] != report['sizes']:
+    problems.append('Thresholds are for sizes {0}, not {1}'.format(
+        thresholds['sizes'], report['sizes']))
+    return problems
+  for name, queries_max in sorted(thresholds['queries_max'].items()):
+    result = report['scenarios'].get(name)
+    if result is not None and result['queries_max'] > queries_max:
+      problems.append('{0}: {1} queries, at most {2} expected'.format(
+          name, result['queries_max'], queries_max))
+  return problems
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--reset', action='store_true',
+                      help='drop and recreate all tables before seeding')
+  parser.add_argument('--iterations', type=int, default=10)
+  parser.add_argument('--warmup', type=int, default=1)
+  parser.add_argument('--scenario', action='append', dest='scenarios',
+                      help='only run the named scenario (repeatable)')
+  parser.add_argument('--output', help='write the JSON report to a file')
+  parser.add_argument('--thresholds',
+                      help='fail if query counts exceed those in a JSON file')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--prefix', default='BENCH',
+                      help='prefix of the titles of the seeded objects')
+  from .seed import DEFAULT_SIZES
+  for name, value in sorted(DEFAULT_SIZES.items()):
+    parser.add_argument('--' + name.replace('_', '-'), type=int,
+                        default=value, dest=name)
+  args = parser.parse_args(argv)
+
+  # The benchmark user must be allowed to read everything
+  settings.BOOTSTRAP_ADMIN_USERS = list(
+      getattr(settings, 'BOOTSTRAP_ADMIN_USERS', [])) + [ADMIN_EMAIL]
+
+  from ggrc.app import app
+  from ggrc.models import create_db, drop_db
+  from .seed import seed
+  with app.app_context():
+    if args.reset:
+      drop_db()
+      create_db()
+    sizes = dict((name, getattr(args, name)) for name in DEFAULT_SIZES)
+    seed_start = time.time()
+    ids = seed(prefix=args.prefix, seed_value=args.seed, **sizes)
+    seed_time = time.time() - seed_start
+
+  report = {
+      'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+      'sizes': sizes,
+      'seed_seconds': seed_time,
+      'scenarios': Benchmark(app, ids).run(
+          args.iterations, args.warmup, args.scenarios),
+      }
+  output = json.dumps(report, indent=2, sort_keys=True)
+  if args.output:
+    with open(args.output, 'w') as f:
+      f.write(output)
+  else:
+    sys.stdout.write(output + '\n')
+
+  thresholds = None
+  if args.thresholds:
+    with open(args.thresholds) as f:
+      thresholds = json.load(f)
+  problems = check_report(report, thresholds)
+  for problem in problems:
+    sys.stderr.write(problem + '\n')
+  if problems:
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+  main()
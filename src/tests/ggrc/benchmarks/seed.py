@@ -0,0 +1,170 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+"""Seed the configured database with a synthetic GRC object graph"""
+
+import random
+from ggrc import db
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext.recordbuilder import fts_record_for
+from ggrc.models import (
+    Control, CustomAttributeDefinition, CustomAttributeValue, ObjectOwner,
+    Person, Policy, Program, Relationship,
+    )
+
+
+DEFAULT_SIZES = {
+    'people': 20,
+    'programs': 5,
+    'controls_per_program': 100,
+    'relationships_per_control': 2,
+    'owners_per_object': 1,
+    'custom_attributes': 3,
+    }
+
+WORDS = [
+    'access', 'audit', 'backup', 'change', 'data', 'encryption', 'firewall',
+    'incident', 'logging', 'network', 'password', 'review', 'security',
+    'vendor',
+    ]
+
+
+def _text(rand, count=3):
+  return ' '.join(rand.choice(WORDS) for _ in range(count))
+
+
+def _add_all(objects, batch_size=500):
+  for first in range(0, len(objects), batch_size):
+    db.session.add_all(objects[first:first + batch_size])
+    db.session.flush()
+
+
+def _expected_counts(sizes):
+  return {
+      'Person': sizes['people'],
+      'Program': sizes['programs'],
+      'Policy': sizes['programs'],
+      'Control': sizes['programs'] * sizes['controls_per_program'],
+      }
+
+
+def find_seeded(prefix='BENCH'):
+  """The ids of the objects of an earlier `seed` with `prefix` by type, or
+  None if there are none
+  """
+  ids = {}
+  for model, column, pattern in (
+      (Person, Person.email, '{0}-person-%@example.com'),
+      (Program, Program.slug, '{0}-PROGRAM-%'),
+      (Policy, Policy.slug, '{0}-POLICY-%'),
+      (Control, Control.slug, '{0}-CONTROL-%')):
+    query = db.session.query(model.id)\
+        .filter(column.like(pattern.format(
+            prefix.lower() if model is Person else prefix)))\
+        .order_by(model.id)
+    ids[model.__name__] = [id for id, in query]
+  if not any(ids.values()):
+    return None
+  return ids
+
+
+def seed(prefix='BENCH', seed_value=0, **sizes):
+  """Create people, programs, a policy per program, controls of the policies
+  mapped to the programs, relationships between controls, owners and custom
+  attribute values. Returns the ids of the created objects by type.
+
+  If the database was already seeded with `prefix`, the existing objects are
+  reused as long as there are as many as `sizes` asks for.
+  """
+  sizes = dict(DEFAULT_SIZES, **sizes)
+  seeded = find_seeded(prefix)
+  if seeded is not None:
+    counts = dict((type, len(ids)) for type, ids in seeded.items())
+    if counts != _expected_counts(sizes):
+      raise ValueError(
+          "The database was already seeded with prefix {0!r} and other "
+          "sizes ({1}), reset it or use another prefix".format(
+              prefix, counts))
+    return seeded
+  rand = random.Random(seed_value)
+
+  people = [
+      Person(name='{0} Person {1}'.format(prefix, i),
+             email='{0}-person-{1}@example.com'.format(prefix.lower(), i))
+      for i in range(sizes['people'])]
+  _add_all(people)
+
+  definitions = [
+      CustomAttributeDefinition(
+          title='{0} attribute {1}'.format(prefix, i),
+          definition_type='control',
+          attribute_type='Text')
+      for i in range(sizes['custom_attributes'])]
+  _add_all(definitions)
+
+  programs = [
+      Program(title='{0} Program {1} {2}'.format(prefix, i, _text(rand)),
+              slug='{0}-PROGRAM-{1}'.format(prefix, i),
+              description=_text(rand, 10))
+      for i in range(sizes['programs'])]
+  _add_all(programs)
+
+  policies = [
+      Policy(title='{0} Policy {1}'.format(prefix, i),
+             slug='{0}-POLICY-{1}'.format(prefix, i),
+             kind='Company Policy')
+      for i in range(sizes['programs'])]
+  _add_all(policies)
+
+  controls = []
+  for program_index in range(sizes['programs']):
+    for i in range(sizes['controls_per_program']):
+      controls.append(Control(
+          title='{0} Control {1}-{2} {3}'.format(
+              prefix, program_index, i, _text(rand)),
+          slug='{0}-CONTROL-{1}-{2}'.format(prefix, program_index, i),
+          description=_text(rand, 20),
+          directive=policies[program_index]))
+  _add_all(controls)
+
+  mappings = []
+  for program_index, program in enumerate(programs):
+    first = program_index * sizes['controls_per_program']
+    for control in controls[first:first + sizes['controls_per_program']]:
+      mappings.append(Relationship(
+          source_type='Program', source_id=program.id,
+          destination_type='Control', destination_id=control.id))
+      for _ in range(sizes['relationships_per_control'] - 1):
+        other = rand.choice(controls)
+        if other is not control:
+          mappings.append(Relationship(
+              source_type='Control', source_id=control.id,
+              destination_type='Control', destination_id=other.id))
+  for obj in programs + policies + controls:
+    for person in rand.sample(people, min(
+        sizes['owners_per_object'], len(people))):
+      mappings.append(ObjectOwner(
+          person_id=person.id, ownable_type=obj.__class__.__name__,
+          ownable_id=obj.id))
+  for control in controls:
+    for definition in definitions:
+      mappings.append(CustomAttributeValue(
+          custom_attribute_id=definition.id, attributable_type='Control',
+          attributable_id=control.id, attribute_value=_text(rand)))
+  _add_all(mappings)
+
+  get_indexer().index_batch(
+      creates=[fts_record_for(obj)
+               for obj in people + programs + policies + controls],
+      commit=False)
+  # Committing expires the objects, so collect the ids first
+  ids = {
+      'Person': [person.id for person in people],
+      'Program': [program.id for program in programs],
+      'Policy': [policy.id for policy in policies],
+      'Control': [control.id for control in controls],
+      }
+  db.session.commit()
+  return ids
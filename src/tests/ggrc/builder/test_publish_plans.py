@@ -0,0 +1,169 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from tests.ggrc import TestCase
+
+from ggrc import db
+from ggrc.builder.json import StubResolver, publish
+from ggrc.models import (
+    Control, Event, ObjectOwner, ObjectPerson, Person, Policy, Program,
+    Relationship, Revision,
+    )
+
+
+def stub(type, id, href):
+  return {
+      'type': type,
+      'id': id,
+      'href': '/api/{0}/{1}'.format(href, id),
+      'context_id': None,
+      }
+
+
+class TestPublishPlans(TestCase):
+
+  def setUp(self):
+    super(TestPublishPlans, self).setUp()
+    self.people = [
+        Person(name='Person {0}'.format(i),
+               email='plan{0}@example.com'.format(i))
+        for i in range(2)]
+    self.policy = Policy(
+        title='Policy', slug='POLICY-PLAN', kind='Company Policy')
+    self.program = Program(title='Program', slug='PROGRAM-PLAN')
+    self.control = Control(
+        title='Control', slug='CONTROL-PLAN', directive=self.policy,
+        contact=self.people[0], secondary_contact=self.people[1])
+    db.session.add_all(
+        self.people + [self.policy, self.program, self.control])
+    db.session.flush()
+    self.object_owner = ObjectOwner(
+        person=self.people[0], ownable_type='Control',
+        ownable_id=self.control.id)
+    self.object_person = ObjectPerson(
+        person=self.people[1], personable_type='Control',
+        personable_id=self.control.id)
+    self.relationship = Relationship(
+        source_type='Program', source_id=self.program.id,
+        destination_type='Control', destination_id=self.control.id)
+    self.event = Event(action='POST', resource_type='Control',
+                       resource_id=self.control.id)
+    self.event.revisions.append(Revision(
+        self.control, self.people[0].id, 'created', self.control.log_json()))
+    db.session.add_all([
+        self.object_owner, self.object_person, self.relationship, self.event])
+    db.session.commit()
+
+  def publish(self, obj, inclusions=()):
+    return StubResolver().resolve(publish(obj, inclusions))
+
+  def person_stub(self, index):
+    return stub('Person', self.people[index].id, 'people')
+
+  def control_stub(self):
+    return stub('Control', self.control.id, 'controls')
+
+  def test_relationship_lists(self):
+    json_obj = self.publish(self.control)
+    self.assertEqual(
+        [stub('ObjectOwner', self.object_owner.id, 'object_owners')],
+        json_obj['object_owners'])
+    self.assertEqual(
+        [stub('ObjectPerson', self.object_person.id, 'object_people')],
+        json_obj['object_people'])
+    self.assertEqual(
+        [stub('Relationship', self.relationship.id, 'relationships')],
+        json_obj['related_sources'])
+    self.assertEqual([], json_obj['related_destinations'])
+
+    json_obj = self.publish(self.control, (('object_owners',),))
+    object_owner, = json_obj['object_owners']
+    self.assertDictContainsSubset({
+        'id': self.object_owner.id,
+        'type': 'ObjectOwner',
+        'selfLink': '/api/object_owners/{0}'.format(self.object_owner.id),
+        'person': self.person_stub(0),
+        'ownable': self.control_stub(),
+        }, object_owner)
+    # Only the included attribute is published in full
+    self.assertEqual(
+        [stub('ObjectPerson', self.object_person.id, 'object_people')],
+        json_obj['object_people'])
+
+  def test_association_proxies(self):
+    json_obj = self.publish(self.control)
+    self.assertEqual([self.person_stub(0)], json_obj['owners'])
+    self.assertEqual([self.person_stub(1)], json_obj['people'])
+
+    json_obj = self.publish(self.control, (('owners',),))
+    owner, = json_obj['owners']
+    self.assertDictContainsSubset({
+        'id': self.people[0].id,
+        'type': 'Person',
+        'name': 'Person 0',
+        'email': 'plan0@example.com',
+        'selfLink': '/api/people/{0}'.format(self.people[0].id),
+        }, owner)
+    self.assertEqual([self.person_stub(1)], json_obj['people'])
+
+  def test_include_links(self):
+    json_obj = self.publish(self.event)
+    # Revisions are included in full, not as stubs
+    revision, = json_obj['revisions']
+    self.assertDictContainsSubset({
+        'type': 'Revision',
+        'action': 'created',
+        'resource_type': 'Control',
+        'resource_id': self.control.id,
+        'modified_by': self.person_stub(0),
+        }, revision)
+    self.assertDictContainsSubset({
+        'title': 'Control',
+        'slug': 'CONTROL-PLAN',
+        'directive_id': self.policy.id,
+        }, revision['content'])
+
+  def test_property_stubs(self):
+    for inclusions in ((), (('source',),), (('destination', ('title',)),)):
+      json_obj = self.publish(self.relationship, inclusions)
+      self.assertEqual(
+          stub('Program', self.program.id, 'programs'), json_obj['source'])
+      self.assertEqual(self.control_stub(), json_obj['destination'])
+
+    json_obj = self.publish(self.object_person, (('personable',),))
+    self.assertEqual(self.control_stub(), json_obj['personable'])
+    self.assertEqual(self.person_stub(1), json_obj['person'])
+
+  def test_polymorphic_directive(self):
+    json_obj = self.publish(self.control)
+    self.assertEqual(
+        stub('Policy', self.policy.id, 'policies'), json_obj['directive'])
+    self.assertEqual(self.person_stub(0), json_obj['contact'])
+    self.assertEqual(self.person_stub(1), json_obj['secondary_contact'])
+
+    json_obj = self.publish(self.control, (('directive', ('controls',)),))
+    directive = json_obj['directive']
+    self.assertDictContainsSubset({
+        'id': self.policy.id,
+        'type': 'Policy',
+        'title': 'Policy',
+        'selfLink': '/api/policies/{0}'.format(self.policy.id),
+        }, directive)
+    control, = directive['controls']
+    self.assertDictContainsSubset({
+        'id': self.control.id,
+        'type': 'Control',
+        'title': 'Control',
+        'directive': stub('Policy', self.policy.id, 'policies'),
+        }, control)
+
+    json_obj = self.publish(self.policy, (('controls',),))
+    control, = json_obj['controls']
+    self.assertDictContainsSubset({
+        'id': self.control.id,
+        'type': 'Control',
+        'contact': self.person_stub(0),
+        'owners': [self.person_stub(0)],
+        }, control)
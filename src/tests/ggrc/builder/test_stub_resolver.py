@@ -0,0 +1,53 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+from tests.ggrc import TestCase
+
+import ggrc.builder.json
+from ggrc import db
+from ggrc.builder.json import LazyStubRepresentation, StubResolver
+from ggrc.models import Person
+
+
+class TestStubResolver(TestCase):
+
+  def setUp(self):
+    super(TestStubResolver, self).setUp()
+    self.people = [
+        Person(email='stub{0}@example.com'.format(i)) for i in range(2)]
+    db.session.add_all(self.people)
+    db.session.commit()
+
+  def resource(self):
+    return {
+        'owners': [
+            LazyStubRepresentation('Person', person.id)
+            for person in self.people],
+        'contact': LazyStubRepresentation('Person', self.people[0].id),
+        'missing': LazyStubRepresentation('Person', 0),
+        }
+
+  def test_stubs_are_queried_once(self):
+    resolver = StubResolver()
+    with patch.object(ggrc.builder.json, 'build_stub_union_query',
+                      wraps=ggrc.builder.json.build_stub_union_query) as query:
+      first = resolver.resolve(self.resource())
+      second = resolver.resolve(self.resource())
+    self.assertEqual(1, query.call_count)
+    self.assertEqual(first, second)
+    self.assertEqual(
+        [person.id for person in self.people],
+        [stub['id'] for stub in first['owners']])
+    self.assertEqual('Person', first['contact']['type'])
+    self.assertIsNone(first['missing'])
+
+  def test_flush_clears_stubs(self):
+    resolver = ggrc.builder.json.get_stub_resolver()
+    resolver.resolve(self.resource())
+    self.assertTrue(resolver.stubs)
+    self.people[0].name = 'Renamed'
+    db.session.commit()
+    self.assertFalse(resolver.stubs)
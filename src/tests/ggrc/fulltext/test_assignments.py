@@ -0,0 +1,52 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from tests.ggrc import TestCase
+
+from ggrc import db
+from ggrc.fulltext.assignments import (
+    PersonObjectAssignment, rebuild_assignments)
+from ggrc.models import Control, ObjectOwner, Person
+
+
+class TestPersonObjectAssignments(TestCase):
+
+  def assignments(self):
+    return set(
+        (a.person_id, a.object_type, a.object_id, a.reason)
+        for a in PersonObjectAssignment.query)
+
+  def test_updated_by_flushes(self):
+    owner = Person(name='Owner', email='owner@example.com')
+    contact = Person(name='Contact', email='contact@example.com')
+    control = Control(title='Control', contact=contact)
+    db.session.add_all([owner, contact, control])
+    db.session.flush()
+    object_owner = ObjectOwner(
+        person=owner, ownable_type='Control', ownable_id=control.id)
+    db.session.add(object_owner)
+    db.session.commit()
+    self.assertEqual(set([
+        (contact.id, 'Control', control.id, 'contact'),
+        (owner.id, 'Control', control.id, 'owner'),
+        ]), self.assignments())
+
+    control.contact = owner
+    control.secondary_contact = contact
+    db.session.delete(object_owner)
+    db.session.commit()
+    expected = set([
+        (owner.id, 'Control', control.id, 'contact'),
+        (contact.id, 'Control', control.id, 'secondary_contact'),
+        ])
+    self.assertEqual(expected, self.assignments())
+
+    db.session.execute(PersonObjectAssignment.__table__.delete())
+    rebuild_assignments()
+    self.assertEqual(expected, self.assignments())
+
+    db.session.delete(control)
+    db.session.commit()
+    self.assertEqual(set(), self.assignments())
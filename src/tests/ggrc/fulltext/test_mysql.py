@@ -0,0 +1,132 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+from sqlalchemy.dialects import mysql
+from tests.ggrc import TestCase
+
+from ggrc import db, settings
+from ggrc.fulltext import Record
+from ggrc.fulltext.mysql import MysqlIndexer, get_ngrams, tokenize
+from ggrc.models import Program
+
+
+class TestMysqlIndexer(TestCase):
+
+  def setUp(self):
+    super(TestMysqlIndexer, self).setUp()
+    self.indexer = MysqlIndexer(settings)
+
+  def test_tokenize(self):
+    self.assertEqual(
+        [u'it', u'access', u'review_2', u'\xe9t\xe9'],
+        tokenize(u'IT Access-review_2, \xe9t\xe9!'))
+
+  @patch.object(settings, 'FULLTEXT_MIN_WORD_LENGTH', 4, create=True)
+  def test_ngrams(self):
+    self.assertEqual('a___ ac__ acc_ i___ it__', get_ngrams('Access IT a'))
+    self.assertEqual(None, get_ngrams(''))
+
+  def test_index_ngrams(self):
+    self.indexer.index_batch(creates=[
+        Record(1, 'Control', None, '', title='IT access')])
+    record_type = self.indexer.record_type
+    self.assertEqual(
+        get_ngrams('IT access'), db.session.query(record_type.ngrams).scalar())
+
+  @patch.object(settings, 'FULLTEXT_MIN_WORD_LENGTH', 4, create=True)
+  def test_match_query(self):
+    with patch.object(MysqlIndexer, '_use_match_query', return_value=True):
+      query = self.indexer._get_match_query('Controls of IT access').compile(
+          dialect=mysql.dialect())
+    self.assertEqual(
+        'MATCH (fulltext_record_properties.content) AGAINST (%s IN BOOLEAN '
+        'MODE) AND MATCH (fulltext_record_properties.ngrams) AGAINST (%s IN '
+        'BOOLEAN MODE)', str(query))
+    self.assertEqual(
+        set(['+access* +controls*', '+it__ +of__']),
+        set(query.params.values()))
+
+  @patch.object(settings, 'FULLTEXT_MIN_WORD_LENGTH', 4, create=True)
+  def test_match_query_with_stopwords(self):
+    # MyISAM doesn't index stopwords, so neither "about" nor words starting
+    #   with "whic" can be matched
+    with patch.object(MysqlIndexer, '_use_match_query', return_value=True):
+      query = self.indexer._get_match_query('Controls about whic').compile(
+          dialect=mysql.dialect())
+    self.assertEqual(2, str(query).count('content LIKE'))
+    self.assertEqual(1, str(query).count('MATCH'))
+    self.assertEqual(
+        set(['about', 'whic', '+controls*']), set(query.params.values()))
+
+  def test_like_query_without_words(self):
+    with patch.object(MysqlIndexer, '_use_match_query', return_value=True):
+      self.assertEqual(None, self.indexer._get_match_query('%!'))
+
+  @patch.object(settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'],
+                create=True)
+  def test_ranked_search(self):
+    self.client.get('/login')
+    self.indexer.index_batch(creates=[
+        Record(1, 'Control', None, '', description='firewall'),
+        Record(2, 'Control', None, '', title='B firewall'),
+        Record(3, 'Control', None, '', title='A firewall'),
+        Record(4, 'Control', None, '', title='firewall',
+               description='firewall'),
+        Record(5, 'Control', None, '', title='unrelated'),
+        Record(6, 'Control', None, '', email='firewall', slug='firewall'),
+        ])
+    with self.client:
+      self.client.get('/')
+      ranked = lambda **kwargs: [
+          (row.key, row.score)
+          for row in self.indexer.ranked_search('firewall', **kwargs)]
+      # Objects without a matching title come after titled ones
+      self.assertEqual(
+          [(4, 10), (3, 8), (2, 8), (6, 8), (1, 2)], ranked())
+      self.assertEqual([(3, 8), (2, 8)], ranked(limit=2, offset=1))
+
+  @patch.object(settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'],
+                create=True)
+  @patch.object(settings, 'FULLTEXT_PROPERTY_WEIGHTS',
+                {'attribute_value': 3}, create=True)
+  def test_ranked_search_property_prefixes(self):
+    self.client.get('/login')
+    self.indexer.index_batch(creates=[
+        Record(1, 'Control', None, '', attribute_value_2='firewall'),
+        Record(2, 'Control', None, '', attribute_valuex='firewall'),
+        ])
+    with self.client:
+      self.client.get('/')
+      self.assertEqual(
+          [(1, 3), (2, 1)],
+          [(row.key, row.score)
+           for row in self.indexer.ranked_search('firewall')])
+
+  @patch.object(settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'],
+                create=True)
+  def test_counts(self):
+    self.client.get('/login')
+    programs = [Program(title='Audit program'), Program(title='Draft audit')]
+    db.session.add_all(programs)
+    db.session.commit()
+    self.indexer.index_batch(creates=[
+        Record(programs[0].id, 'Program', None, '', title='Audit program'),
+        Record(programs[1].id, 'Program', None, '', title='Draft audit'),
+        Record(1, 'Control', None, '', title='Audit control'),
+        Record(2, 'Control', None, '', title='Other control'),
+        ])
+    with self.client:
+      self.client.get('/')
+      self.assertEqual(
+          set([('Program', 2, ''), ('Control', 1, '')]),
+          set(self.indexer.counts('audit', types=['Program', 'Control'])))
+      self.assertEqual(
+          set([('Control', 1, ''), ('Program', 1, 'Program'),
+               ('Program', 2, 'AllPrograms')]),
+          set(self.indexer.counts(
+              'audit', types=['Program', 'Control'],
+              extra_params={'Program': {'title': 'Draft audit'}},
+              extra_columns={'AllPrograms': 'Program'})))
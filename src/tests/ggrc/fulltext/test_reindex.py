@@ -0,0 +1,89 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from tests.ggrc import TestCase
+
+from ggrc import db
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext.reindex import index_chunk, reindex
+from ggrc.models import Control
+from ggrc.models.background_task import BackgroundTask
+
+
+class TestReindex(TestCase):
+
+  def setUp(self):
+    super(TestReindex, self).setUp()
+    self.indexer = get_indexer()
+    self.controls = [
+        Control(title='Control {0}'.format(i), slug='CONTROL-{0}'.format(i))
+        for i in range(5)]
+    db.session.add_all(self.controls)
+    db.session.commit()
+    self.indexer.delete_all_records()
+
+  def indexed_titles(self):
+    record_type = self.indexer.record_type
+    return sorted(content for content, in db.session.query(
+        record_type.content).filter(
+            record_type.type == 'Control',
+            record_type.property == 'title'))
+
+  def expected_titles(self):
+    return sorted(control.title for control in self.controls)
+
+  def test_reindex(self):
+    task = BackgroundTask(name='reindex')
+    db.session.add(task)
+    db.session.commit()
+    self.assertEqual(5, reindex(task, chunk_size=2))
+    self.assertEqual(self.expected_titles(), self.indexed_titles())
+    self.assertIsNone(task.parameters['reindex_checkpoint'])
+    self.assertFalse(self.indexer.has_shadow_table())
+
+  def test_resume(self):
+    # Start a reindex which was interrupted after indexing the first chunk
+    #   and before checkpointing the second one
+    first_id = min(control.id for control in self.controls)
+    first_id -= first_id % 2
+    first_chunk = ('Control', first_id, first_id + 2)
+    shadow = self.indexer.create_shadow_table()
+    index_chunk(self.indexer, shadow, *first_chunk)
+    index_chunk(
+        self.indexer, shadow, 'Control', first_chunk[2], first_chunk[2] + 2)
+    task = BackgroundTask(name='reindex', parameters={
+        'reindex_checkpoint': {
+            'chunk_size': 2,
+            'started_at': db.session.query(db.func.now()).scalar(),
+            'done': [first_chunk],
+            'count': 2,
+            }})
+    db.session.add(task)
+    db.session.commit()
+
+    reindex(task, chunk_size=2)
+    self.assertEqual(self.expected_titles(), self.indexed_titles())
+
+  def test_deleted_objects_are_removed(self):
+    # Index the first chunk, then delete one of its controls meanwhile
+    first_id = min(control.id for control in self.controls)
+    first_id -= first_id % 2
+    first_chunk = ('Control', first_id, first_id + 2)
+    index_chunk(self.indexer, self.indexer.create_shadow_table(), *first_chunk)
+    task = BackgroundTask(name='reindex', parameters={
+        'reindex_checkpoint': {
+            'chunk_size': 2,
+            'started_at': db.session.query(db.func.now()).scalar(),
+            'done': [first_chunk],
+            'count': 2,
+            }})
+    db.session.add(task)
+    deleted = min(self.controls, key=lambda control: control.id)
+    db.session.delete(deleted)
+    db.session.commit()
+    self.controls.remove(deleted)
+
+    reindex(task, chunk_size=2)
+    self.assertEqual(self.expected_titles(), self.indexed_titles())
@@ -0,0 +1,45 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+import json
+from mock import patch
+from tests.ggrc import TestCase
+
+from ggrc import settings
+from ggrc.fulltext import Record, get_indexer, search_cache
+from ggrc.login.common import create_user
+
+
+@patch.object(settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'],
+              create=True)
+@patch.object(settings, 'SEARCH_CACHE_SIZE', 100, create=True)
+class TestSearchCache(TestCase):
+
+  def index(self, key, title):
+    get_indexer().index_batch(creates=[
+        Record(key, 'Control', None, '', title=title)])
+
+  def count(self, terms, type='Control'):
+    response = self.client.get(
+        '/search?q={0}&types={1}&counts_only=true'.format(terms, type),
+        headers={'Accept': 'application/json'})
+    return json.loads(response.data)['results']['counts'].get(type, 0)
+
+  def test_cached_until_index_changes(self):
+    self.client.get('/login')
+    self.index(1, 'firewall one')
+    self.assertEqual(1, self.count('firewall'))
+    # Indexing directly doesn't invalidate cached results
+    self.index(2, 'firewall two')
+    self.assertEqual(1, self.count('firewall'))
+    self.assertEqual(1, self.count('two'))
+    search_cache.bump_generation()
+    self.assertEqual(2, self.count('firewall'))
+
+  def test_new_users_invalidate_results(self):
+    self.client.get('/login')
+    self.assertEqual(0, self.count('newcomer', 'Person'))
+    create_user('newcomer@example.com', name='Newcomer')
+    self.assertEqual(1, self.count('newcomer', 'Person'))
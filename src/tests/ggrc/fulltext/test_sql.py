@@ -0,0 +1,48 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from tests.ggrc import TestCase
+
+from ggrc import db, settings
+from ggrc.fulltext import get_indexer, Record
+
+
+class TestSqlIndexer(TestCase):
+
+  def setUp(self):
+    super(TestSqlIndexer, self).setUp()
+    self.indexer = get_indexer()
+
+  def indexed(self):
+    record_type = self.indexer.record_type
+    return set(db.session.query(
+        record_type.key, record_type.type, record_type.property,
+        record_type.content))
+
+  def test_index_batch(self):
+    self.indexer.index_batch(creates=[
+        Record(1, 'Control', None, '', title='one', slug='C-1'),
+        Record(2, 'Control', None, '', title='two', slug='C-2'),
+        Record(1, 'Policy', None, '', title='policy'),
+        ])
+    self.assertEqual(5, len(self.indexed()))
+
+    self.indexer.index_batch(
+        updates=[Record(1, 'Control', None, '', title='uno')],
+        deletes=[(2, 'Control')])
+    self.assertEqual(set([
+        (1, 'Control', 'title', 'uno'),
+        (1, 'Policy', 'title', 'policy'),
+        ]), self.indexed())
+
+  def test_index_batch_chunks(self):
+    # Indexers are shared, so don't change the batch size of this one
+    self.indexer = self.indexer.__class__(settings)
+    self.indexer.batch_size = 3
+    self.indexer.index_batch(creates=[
+        Record(i, 'Control', None, '', title=str(i)) for i in range(10)])
+    self.assertEqual(10, len(self.indexed()))
+    self.indexer.index_batch(deletes=[(i, 'Control') for i in range(8)])
+    self.assertEqual(2, len(self.indexed()))
@@ -0,0 +1,35 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from unittest import TestCase
+
+from ggrc.cache.stats import CacheStats
+
+
+class TestCacheStats(TestCase):
+
+  def test_counters(self):
+    stats = CacheStats()
+    stats.count('controls', requested=4, hits=3, misses=1)
+    stats.count('controls', blocked=1)
+    stats.count('programs', requested=2, misses=2)
+    result = stats.get_stats()
+    self.assertEqual(0.75, result['resources']['controls']['hit_ratio'])
+    self.assertEqual(1, result['resources']['controls']['blocked'])
+    self.assertEqual(6, result['totals']['requested'])
+    self.assertEqual(0.5, result['totals']['hit_ratio'])
+
+  def test_latency_histogram(self):
+    stats = CacheStats()
+    for seconds in (0.0005, 0.003, 0.003, 5):
+      stats.observe('get_multi', seconds)
+    latency = stats.get_stats()['latencies']['get_multi']
+    self.assertEqual(4, latency['count'])
+    self.assertEqual(5000, latency['max_ms'])
+    counts = dict(
+        (bucket['le_ms'], bucket['count']) for bucket in latency['buckets'])
+    self.assertEqual(1, counts[1])
+    self.assertEqual(2, counts[5])
+    self.assertEqual(1, counts[None])
@@ -0,0 +1,56 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+from unittest import TestCase
+
+from ggrc.cache import LRUCache
+
+
+class TestLRUCache(TestCase):
+
+  def test_evicts_least_recently_used(self):
+    cache = LRUCache(max_size=2)
+    cache.set_multi({'a': 1, 'b': 2})
+    cache.get('a')
+    cache.set('c', 3)
+    self.assertEqual({'a': 1, 'c': 3}, cache.get_multi(['a', 'b', 'c']))
+
+  def test_expires_entries(self):
+    cache = LRUCache(max_size=10, ttl=5)
+    with patch('ggrc.cache.lrucache._time.time', return_value=100):
+      cache.set('a', 1)
+      cache.set('b', 2, time=1)
+    with patch('ggrc.cache.lrucache._time.time', return_value=102):
+      self.assertEqual({'a': 1}, cache.get_multi(['a', 'b']))
+    with patch('ggrc.cache.lrucache._time.time', return_value=105):
+      self.assertEqual(None, cache.get('a'))
+
+  def test_returns_copies(self):
+    cache = LRUCache()
+    cache.set('a', {'title': 'one'})
+    cache.get('a')['title'] = 'two'
+    self.assertEqual({'title': 'one'}, cache.get('a'))
+
+  def test_counts_hits_and_misses(self):
+    cache = LRUCache()
+    cache.add_multi({'a': 1})
+    self.assertEqual(['a'], cache.add_multi({'a': 2}))
+    cache.get_multi(['a', 'b'])
+    cache.delete_multi(['a'])
+    cache.get('a')
+    stats = cache.get_stats()
+    self.assertEqual(0, stats['items'])
+    self.assertEqual(1, stats['hits'])
+    self.assertEqual(2, stats['misses'])
+
+  def test_cas(self):
+    cache = LRUCache()
+    cache.set_multi({'a': 1, 'b': 2})
+    cache.get_multi(['a', 'b'], for_cas=True)
+    cache.set('b', 3)
+    self.assertEqual(['b'], cache.cas_multi({'a': 4, 'b': 5}))
+    self.assertEqual({'a': 4, 'b': 3}, cache.get_multi(['a', 'b']))
+    self.assertFalse(cache.cas('a', 6))
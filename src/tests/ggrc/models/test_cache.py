@@ -0,0 +1,96 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+from sqlalchemy import event
+
+from ggrc import db
+from ggrc.models import Control, Document, ObjectDocument
+from ggrc.services.common import get_cache, get_modified_objects
+from tests.ggrc import TestCase
+
+
+class TestCache(TestCase):
+
+  def test_tracks_objects_once(self):
+    control = Control(title='Control')
+    db.session.add(control)
+    db.session.flush()
+    control.title = 'Control 2'
+    db.session.flush()
+    cache = get_cache()
+    self.assertEqual([control], cache.new.keys())
+    self.assertEqual([], cache.dirty.keys())
+
+  def test_log_json_is_recorded_before_flushes_that_modify(self):
+    control = Control(title='Control')
+    db.session.add(control)
+    db.session.flush()
+    with patch.object(Control, 'log_json', autospec=True,
+                      return_value={}) as log_json:
+      control.title = 'Control 2'
+      db.session.flush()
+      self.assertEqual(0, log_json.call_count)
+      db.session.commit()
+      control.title = 'Control 3'
+      db.session.flush()
+      db.session.flush()
+      self.assertEqual(1, log_json.call_count)
+    self.assertEqual({}, get_cache().dirty[control])
+
+  def test_reading_log_json_needs_no_queries(self):
+    controls = [Control(title='Control {0}'.format(i)) for i in range(5)]
+    db.session.add_all(controls)
+    db.session.flush()
+    statements = []
+    listener = lambda *args, **kwargs: statements.append(args[2])
+    event.listen(db.engine, 'after_cursor_execute', listener)
+    try:
+      log_jsons = get_cache().new.items()
+    finally:
+      event.remove(db.engine, 'after_cursor_execute', listener)
+    self.assertEqual(5, len(log_jsons))
+    self.assertEqual([], statements)
+
+  def test_cascade_deleted_objects_keep_their_snapshot(self):
+    control = Control(title='Control')
+    document = Document(link='http://example.com', title='Document')
+    db.session.add_all([control, document])
+    db.session.flush()
+    object_document = ObjectDocument(
+        document=document, documentable=control, notes='Notes')
+    db.session.add(object_document)
+    db.session.commit()
+
+    log_json = ObjectDocument.log_json.im_func
+    rows_found = []
+    def checked_log_json(self):
+      rows_found.append(db.session.query(ObjectDocument.id)
+          .filter(ObjectDocument.id == self.id).count())
+      return log_json(self)
+    with patch.object(ObjectDocument, 'log_json', checked_log_json):
+      object_document.notes = 'Notes 2'
+      db.session.flush()
+      # Removing the orphan deletes it in the next flush
+      document.object_documents.remove(object_document)
+      db.session.flush()
+    # Never snapshotted once the row was deleted
+    self.assertNotIn(0, rows_found)
+    cache = get_cache()
+    self.assertNotIn(object_document, cache.dirty)
+    self.assertEqual('Notes 2', cache.deleted[object_document]['notes'])
+
+  def test_view_is_not_changed_by_later_flushes(self):
+    control = Control(title='Control')
+    db.session.add(control)
+    modified_objects = get_modified_objects(db.session)
+    other = Control(title='Other')
+    db.session.add(other)
+    db.session.flush()
+    self.assertEqual([control], modified_objects.new.keys())
+    self.assertEqual(2, len(get_cache().new))
+    db.session.commit()
+    self.assertEqual([control], modified_objects.new.keys())
+    self.assertEqual(0, len(get_cache().new))
@@ -0,0 +1,64 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from tests.ggrc import TestCase
+
+from ggrc.rbac.permissions_provider import PermissionsIndex
+
+
+class TestPermissionsIndex(TestCase):
+
+  def test_is_allowed(self):
+    index = PermissionsIndex({
+        '__user': 'user@example.com',
+        'read': {
+            'Program': {'contexts': [1, 2], 'conditions': {}},
+            '__GGRC_ALL__': {'contexts': [3], 'conditions': {}},
+        },
+        '__GGRC_ADMIN__': {
+            '__GGRC_ALL__': {'contexts': [4], 'conditions': {}},
+        },
+    })
+    self.assertFalse(index.is_admin)
+    self.assertTrue(index.is_allowed('read', 'Program', 1))
+    self.assertTrue(index.is_allowed('read', 'Program', 3))
+    self.assertTrue(index.is_allowed('read', 'Program', 4))
+    self.assertFalse(index.is_allowed('read', 'Program', 5))
+    self.assertTrue(index.is_allowed('read', 'Audit', 3))
+    self.assertFalse(index.is_allowed('read', 'Audit', 1))
+    self.assertTrue(index.is_allowed('update', 'Program', 4))
+    self.assertFalse(index.is_allowed('update', 'Program', 1))
+
+  def test_contexts_for(self):
+    index = PermissionsIndex({
+        'read': {
+            'Contract': {'contexts': [1], 'conditions': {}},
+            'Policy': {'contexts': [2], 'conditions': {}},
+        },
+        '__GGRC_ADMIN__': {
+            '__GGRC_ALL__': {'contexts': [4], 'conditions': {}},
+        },
+    })
+    self.assertEqual(set([1, 4]), set(index.contexts_for('read', 'Contract')))
+    self.assertEqual(
+        set([1, 2, 4]), set(index.contexts_for('read', 'Directive')))
+    self.assertEqual(set([4]), set(index.contexts_for('read', 'Program')))
+    self.assertEqual(set([4]), set(index.contexts_for('update', 'Contract')))
+
+  def test_admin(self):
+    index = PermissionsIndex({
+        '__GGRC_ADMIN__': {
+            '__GGRC_ALL__': {'contexts': [0], 'conditions': {}},
+        },
+    })
+    self.assertTrue(index.is_admin)
+    self.assertTrue(index.is_allowed('delete', 'Program', 12))
+    self.assertIsNone(index.contexts_for('read', 'Program'))
+
+  def test_no_permissions(self):
+    index = PermissionsIndex(None)
+    self.assertFalse(index.is_admin)
+    self.assertFalse(index.is_allowed('read', 'Program', 1))
+    self.assertEqual([], index.contexts_for('read', 'Program'))
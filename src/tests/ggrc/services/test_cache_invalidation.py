@@ -0,0 +1,90 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import MagicMock, patch
+from tests.ggrc import TestCase
+
+from ggrc import db
+from ggrc.cache import CacheManager, LRUCache
+from ggrc.models import ObjectPerson, Person, Policy, Section
+from ggrc.services import common
+
+
+class Context(object):
+  def __init__(self):
+    self.cache_manager = CacheManager()
+    self.cache_manager.initialize(None)
+
+
+class TestCacheInvalidation(TestCase):
+
+  def setUp(self):
+    super(TestCacheInvalidation, self).setUp()
+    self.policy = Policy(title='policy', slug='POLICY-1')
+    self.person = Person(email='person@example.com')
+    self.section = Section(
+        title='section', slug='SECTION-1', directive=self.policy)
+    self.object_person = ObjectPerson(
+        person=self.person, personable=self.policy)
+    db.session.add_all(
+        [self.policy, self.person, self.section, self.object_person])
+    db.session.commit()
+    db.session.expire_all()
+
+  def test_related_keys(self):
+    keys = common.get_keys_for_expiration(
+        Context(), [self.section, self.object_person, self.object_person])
+    self.assertEqual(set([
+        'collection:sections:{0}'.format(self.section.id),
+        'collection:policies:{0}'.format(self.policy.id),
+        'collection:object_people:{0}'.format(self.object_person.id),
+        'collection:people:{0}'.format(self.person.id),
+        ]), keys)
+    # Relationships were resolved without being loaded
+    self.assertNotIn('directive', self.section.__dict__)
+
+  def test_invalidation_batches(self):
+    keys = set('collection:controls:{0}'.format(i) for i in range(1200))
+    batches = common.get_invalidation_batches(keys)
+    self.assertEqual(
+        [500, 500, 200], [len(batch) for batch in batches])
+    self.assertEqual(keys, set(sum(batches, [])))
+
+  def test_warm_cache(self):
+    client = LRUCache()
+    policy_key = 'collection:policies:{0}'.format(self.policy.id)
+    section_key = 'collection:sections:{0}'.format(self.section.id)
+    client.set('DeleteOp:' + section_key, {'status': 'InProgress'})
+    with patch('ggrc.cache.memcache.get_cache_client', return_value=client):
+      count = common.warm_cache([
+          ('Policy', self.policy.id), ('Section', self.section.id)])
+    self.assertEqual(2, count)
+    self.assertEqual(
+        '/api/policies/{0}'.format(self.policy.id),
+        client.get(policy_key)['selfLink'])
+    self.assertEqual(None, client.get(section_key))
+
+  @patch.object(common, '_local_resource_cache', None)
+  @patch.object(common.settings, 'LOCAL_RESOURCE_CACHE_SIZE', 10, create=True)
+  def test_local_hits_blocked_by_delete_ops(self):
+    policy_key = 'collection:policies:{0}'.format(self.policy.id)
+    section_key = 'collection:sections:{0}'.format(self.section.id)
+    common.get_local_resource_cache().set_multi({
+        policy_key: {'selfLink': 'policy'},
+        section_key: {'selfLink': 'section'},
+        })
+    client = LRUCache()
+    client.set('DeleteOp:' + section_key, {'status': 'InProgress'})
+    request = MagicMock()
+    request.cache_manager.cache_object.memcache_client = client
+    with patch.object(common.Resource, 'request', request):
+      resources = common.Resource().get_resources_from_cache([
+          (self.policy.id, 'Policy', None, None),
+          (self.section.id, 'Section', None, None),
+          ])
+    self.assertEqual(
+        {(self.policy.id, 'Policy', None, None): {'selfLink': 'policy'}},
+        resources)
+    self.assertEqual(None, common.get_local_resource_cache().get(section_key))
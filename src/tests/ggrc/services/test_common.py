@@ -9,10 +9,12 @@ import ggrc.services
 import json
 import random
 import time
+from collections import namedtuple
 from datetime import datetime
 from ggrc import db
 from ggrc.models.mixins import Base
 from ggrc.services.common import Resource
+from mock import patch
 from tests.ggrc import TestCase
 from urlparse import urlparse
 from wsgiref.handlers import format_date_time
@@ -163,6 +165,131 @@ class TestResource(TestCase):
     self.assertDictEqual(self.mock_json(mock2), collection[0])
     self.assertDictEqual(self.mock_json(mock1), collection[1])
 
+  def test_collection_get_not_modified(self):
+    date1 = datetime(2013, 4, 17, 0, 0, 0, 0)
+    date2 = datetime(2013, 4, 20, 0, 0, 0, 0)
+    mock1_id = self.mock_model(foo='a', updated_at=date1).id
+    self.mock_model(foo='b', updated_at=date1)
+    response = self.client.get(
+        self.mock_url() + '?foo=a', headers=self.headers())
+    self.assert200(response)
+    etag = response.headers['Etag']
+    self.assertEqual(
+        self.http_timestamp(date1), response.headers['Last-Modified'])
+
+    response = self.client.get(
+        self.mock_url() + '?foo=a',
+        headers=self.headers(('If-None-Match', etag)))
+    self.assertStatus(response, 304)
+
+    response = self.client.get(
+        self.mock_url() + '?foo=a&__stubs_only=true', headers=self.headers())
+    self.assert200(response)
+    stubs_etag = response.headers['Etag']
+    with patch.object(Resource, 'get_collection_objs') as get_collection_objs:
+      response = self.client.get(
+          self.mock_url() + '?foo=a&__stubs_only=true',
+          headers=self.headers(('If-None-Match', stubs_etag)))
+      self.assertStatus(response, 304)
+      self.assertFalse(get_collection_objs.called)
+
+    db.session.query(ServicesTestMockModel).filter_by(id=mock1_id)\
+        .update({'updated_at': date2})
+    db.session.commit()
+    response = self.client.get(
+        self.mock_url() + '?foo=a',
+        headers=self.headers(('If-None-Match', etag)))
+    self.assert200(response)
+    self.assertNotEqual(etag, response.headers['Etag'])
+
+  @patch.object(
+      ggrc.settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'], create=True)
+  def test_collection_get_modified_by_mapping(self):
+    from ggrc.models import Control, ObjectOwner, Person
+    self.client.get('/login')
+    control = Control(title='Control', slug='CONTROL-ETAG')
+    person = Person(name='Owner', email='etag.owner@example.com')
+    db.session.add_all([control, person])
+    db.session.commit()
+    control_id, person_id = control.id, person.id
+    response = self.client.get('/api/controls', headers=self.headers())
+    self.assert200(response)
+    etag = response.headers['Etag']
+
+    db.session.add(ObjectOwner(
+        person_id=person_id, ownable_type='Control', ownable_id=control_id))
+    db.session.commit()
+    response = self.client.get(
+        '/api/controls', headers=self.headers(('If-None-Match', etag)))
+    self.assert200(response)
+    self.assertNotEqual(etag, response.headers['Etag'])
+
+  def test_collection_get_cursor_paging(self):
+    mocks = [
+        self.mock_model(
+            foo=str(i), updated_at=datetime(2013, 4, 17, 0, 0, i, 0))
+        for i in range(5)]
+    expected = [m.foo for m in reversed(mocks)]
+
+    def get_page(url):
+      response = self.client.get(url, headers=self.headers())
+      self.assert200(response)
+      collection = response.json['test_model_collection']
+      return [o['foo'] for o in collection['test_model']], collection['paging']
+
+    foos, paging = get_page(self.mock_url() + '?__cursor=&__page_size=2')
+    self.assertEqual(expected[:2], foos)
+    self.assertEqual(5, paging['total'])
+    self.assertNotIn('prev', paging)
+    foos, paging = get_page(paging['next'])
+    self.assertEqual(expected[2:4], foos)
+    foos, last_paging = get_page(paging['next'])
+    self.assertEqual(expected[4:], foos)
+    self.assertNotIn('next', last_paging)
+    foos, paging = get_page(last_paging['prev'])
+    self.assertEqual(expected[2:4], foos)
+
+    foos, paging = get_page(
+        self.mock_url() + '?__cursor=&__page_size=2&__count=false')
+    self.assertEqual(expected[:2], foos)
+    self.assertNotIn('total', paging)
+
+    response = self.client.get(
+        self.mock_url() + '?__cursor=garbage', headers=self.headers())
+    self.assert400(response)
+
+  def test_cursor_without_updated_at(self):
+    match = namedtuple('Match', ['id', 'type'])(3, 'ServicesTestMockModel')
+    resource = Resource()
+    cursor = resource.encode_cursor('next', match)
+    self.assertEqual(('next', None, 3), resource.decode_cursor(cursor))
+
+  def test_collection_get_streamed(self):
+    for i in range(5):
+      self.mock_model(
+          foo=str(i), updated_at=datetime(2013, 4, 17, 0, 0, i, 0))
+    response = self.client.get(self.mock_url(), headers=self.headers())
+    self.assert200(response)
+    with patch.object(Resource, 'STREAM_CHUNK_SIZE', 2):
+      streamed = self.client.get(
+          self.mock_url() + '?__stream=true', headers=self.headers())
+    self.assert200(streamed)
+    collection = response.json['test_model_collection']
+    streamed_collection = streamed.json['test_model_collection']
+    self.assertEqual(
+        collection['test_model'], streamed_collection['test_model'])
+    self.assertIn('selfLink', streamed_collection)
+    self.assertNotIn('Etag', streamed.headers)
+
+    streamed = self.client.get(
+        self.mock_url() + '?__stream=true&__stubs_only=true',
+        headers=self.headers())
+    self.assert200(streamed)
+    response = self.client.get(
+        self.mock_url() + '?__stream=true&__stubs_only=true',
+        headers=self.headers(('If-None-Match', streamed.headers['Etag'])))
+    self.assertStatus(response, 304)
+
   @SkipTest
   def test_resource_get(self):
     date1 = datetime(2013, 4, 17, 0, 0, 0, 0)
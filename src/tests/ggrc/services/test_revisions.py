@@ -0,0 +1,77 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+
+from ggrc import db, settings
+from ggrc.models import BackgroundTask, Control, Event, Revision
+from ggrc.models.revision import recompress_revisions
+from ggrc.services import common
+from tests.ggrc import TestCase
+
+
+class TestRevisions(TestCase):
+
+  def add_controls(self, count):
+    for i in range(count):
+      db.session.add(Control(title='Control {0}'.format(i)))
+
+  @patch.object(settings, 'REVISION_INSERT_BATCH_SIZE', 2, create=True)
+  def test_writes_revisions_in_batches(self):
+    self.add_controls(5)
+    common.log_event(db.session, current_user_id=1)
+    db.session.commit()
+    event = Event.query.one()
+    self.assertEqual('IMPORT', event.action)
+    revisions = Revision.query.filter_by(event_id=event.id).all()
+    self.assertEqual(5, len(revisions))
+    self.assertEqual(
+        set('Control {0}'.format(i) for i in range(5)),
+        set(revision.content['title'] for revision in revisions))
+    self.assertEqual(set(['created']), set(r.action for r in revisions))
+
+  def stored_contents(self):
+    return [
+        str(content)[0] for content, in
+        db.session.execute('SELECT content FROM revisions ORDER BY id')]
+
+  def test_large_content_is_compressed(self):
+    db.session.add(Control(title='Control', description='x' * 70000))
+    db.session.add(Control(title='Small'))
+    common.log_event(db.session, current_user_id=1)
+    db.session.commit()
+    self.assertEqual(['z', '{'], sorted(self.stored_contents()))
+    contents = dict(
+        (revision.content['title'], revision.content)
+        for revision in Revision.query)
+    self.assertEqual(70000, len(contents['Control']['description']))
+
+  def test_recompress_revisions(self):
+    self.add_controls(3)
+    common.log_event(db.session, current_user_id=1)
+    db.session.commit()
+    connection = db.session.connection()
+    self.assertEqual(3, recompress_revisions(
+        connection, chunk_size=2, threshold=10))
+    self.assertEqual(['z'] * 3, self.stored_contents())
+    self.assertEqual(2, recompress_revisions(
+        connection, threshold=False, start_id=Revision.query.first().id + 1))
+    self.assertEqual(['z', '{', '{'], self.stored_contents())
+    self.assertEqual(
+        set('Control {0}'.format(i) for i in range(3)),
+        set(revision.content['title'] for revision in Revision.query))
+
+  @patch.object(settings, 'REVISION_WRITER_DEFERRED', True, create=True)
+  @patch.object(common, '_revision_writing_pool')
+  def test_deferred_revisions(self, pool):
+    from ggrc.views import write_revisions
+    self.add_controls(2)
+    common.log_event(db.session, current_user_id=1)
+    self.assertEqual(0, Revision.query.count())
+    db.session.commit()
+    task_id, = pool.apply_async.call_args[0][1]
+    write_revisions(BackgroundTask.query.get(task_id))
+    self.assertEqual(2, Revision.query.count())
+    self.assertEqual('Success', BackgroundTask.query.get(task_id).status)
@@ -0,0 +1,85 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from flask import g
+from mock import patch
+from tests.ggrc import TestCase
+
+from ggrc import db, settings
+from ggrc.models import Control
+from ggrc.profiler import (
+    Profiler, QueryBudgetExceeded, RequestProfile, query_budget,
+    )
+from ggrc.utils import benchmark
+
+
+class TestProfiler(TestCase):
+
+  def tearDown(self):
+    g._request_profile = None
+    super(TestProfiler, self).tearDown()
+
+  def test_span_tree(self):
+    profile = g._request_profile = RequestProfile('GET /api/programs')
+    with benchmark("outer"):
+      db.session.execute("SELECT 1")
+      with benchmark("inner"):
+        db.session.execute("SELECT 1")
+        db.session.execute("SELECT 1")
+    profile.finish()
+    result = profile.to_dict()
+    outer = result['children'][0]
+    self.assertEqual('outer', outer['name'])
+    self.assertEqual(1, outer['query_count'])
+    self.assertEqual('inner', outer['children'][0]['name'])
+    self.assertEqual(2, outer['children'][0]['query_count'])
+    self.assertEqual(3, result['total_query_count'])
+
+  def test_slow_requests(self):
+    profiler = Profiler(buffer_size=1)
+    for name in ('GET /a', 'GET /b', 'GET /c'):
+      profile = RequestProfile(name)
+      profile.finish()
+      profiler.record(profile, 0 if name != 'GET /c' else 60)
+    stats = profiler.get_stats()
+    self.assertEqual(['GET /b'], [r['name'] for r in stats['slow_requests']])
+    self.assertEqual(1, stats['endpoints']['GET /c']['count'])
+    self.assertIn('p99_ms', stats['endpoints']['GET /c'])
+
+  def test_query_budget(self):
+    with query_budget(2):
+      db.session.execute("SELECT 1")
+      db.session.execute("SELECT 2")
+    with self.assertRaises(QueryBudgetExceeded) as raised:
+      with query_budget(1, 'two queries'):
+        db.session.execute("SELECT 1")
+        db.session.execute("SELECT 2")
+    violation = raised.exception.violations[0]
+    self.assertEqual('two queries', violation['name'])
+    self.assertEqual(2, violation['query_count'])
+    self.assertEqual(['SELECT 1', 'SELECT 2'], violation['statements'])
+
+  @patch.object(settings, 'BOOTSTRAP_ADMIN_USERS', ['user@example.com'],
+                create=True)
+  @patch.object(settings, 'PERMISSIONS_CACHE_SIZE', 1000, create=True)
+  def test_collection_page_query_budget(self):
+    for i in range(20):
+      db.session.add(Control(title='Control {0}'.format(i)))
+    db.session.commit()
+    self.client.get('/login')
+    headers = {'Accept': 'application/json', 'X-Requested-By': 'gGRC'}
+    url = '/api/controls?__page=1&__page_size={0}'
+    # Load the permissions of the user first
+    self.client.get(url.format(1), headers=headers)
+    query_counts = []
+    for page_size in (1, 20):
+      # One query per eagerly loaded relationship
+      with query_budget(16) as profile:
+        response = self.client.get(url.format(page_size), headers=headers)
+      self.assert200(response)
+      self.assertEqual(
+          page_size, len(response.json['controls_collection']['controls']))
+      query_counts.append(profile.root.total_query_count)
+    self.assertEqual(query_counts[0], query_counts[1])
@@ -0,0 +1,60 @@
+# Copyright (C) 2015 Google Inc., authors, and contributors <see AUTHORS file>
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+# Created By: david@reciprocitylabs.com
+# Maintained By: david@reciprocitylabs.com
+
+from mock import patch
+from tests.ggrc import TestCase
+
+from ggrc import db, settings
+from ggrc.models import Person
+from ggrc_basic_permissions import load_permissions_for, permissions_cache
+from ggrc_basic_permissions.models import Role, UserRole
+
+
+# Tests run in a single process, so the process-local cache is safe there
+@patch.object(settings, 'PERMISSIONS_CACHE_SIZE', 1000, create=True)
+class TestPermissionsCache(TestCase):
+
+  def setUp(self):
+    super(TestPermissionsCache, self).setUp()
+    self.person = Person(email='cached@example.com', name='Cached')
+    db.session.add(self.person)
+    db.session.commit()
+    self.loads = []
+
+  def load(self, user):
+    self.loads.append(user.id)
+    with patch('ggrc_basic_permissions.get_current_user',
+               return_value=self.person):
+      return load_permissions_for(user)
+
+  def test_permissions_are_cached(self):
+    # The first load creates the personal context, so it is not cached
+    permissions_cache.get_permissions_for(self.person, self.load)
+    db.session.commit()
+    first = permissions_cache.get_permissions_for(self.person, self.load)
+    db.session.commit()
+    second = permissions_cache.get_permissions_for(self.person, self.load)
+    self.assertEqual(2, len(self.loads))
+    self.assertIs(first, second)
+
+  def test_role_change_invalidates(self):
+    permissions_cache.get_permissions_for(self.person, self.load)
+    db.session.commit()
+    permissions = permissions_cache.get_permissions_for(self.person, self.load)
+    self.assertNotIn('Program', permissions.get('create', {}))
+
+    role = Role(name='Cached Program Creator', scope='System',
+                permissions={'create': ['Program']})
+    db.session.add(UserRole(person=self.person, role=role, context=None))
+    db.session.commit()
+
+    permissions = permissions_cache.get_permissions_for(self.person, self.load)
+    self.assertEqual(3, len(self.loads))
+    self.assertIn('Program', permissions['create'])
+
+    # Roles are not cleaned up between tests
+    db.session.query(UserRole).delete()
+    db.session.delete(role)
+    db.session.commit()